@@ -0,0 +1,185 @@
+"""Downloads EirGrid history into the local store, one day per request.
+
+Run from the repository root, e.g. for the first quarter of 2024:
+    python backfill.py 2024-01-01 2024-03-31 --regions ROI NI ALL
+
+Days are downloaded concurrently by a bounded pool of workers that share one request rate limit. Every finished
+day is recorded in the store, so an interrupted backfill resumes where it stopped when run again.
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+import sys
+from subs.circuit_breaker import background
+from subs.eirgrid_client import close_clients
+from subs.eirgrid_parser import columns_to_frame
+from subs.energy_api import REGIONS, eirgrid_url, fetch_rows, format_date
+from subs.timeseries_store import backfilled_days, store_backfill_day
+
+logger = logging.getLogger(__name__)
+
+# Areas needed for analytics
+AREAS = ["co2intensity", "windactual", "demandactual", "fuelMix"]
+
+DEFAULT_WORKERS = 4
+# Requests per second across all workers, to stay polite to EirGrid
+DEFAULT_RATE = 2.0
+# Attempts per day before it is left for the next run, with exponential backoff in between
+MAX_ATTEMPTS = 3
+BACKOFF = 2.0
+
+
+class RateLimiter:
+    """Spaces requests evenly so that all workers together stay below a request rate."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = asyncio.Lock()
+        self._next = 0.0
+
+    async def wait(self):
+        """Waits until the next request may be sent."""
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def pending_chunks(areas, regions, start, end):
+    """Lists the (area, region, day) chunks of a date range that are not in the store yet.
+
+    Args:
+        areas (list): EirGrid data areas, e.g. `AREAS`.
+        regions (list): Regions ("ROI", "NI" or "ALL").
+        start (datetime.date): The first day (inclusive).
+        end (datetime.date): The last day (inclusive).
+
+    Returns:
+        list: The missing chunks, oldest day first.
+    """
+    days = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+    chunks = []
+    for area in areas:
+        for region in regions:
+            done = backfilled_days(area, region)
+            chunks += [(area, region, day) for day in days if day not in done]
+    return sorted(chunks, key=lambda chunk: chunk[2])
+
+
+async def backfill_day(area, region, day, limiter):
+    """Downloads one day of an area and region and writes it into the store.
+
+    Args:
+        area (str): The EirGrid data area.
+        region (str): The region ("ROI", "NI" or "ALL").
+        day (datetime.date): The day to download.
+        limiter (RateLimiter): The rate limit shared by all workers.
+
+    Returns:
+        int: The number of rows stored.
+    """
+    start = datetime.datetime.combine(day, datetime.time())
+    end = start + datetime.timedelta(days=1) - datetime.timedelta(minutes=1)
+    url = eirgrid_url(area, region, format_date(start), format_date(end))
+
+    for attempt in range(MAX_ATTEMPTS):
+        await limiter.wait()
+        try:
+            df = columns_to_frame(await fetch_rows(url, area))
+            break
+        except Exception as error:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            logger.info(f"{area}/{region} {day} failed ({error!r}), retrying")
+            await asyncio.sleep(BACKOFF * 2**attempt)
+
+    # Today is still being published, so it is stored but downloaded again by the next run
+    complete = end < datetime.datetime.now()
+    await asyncio.to_thread(store_backfill_day, area, region, day, df, complete)
+    return len(df)
+
+
+async def backfill(
+    areas, regions, start, end, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE
+):
+    """Downloads the missing days of a date range with a bounded pool of workers.
+
+    Args:
+        areas (list): EirGrid data areas, e.g. `AREAS`.
+        regions (list): Regions ("ROI", "NI" or "ALL").
+        start (datetime.date): The first day (inclusive).
+        end (datetime.date): The last day (inclusive).
+        workers (int): The number of concurrent downloads.
+        rate (float): The maximum number of requests per second across all workers.
+
+    Returns:
+        list: The (area, region, day) chunks that failed and will be retried by the next run.
+    """
+    chunks = await asyncio.to_thread(pending_chunks, areas, regions, start, end)
+    logger.info(f"{len(chunks)} days to download")
+
+    queue = asyncio.Queue()
+    for chunk in chunks:
+        queue.put_nowait(chunk)
+    limiter = RateLimiter(rate)
+    failed = []
+
+    async def worker():
+        while not queue.empty():
+            area, region, day = queue.get_nowait()
+            try:
+                rows = await backfill_day(area, region, day, limiter)
+                logger.info(f"{area}/{region} {day}: {rows} rows")
+            except Exception as error:
+                logger.warning(f"{area}/{region} {day} failed: {error!r}")
+                failed.append((area, region, day))
+
+    # Backfills are background work, so they may probe an endpoint whose circuit breaker has cooled down
+    token = background.set(True)
+    try:
+        await asyncio.gather(*(worker() for _ in range(workers)))
+    finally:
+        background.reset(token)
+        await close_clients()
+    return failed
+
+
+def main():
+    """Parses the command line and runs the backfill, exiting with status 1 if any day failed."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "start", type=datetime.date.fromisoformat, help="first day, YYYY-MM-DD"
+    )
+    parser.add_argument(
+        "end",
+        type=datetime.date.fromisoformat,
+        nargs="?",
+        default=datetime.date.today(),
+        help="last day, YYYY-MM-DD (default: today)",
+    )
+    parser.add_argument("--areas", nargs="+", default=AREAS, choices=AREAS)
+    parser.add_argument("--regions", nargs="+", default=["ALL"], choices=REGIONS)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument(
+        "--rate", type=float, default=DEFAULT_RATE, help="requests per second"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    end = min(args.end, datetime.date.today())
+    failed = asyncio.run(
+        backfill(args.areas, args.regions, args.start, end, args.workers, args.rate)
+    )
+    if failed:
+        logger.warning(
+            f"{len(failed)} days failed, run the same command again to retry them"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
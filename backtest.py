@@ -0,0 +1,64 @@
+"""Backtests the CO2 forecasts kept in the local store against the actual intensity.
+
+Run from the repository root, e.g. for the past year:
+    python backtest.py --days 365 --regions ROI NI ALL
+
+Every co2_fc forecast the bot fetches is stored with its issue time, so the backtest covers the period the bot
+has been running. The summary of each region is kept in the store, where the bot reads the latest one.
+"""
+
+import argparse
+import datetime
+import logging
+import time
+from subs.backtest import run_backtest
+from subs.energy_api import REGIONS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DAYS = 365
+
+
+def format_summary(summary):
+    """Formats a backtest summary as a table with one row per lead time bucket and one for all of them."""
+
+    def cell(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    lines = [
+        f"{summary['region']}: {summary['forecasts']} forecasts, {summary['start']} to {summary['end']}",
+        f"{'lead':>8} {'count':>9} {'MAE':>7} {'bias':>7} {'RMSE':>7} {'EU hit':>7} {'rel hit':>7}",
+    ]
+    for row in summary["by_lead"] + [dict(summary, lead="all")]:
+        lines.append(
+            f"{row['lead']:>8} {row['count']:>9} {cell(row['mae'], '7.1f')} {cell(row['bias'], '7.1f')} "
+            f"{cell(row['rmse'], '7.1f')} {cell(row['eu_hit_rate'], '7.1%')} "
+            f"{cell(row['relative_hit_rate'], '7.1%')}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """Parses the command line, backtests each region and prints the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=DEFAULT_DAYS,
+        help=f"target times of the last DAYS days (default: {DEFAULT_DAYS})",
+    )
+    parser.add_argument("--regions", nargs="+", default=["ALL"], choices=REGIONS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    end = datetime.datetime.now()
+    start = end - datetime.timedelta(days=args.days)
+    for region in args.regions:
+        started = time.perf_counter()
+        summary = run_backtest(region, start, end)
+        logger.info(f"{region}: backtested in {time.perf_counter() - started:.2f}s")
+        print(format_summary(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark of the columnar EirGrid parser against the original list-of-dicts path.
+
+Run from the repository root:
+    python -m benchmarks.bench_parser
+"""
+
+import datetime
+import json
+import timeit
+import numpy as np
+import pandas as pd
+from subs.eirgrid_parser import parse_rows, columns_to_frame
+from subs.eirgrid_time import EFFECTIVE_TIME_FORMAT
+
+# Row counts: one day of 15-minute data, a quarter of 15-minute data, and long `frequency` pulls
+SIZES = [96, 8_640, 100_000, 500_000]
+REPEATS = 3
+
+
+def synthetic_payload(n_rows, step=datetime.timedelta(minutes=15)):
+    """Builds a compact EirGrid-style JSON body with `n_rows` rows and a few missing values."""
+    start = datetime.datetime(2024, 1, 1)
+    rng = np.random.default_rng(0)
+    values = rng.normal(300, 50, n_rows).round(2)
+    rows = [
+        {
+            "EffectiveTime": (start + i * step).strftime(EFFECTIVE_TIME_FORMAT),
+            "FieldName": "CO2_INTENSITY",
+            "Region": "ALL",
+            "Value": None if i % 97 == 0 else float(values[i]),
+        }
+        for i in range(n_rows)
+    ]
+    return json.dumps(
+        {"ErrorMessage": None, "LastUpdated": "", "Rows": rows, "Status": "Success"},
+        separators=(",", ":"),
+    )
+
+
+def legacy_parse(text):
+    """The original path: copy rows into a list, build a frame from dicts, then parse timestamps."""
+    Rows = []
+    for row in json.loads(text)["Rows"]:
+        Rows.append(row)
+    df = pd.DataFrame(Rows)
+    df["EffectiveTime"] = pd.to_datetime(
+        df["EffectiveTime"], format=EFFECTIVE_TIME_FORMAT
+    )
+    return df
+
+
+def columnar_parse(text):
+    return columns_to_frame(parse_rows(text))
+
+
+def main():
+    print(f"{'rows':>10} {'legacy (s)':>12} {'columnar (s)':>14} {'speed-up':>10}")
+    for n_rows in SIZES:
+        text = synthetic_payload(n_rows)
+        number = max(1, 20_000 // n_rows)
+        legacy = (
+            min(
+                timeit.repeat(lambda: legacy_parse(text), number=number, repeat=REPEATS)
+            )
+            / number
+        )
+        columnar = (
+            min(
+                timeit.repeat(
+                    lambda: columnar_parse(text), number=number, repeat=REPEATS
+                )
+            )
+            / number
+        )
+        print(
+            f"{n_rows:>10} {legacy:>12.5f} {columnar:>14.5f} {legacy / columnar:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
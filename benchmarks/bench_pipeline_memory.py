@@ -0,0 +1,199 @@
+"""Memory benchmark of the carbon intensity processing chain, before and after it was made copy-free.
+
+Measures the peak memory traced while one request's data is processed, from parsed columns to the
+summaries and the frame handed to the plot, and counts the SettingWithCopy warnings raised on the way.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline_memory
+"""
+
+import datetime
+import json
+import time
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+from benchmarks.bench_parser import synthetic_payload
+from subs.eirgrid_parser import parse_rows, columns_to_frame
+from subs.energy_api import (
+    classify_status,
+    process_carbon_forecast,
+    process_carbon_intensity,
+    status_classification,
+)
+from subs.openai_script import (
+    find_optimized_relative_periods,
+    optimize_categorize_periods,
+)
+
+# (forecast rows at 30 minutes, intensity rows at 15 minutes): one day as served to users, then a week
+SIZES = [(48, 97), (336, 673)]
+REPEATS = 20
+
+
+def with_unpublished_tail(text, n_rows=2):
+    """Clears the last values of a payload, as EirGrid does for intervals not published yet."""
+    body = json.loads(text)
+    for row in body["Rows"][-n_rows:]:
+        row["Value"] = None
+    return json.dumps(body, separators=(",", ":"))
+
+
+def legacy_process_carbon_forecast(columns):
+    """The original chain: build a frame, set the index, then slice up to the last value."""
+    df_carbon_forecast = columns_to_frame(columns)
+    df_carbon_forecast_indexed = df_carbon_forecast.set_index("EffectiveTime")
+    last_value_index_co_forecast = df_carbon_forecast_indexed[
+        "Value"
+    ].last_valid_index()
+    return df_carbon_forecast_indexed.loc[:last_value_index_co_forecast]
+
+
+def legacy_process_carbon_intensity(df_carbon_intensity_day_before):
+    df_carbon_intensity_indexed = df_carbon_intensity_day_before.set_index(
+        "EffectiveTime"
+    )
+    last_value_index_co_intensity = df_carbon_intensity_indexed[
+        "Value"
+    ].last_valid_index()
+    df_carbon_intensity_recent = df_carbon_intensity_indexed.loc[
+        :last_value_index_co_intensity
+    ]
+    df_carbon_intensity_recent["Value"] = df_carbon_intensity_recent[
+        "Value"
+    ].interpolate()
+    mean_val = df_carbon_intensity_recent["Value"].mean()
+    min_val = df_carbon_intensity_recent["Value"].min()
+    max_val = df_carbon_intensity_recent["Value"].max()
+    return {
+        "mean": mean_val,
+        "min": min_val,
+        "max": max_val,
+    }, df_carbon_intensity_recent
+
+
+def legacy_status_classification(df, co2_stats_prior_day):
+    df["status_compared_to_yesterday"] = df["Value"].apply(
+        classify_status, args=(co2_stats_prior_day["min"], co2_stats_prior_day["max"])
+    )
+    df["status_compared_to_EU"] = df["Value"].apply(classify_status, args=(250, 500))
+    return df
+
+
+def _legacy_summary(df):
+    emoji_dict = {"Low": "🟢", "Medium": "🟡", "High": "🔴"}
+    period_summary = {"Low": [], "Medium": [], "High": []}
+    for (category, group), data in df.groupby(["category", "group"], observed=True):
+        start_time = data.index.min().strftime("%H:%M")
+        end_time = data.index.max().strftime("%H:%M")
+        period_str = (
+            f"{start_time} to {end_time}" if start_time != end_time else start_time
+        )
+        period_summary[category].append(period_str)
+    summary_text = ""
+    for category in ["Low", "Medium", "High"]:
+        if period_summary[category]:
+            periods = ", ".join(period_summary[category])
+            summary_text += f"- {emoji_dict[category]} {category} Emission: {periods}\n"
+        else:
+            summary_text += f"- {emoji_dict[category]} {category} Emission: No specific periods identified.\n"
+    return summary_text
+
+
+def legacy_optimize_categorize_periods(df):
+    df["category"] = pd.cut(
+        df["Value"], bins=[-np.inf, 250, 500, np.inf], labels=["Low", "Medium", "High"]
+    )
+    df["group"] = (df["category"] != df["category"].shift()).cumsum()
+    return _legacy_summary(df)
+
+
+def legacy_find_optimized_relative_periods(df):
+    df["normalized"] = (df["Value"] - df["Value"].min()) / (
+        df["Value"].max() - df["Value"].min()
+    )
+    low_threshold = df["normalized"].quantile(0.33)
+    high_threshold = df["normalized"].quantile(0.66)
+    df["category"] = pd.cut(
+        df["normalized"],
+        bins=[-np.inf, low_threshold, high_threshold, np.inf],
+        labels=["Low", "Medium", "High"],
+    )
+    df["group"] = (df["category"] != df["category"].shift()).cumsum()
+    return _legacy_summary(df), df
+
+
+def legacy_request(forecast_columns, intensity_frame):
+    """The original carbon intensity request, as `carbon_forecast_intensity_prompts` ran it."""
+    df_carbon_forecast_indexed = legacy_process_carbon_forecast(forecast_columns)
+    co2_stats_prior_day, _ = legacy_process_carbon_intensity(intensity_frame)
+    df_ = legacy_status_classification(df_carbon_forecast_indexed, co2_stats_prior_day)
+    _, df_with_trend = legacy_find_optimized_relative_periods(df_)
+    eu_summary_text = legacy_optimize_categorize_periods(df_with_trend)
+    quantile_summary_text, _ = legacy_find_optimized_relative_periods(df_with_trend)
+    return eu_summary_text, quantile_summary_text, df_with_trend
+
+
+def current_request(forecast_columns, intensity_frame):
+    """The single-pass request, as `carbon_forecast_intensity_prompts` runs it now."""
+    df_carbon_forecast_indexed = process_carbon_forecast(forecast_columns)
+    co2_stats_prior_day, _ = process_carbon_intensity(intensity_frame)
+    df_ = status_classification(df_carbon_forecast_indexed, co2_stats_prior_day)
+    quantile_summary_text, df_with_trend = find_optimized_relative_periods(df_)
+    eu_summary_text = optimize_categorize_periods(df_with_trend)
+    return eu_summary_text, quantile_summary_text, df_with_trend
+
+
+def measure(request, forecast_columns, intensity_text):
+    """Returns the median peak traced memory (bytes), time (s) and warnings of one request."""
+    peaks, times, warned = [], [], 0
+    for _ in range(REPEATS):
+        # The raw intensity frame is modified by processing, so each run gets a fresh one
+        intensity_frame = columns_to_frame(parse_rows(intensity_text))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            tracemalloc.start()
+            started = time.perf_counter()
+            request(forecast_columns, intensity_frame)
+            times.append(time.perf_counter() - started)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        warned = len(caught)
+    return np.median(peaks), np.median(times), warned
+
+
+def main():
+    print(
+        f"{'rows':>10} {'chain':>8} {'peak (KiB)':>11} {'time (ms)':>10} {'warnings':>9}"
+    )
+    for forecast_rows, intensity_rows in SIZES:
+        forecast_columns = parse_rows(
+            with_unpublished_tail(
+                synthetic_payload(forecast_rows, step=datetime.timedelta(minutes=30))
+            )
+        )
+        intensity_text = with_unpublished_tail(synthetic_payload(intensity_rows))
+
+        # Both chains must produce the same summaries
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            legacy = legacy_request(
+                forecast_columns, columns_to_frame(parse_rows(intensity_text))
+            )
+        current = current_request(
+            forecast_columns, columns_to_frame(parse_rows(intensity_text))
+        )
+        # The legacy chain labels periods with the time of day only, which is ambiguous beyond one day
+        if forecast_rows * 30 <= 24 * 60:
+            assert legacy[:2] == current[:2], "summaries differ"
+
+        for name, request in (("legacy", legacy_request), ("current", current_request)):
+            peak, seconds, warned = measure(request, forecast_columns, intensity_text)
+            print(
+                f"{forecast_rows:>10} {name:>8} {peak / 1024:>11.1f} {seconds * 1000:>10.2f} {warned:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
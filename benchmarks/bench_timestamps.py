@@ -0,0 +1,67 @@
+"""Benchmark of the EffectiveTime decoder against pandas' format-based parsing.
+
+Run from the repository root:
+    python -m benchmarks.bench_timestamps
+"""
+
+import datetime
+import timeit
+import pandas as pd
+from subs.eirgrid_time import decode_effective_times, EFFECTIVE_TIME_FORMAT
+
+SIZES = [96, 8_640, 100_000]
+REPEATS = 3
+
+
+def grid_times(n_rows, step=datetime.timedelta(minutes=15)):
+    """A regular series, as EirGrid returns for every area."""
+    start = datetime.datetime(2024, 1, 1)
+    return [(start + i * step).strftime(EFFECTIVE_TIME_FORMAT) for i in range(n_rows)]
+
+
+def irregular_times(n_rows):
+    """A series with a duplicated and a missing slot, which forces the per-row path."""
+    times = grid_times(n_rows + 1)
+    times[n_rows // 2] = times[n_rows // 2 - 1]
+    del times[-2]
+    return times
+
+
+def main():
+    print(
+        f"{'rows':>10} {'series':>10} {'pandas (s)':>12} {'decoder (s)':>12} {'speed-up':>10}"
+    )
+    for n_rows in SIZES:
+        number = max(1, 20_000 // n_rows)
+        for name, times in (
+            ("grid", grid_times(n_rows)),
+            ("irregular", irregular_times(n_rows)),
+        ):
+            series = pd.Series(times)
+            pandas = (
+                min(
+                    timeit.repeat(
+                        lambda: pd.to_datetime(series, format=EFFECTIVE_TIME_FORMAT),
+                        number=number,
+                        repeat=REPEATS,
+                    )
+                )
+                / number
+            )
+            decoder = (
+                min(
+                    timeit.repeat(
+                        lambda: decode_effective_times(times),
+                        number=number,
+                        repeat=REPEATS,
+                    )
+                )
+                / number
+            )
+            print(
+                f"{n_rows:>10} {name:>10} {pandas:>12.5f} {decoder:>12.5f} {pandas / decoder:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
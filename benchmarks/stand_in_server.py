@@ -0,0 +1,290 @@
+"""Local stand-in for the EirGrid dashboard service and the CO2 forecast API.
+
+Serves both URL shapes the data layer requests, so benchmarks and load tests run offline:
+    /DashboardService.svc/data?area=...&region=...&datefrom=...&dateto=...
+    /api/co2_fc/<start>/<end>/<region>
+
+Run from the repository root, then point the bot or a benchmark at it:
+    python -m benchmarks.stand_in_server --port 8080 --latency 0.3 --error-rate 0.05
+    EIRGRID_BASE_URL=http://localhost:8080 CO2_FORECAST_BASE_URL=http://localhost:8080 python main.py
+
+Responses are replayed from fixtures when one exists for the dataset and region, and synthesised otherwise.
+Replayed responses only hold the fixture rows within the requested window, like EirGrid's own.
+With --record every request is forwarded to the real services and the rows are merged into the fixtures.
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+import re
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from subs.eirgrid_client import verifies_tls
+
+# The real services, used in record mode
+EIRGRID_UPSTREAM = "http://smartgriddashboard.eirgrid.com"
+CO2_FORECAST_UPSTREAM = "https://www.co2.smartgriddashboard.com"
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+_DATA_PATH = "/DashboardService.svc/data"
+_CO2_FC_PATH = re.compile(r"^/api/co2_fc/(\d{12})/(\d{12})/(\w+)/?$")
+
+# Typical level of each synthetic series, around which the values follow a daily cycle
+_LEVELS = {
+    "co2intensity": ("CO2_INTENSITY", 250.0),
+    "co2emission": ("CO2_EMISSION", 1000.0),
+    "windactual": ("WIND_ACTUAL", 1500.0),
+    "windforecast": ("WIND_FORECAST", 1500.0),
+    "demandactual": ("SYSTEM_DEMAND", 4500.0),
+    "demandforecast": ("DEMAND_FORECAST", 4500.0),
+    "generationactual": ("GEN_EXP", 4200.0),
+    "interconnection": ("INTER_NET", 300.0),
+    "SnspAll": ("SNSP_ALL", 50.0),
+    "co2_fc": ("CO2_FORECAST", 250.0),
+}
+_FUEL_MIX = {
+    "FUEL_COAL": 100.0,
+    "FUEL_GAS": 1800.0,
+    "FUEL_NET_IMPORT": -200.0,
+    "FUEL_OTHER_FOSSIL": 60.0,
+    "FUEL_RENEW": 1600.0,
+}
+
+
+def fixture_path(directory, dataset, region):
+    """Returns the fixture file of a dataset and region, e.g. fixtures/fuelMix_ALL.json."""
+    return os.path.join(directory, f"{dataset}_{region}.json")
+
+
+def row_time(row):
+    """Returns the EffectiveTime of an EirGrid row as a datetime."""
+    return datetime.datetime.strptime(row["EffectiveTime"], "%d-%b-%Y %H:%M:%S")
+
+
+def window_rows(rows, start, end):
+    """Returns the rows whose EffectiveTime lies within a window (inclusive at both ends).
+
+    Args:
+        rows (list): Rows of a fixture, as dictionaries with an 'EffectiveTime'.
+        start (datetime): The start of the window.
+        end (datetime): The end of the window.
+
+    Returns:
+        list: The rows of the window, in their fixture order.
+    """
+    return [row for row in rows if start <= row_time(row) <= end]
+
+
+def merge_rows(rows, new_rows):
+    """Merges newly recorded rows into the rows of a fixture, replacing rows of the same time and field.
+
+    Args:
+        rows (list): The rows already in the fixture.
+        new_rows (list): The rows of a recorded response.
+
+    Returns:
+        list: Every row once, sorted by time and field.
+    """
+    merged = {(row["EffectiveTime"], row["FieldName"]): row for row in rows}
+    merged.update({(row["EffectiveTime"], row["FieldName"]): row for row in new_rows})
+    return sorted(merged.values(), key=lambda row: (row_time(row), row["FieldName"]))
+
+
+def synthetic_rows(area, region, start, end, step, now):
+    """Builds EirGrid-style rows for a window, with values following a daily cycle and none after `now`.
+
+    Args:
+        area (str): The EirGrid data area, or "co2_fc".
+        region (str): The region ("ROI", "NI" or "ALL").
+        start (datetime): The start of the window (inclusive).
+        end (datetime): The end of the window (inclusive).
+        step (datetime.timedelta): The spacing of the rows.
+        now (datetime): Rows after this time have no value yet, like EirGrid's own responses.
+
+    Returns:
+        list: Rows as dictionaries with 'EffectiveTime', 'FieldName', 'Region' and 'Value'.
+    """
+    share = {"ROI": 0.8, "NI": 0.2}.get(region, 1.0)
+    rows = []
+    t = start
+    while t <= end:
+        effective_time = t.strftime("%d-%b-%Y %H:%M:%S")
+        cycle = 1 + 0.2 * math.sin(2 * math.pi * (t.hour * 60 + t.minute) / 1440)
+        if area == "fuelMix":
+            for field, level in _FUEL_MIX.items():
+                rows.append(
+                    {
+                        "EffectiveTime": effective_time,
+                        "FieldName": field,
+                        "Region": region,
+                        "Value": round(level * share * cycle, 2),
+                    }
+                )
+        else:
+            field, level = _LEVELS.get(area, (area.upper(), 100.0))
+            # Intensities are ratios, so they do not scale with the region
+            scale = 1.0 if area in ("co2intensity", "co2_fc", "SnspAll") else share
+            published = area == "co2_fc" or t <= now
+            rows.append(
+                {
+                    "EffectiveTime": effective_time,
+                    "FieldName": field,
+                    "Region": region,
+                    "Value": round(level * scale * cycle, 2) if published else None,
+                }
+            )
+        t += step
+    return rows
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers EirGrid requests according to the options stored on the server."""
+
+    def do_GET(self):
+        options = self.server.options
+        url = urllib.parse.urlsplit(self.path)
+        match = _CO2_FC_PATH.match(url.path)
+        if match:
+            start = datetime.datetime.strptime(match.group(1), "%Y%m%d%H%M")
+            end = datetime.datetime.strptime(match.group(2), "%Y%m%d%H%M")
+            dataset, region = "co2_fc", match.group(3)
+            upstream = CO2_FORECAST_UPSTREAM
+            step = datetime.timedelta(minutes=30)
+        elif url.path == _DATA_PATH:
+            query = urllib.parse.parse_qs(url.query)
+            try:
+                dataset, region = query["area"][0], query["region"][0]
+                # "01-jan-2024+00%3A00" arrives as "01-jan-2024 00:00"
+                start, end = (
+                    datetime.datetime.strptime(query[key][0], "%d-%b-%Y %H:%M")
+                    for key in ("datefrom", "dateto")
+                )
+            except (KeyError, ValueError):
+                self._send(400, {"Status": "Error", "ErrorMessage": "Bad query"})
+                return
+            upstream = EIRGRID_UPSTREAM
+            step = datetime.timedelta(minutes=15)
+        else:
+            self._send(404, {"Status": "Error", "ErrorMessage": "Not found"})
+            return
+
+        if options.latency or options.jitter:
+            time.sleep(max(0.0, options.latency + random.uniform(0, options.jitter)))
+        if random.random() < options.error_rate:
+            self._send(500, {"Status": "Error", "ErrorMessage": "Injected error"})
+            return
+
+        path = fixture_path(options.fixtures, dataset, region)
+        if options.record:
+            response = requests.get(
+                upstream + self.path, verify=verifies_tls(upstream), timeout=30
+            )
+            if response.status_code == 200:
+                body = response.json()
+                # Each request covers one window, so the fixture collects the rows of every window recorded
+                if os.path.exists(path):
+                    with open(path) as fixture:
+                        body["Rows"] = merge_rows(
+                            json.load(fixture)["Rows"], body["Rows"]
+                        )
+                os.makedirs(options.fixtures, exist_ok=True)
+                with open(path, "w") as fixture:
+                    json.dump(body, fixture, separators=(",", ":"))
+            self._send_text(response.status_code, response.text)
+        elif os.path.exists(path):
+            with open(path) as fixture:
+                body = json.load(fixture)
+            body["Rows"] = window_rows(body["Rows"], start, end)
+            self._send(200, body)
+        else:
+            rows = synthetic_rows(
+                dataset,
+                region,
+                start,
+                end,
+                step / options.payload_scale,
+                datetime.datetime.now(),
+            )
+            self._send(
+                200,
+                {
+                    "ErrorMessage": None,
+                    "LastUpdated": datetime.datetime.now().strftime(
+                        "%d-%b-%Y %H:%M:%S"
+                    ),
+                    "Rows": rows,
+                    "Status": "Success",
+                },
+            )
+
+    def _send(self, status, body):
+        self._send_text(status, json.dumps(body, separators=(",", ":")))
+
+    def _send_text(self, status, text):
+        payload = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+
+def serve(options):
+    """Runs the stand-in server until interrupted.
+
+    Args:
+        options (argparse.Namespace): The parsed command line, see `main`.
+    """
+    server = ThreadingHTTPServer((options.host, options.port), StandInHandler)
+    server.options = options
+    mode = "recording" if options.record else "serving"
+    print(f"Stand-in EirGrid {mode} on http://{options.host}:{options.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every response"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="random extra seconds, up to this"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of HTTP 500 responses"
+    )
+    parser.add_argument(
+        "--payload-scale",
+        type=int,
+        default=1,
+        help="rows per interval of synthetic data, e.g. 15 for one row per minute",
+    )
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="forward requests to the real services and save the responses as fixtures",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    serve(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -16,8 +16,12 @@ from subs.telegram_func import (
     telegram_carbon_intensity,
     telegram_fuel_mix,
     telegram_personalised_handler,
+    telegram_snsp,
     telegram_wind_analysis,
+    user_region,
 )
+from subs.eirgrid_client import close_clients
+from subs.scheduler import schedule_refresh
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
@@ -126,7 +130,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_first_name = update.message.from_user.first_name
     welcome_message = (
         f"Hello, {user_first_name}! 😃 Welcome to the CleanEnergyBot, your go-to source for electricity insights in Ireland!\n\n"
-        "Use the command /energy_status to check the current energy status. You can also use /feedback to provide feedback "
+        "Use the command /energy_status to check the current energy status and /region to choose between the Republic of Ireland, "
+        "Northern Ireland or the whole island. You can also use /feedback to provide feedback "
         "or /about to learn more about this bot and how it can help you make smarter energy decisions and contribute to a more sustainable future.\n\n"
         "What would you like to do today?"
     )
@@ -153,6 +158,7 @@ async def help_command(update: Update, context: CallbackContext) -> None:
         "Use the command /energy_status to kick off your inquiry. I’ll guide you through a simple selection process to understand your needs. "
         "Based on real-time data analysis, I'll provide energy usage recommendations to help you be more eco-friendly. "
         "Additionally, you’ll receive a colour-coded image to visually guide you in scheduling your day’s energy consumption efficiently. "
+        "Use /snsp to see how much of the island's electricity comes from wind, solar and imports today. "
         "With my help, you can make your energy usage as green as possible!"
     )
 
@@ -169,6 +175,33 @@ async def about_command(update: Update, context: CallbackContext) -> None:
     )
 
 
+async def region_command(update: Update, context: CallbackContext) -> None:
+    """
+    Shows or sets the region used for the user's energy insights, e.g. /region NI.
+    """
+    if context.args and context.args[0].upper() in REGIONS:
+        region = context.args[0].upper()
+        if region != user_region(context):
+            # The stored summary for personalised advice belongs to the previous region
+            context.user_data.pop("quantile_summary_text", None)
+        context.user_data["region"] = region
+        await update.message.reply_text(
+            f"📍 Done! Your energy insights are now for {REGION_NAMES[region]}."
+        )
+    else:
+        await update.message.reply_text(
+            f"📍 Your energy insights are currently for {REGION_NAMES[user_region(context)]}.\n"
+            "Use /region ROI for the Republic of Ireland, /region NI for Northern Ireland or /region ALL for the whole island."
+        )
+
+
+async def snsp_command(update: Update, context: CallbackContext) -> None:
+    """
+    Sends today's System Non-Synchronous Penetration curve and peak, e.g. /snsp.
+    """
+    await telegram_snsp(update, context, update.message.from_user.first_name)
+
+
 async def cancel(update: Update, context) -> int:
     """
     Sends a message that the conversation is canceled and ends the conversation asynchronously.
@@ -336,6 +369,13 @@ async def follow_up_handler(update: Update, context: CallbackContext) -> int:
         return ConversationHandler.END
 
 
+async def post_shutdown(application: Application) -> None:
+    """
+    Closes the pooled EirGrid HTTP connections once the bot stops.
+    """
+    await close_clients()
+
+
 def main() -> None:
     """
     Entry point of the program.
@@ -346,7 +386,9 @@ def main() -> None:
     """
     token = Telegram_energy_api  # os.environ.get("Telegram_energy_api")
     # Create the Application instance
-    application = Application.builder().token(token).build()
+    application = (
+        Application.builder().token(token).post_shutdown(post_shutdown).build()
+    )
 
     # SELECT_OPTION, FOLLOW_UP, FEEDBACK = range(3)  # Correctly define states
 
@@ -403,6 +445,8 @@ def main() -> None:
     )  # Global handler
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("about", about_command))
+    application.add_handler(CommandHandler("region", region_command))
+    application.add_handler(CommandHandler("snsp", snsp_command))
     application.add_handler(CommandHandler("SocialMedia", follow_up))
     application.add_handler(CommandHandler("feedback", feedback_command))
     application.add_handler(
@@ -412,6 +456,9 @@ def main() -> None:
         CommandHandler("personal_advice", personalised_recommendations_handler)
     )
 
+    # Keep the EirGrid datasets warm so handlers do not wait for upstream requests
+    schedule_refresh(application.job_queue)
+
     application.run_polling()
 
 
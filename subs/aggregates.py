@@ -0,0 +1,254 @@
+import numpy as np
+import pandas as pd
+from subs.ring_buffer import SLOT_SECONDS, RING_SLOTS
+
+HOUR_SECONDS = 60 * 60
+DAY_SECONDS = 24 * HOUR_SECONDS
+
+# (area, region) -> AggregatePyramid over the ring buffer of the same area and region
+_pyramids = {}
+
+
+def _empty():
+    return {
+        "count": 0,
+        "sum": 0.0,
+        "min": np.nan,
+        "min_time": None,
+        "max": np.nan,
+        "max_time": None,
+    }
+
+
+def _aggregate(first, values):
+    """Returns the aggregate of consecutive slot values starting at time `first`, ignoring NaN."""
+    valid = ~np.isnan(values)
+    count = int(valid.sum())
+    if not count:
+        return _empty()
+    low, high = np.nanargmin(values), np.nanargmax(values)
+    return {
+        "count": count,
+        "sum": float(values[valid].sum()),
+        "min": float(values[low]),
+        "min_time": first + int(low) * SLOT_SECONDS,
+        "max": float(values[high]),
+        "max_time": first + int(high) * SLOT_SECONDS,
+    }
+
+
+def _combine(parts):
+    """Combines aggregates of consecutive ranges, given in time order, keeping the first time of a tie."""
+    total = _empty()
+    for part in parts:
+        if not part["count"]:
+            continue
+        total["count"] += part["count"]
+        total["sum"] += part["sum"]
+        if not part["min"] >= total["min"]:
+            total["min"], total["min_time"] = part["min"], part["min_time"]
+        if not part["max"] <= total["max"]:
+            total["max"], total["max_time"] = part["max"], part["max_time"]
+    return total
+
+
+class _Level:
+    """Aggregates of fixed-width buckets, kept in arrays indexed by bucket number modulo their size."""
+
+    def __init__(self, width, size):
+        self.width = width
+        self.size = size
+        # Start time of the bucket held at each position, -1 where none was computed yet
+        self.time = np.full(size, -1, dtype=np.int64)
+        self.count = np.zeros(size, dtype=np.int64)
+        self.sum = np.zeros(size)
+        self.min = np.full(size, np.nan)
+        self.min_time = np.zeros(size, dtype=np.int64)
+        self.max = np.full(size, np.nan)
+        self.max_time = np.zeros(size, dtype=np.int64)
+
+    def put(self, start, aggregate):
+        position = start // self.width % self.size
+        self.time[position] = start
+        self.count[position] = aggregate["count"]
+        self.sum[position] = aggregate["sum"]
+        self.min[position] = aggregate["min"]
+        self.max[position] = aggregate["max"]
+        self.min_time[position] = aggregate["min_time"] or 0
+        self.max_time[position] = aggregate["max_time"] or 0
+
+    def get(self, start):
+        """Returns the aggregate of the bucket starting at `start`, or None if it is not held."""
+        position = start // self.width % self.size
+        if self.time[position] != start:
+            return None
+        if not self.count[position]:
+            return _empty()
+        return {
+            "count": int(self.count[position]),
+            "sum": float(self.sum[position]),
+            "min": float(self.min[position]),
+            "min_time": int(self.min_time[position]),
+            "max": float(self.max[position]),
+            "max_time": int(self.max_time[position]),
+        }
+
+
+class AggregatePyramid:
+    """Count, sum, min and max with the times of the min and max of a ring buffer, by hour and by day.
+
+    The quarter-hour level is the ring buffer itself. Hours are recomputed from their four slots when one of
+    them is written, and days from their hours, so a query over any range combines at most a few slots and
+    hours at each end with the whole hours and days in between.
+    """
+
+    def __init__(self, ring):
+        self.ring = ring
+        span = RING_SLOTS * SLOT_SECONDS
+        self.hours = _Level(HOUR_SECONDS, span // HOUR_SECONDS + 2)
+        self.days = _Level(DAY_SECONDS, span // DAY_SECONDS + 2)
+
+    def refresh(self, times):
+        """Recomputes the hours and days that contain the given slot times, after they were written.
+
+        Args:
+            times (np.ndarray): int64 seconds since the epoch of the written slots.
+        """
+        if len(times) == 0 or self.ring.head_time is None:
+            return
+        oldest = self.ring.head_time - (self.ring.slots - 1) * SLOT_SECONDS
+        times = times[times >= oldest - HOUR_SECONDS]
+        hours = np.unique(times - times % HOUR_SECONDS)
+        for hour in hours.tolist():
+            last = hour + HOUR_SECONDS - SLOT_SECONDS
+            self.hours.put(hour, _aggregate(*self.ring.window(hour, last)))
+        for day in np.unique(hours - hours % DAY_SECONDS).tolist():
+            parts = (
+                self.hours.get(hour)
+                for hour in range(day, day + DAY_SECONDS, HOUR_SECONDS)
+            )
+            self.days.put(day, _combine(part for part in parts if part is not None))
+
+    def _slot(self, time):
+        return _aggregate(*self.ring.window(time, time))
+
+    def query(self, start, end):
+        """Returns the aggregate of the slots from `start` to `end` that are held in the ring buffer.
+
+        Args:
+            start (int): Seconds since the epoch of the first slot (inclusive).
+            end (int): Seconds since the epoch of the last slot (inclusive).
+
+        Returns:
+            dict: 'count', 'sum', 'min', 'min_time', 'max' and 'max_time', with NaN and None if no value is
+            published in the range.
+        """
+        if self.ring.head_time is None:
+            return _empty()
+        oldest = self.ring.head_time - (self.ring.slots - 1) * SLOT_SECONDS
+        time = max(-(-start // SLOT_SECONDS) * SLOT_SECONDS, oldest)
+        end = min(end - end % SLOT_SECONDS, self.ring.head_time)
+
+        parts = []
+        while time <= end:
+            for level in (self.days, self.hours):
+                whole = (
+                    time % level.width == 0 and time + level.width - SLOT_SECONDS <= end
+                )
+                part = level.get(time) if whole else None
+                if part is not None:
+                    parts.append(part)
+                    time += level.width
+                    break
+            else:
+                parts.append(self._slot(time))
+                time += SLOT_SECONDS
+        return _combine(parts)
+
+
+class DailyAggregates:
+    """Aggregates of whole days of a quarter-hourly series, for spans longer than a ring buffer holds.
+
+    A day is recomputed from its values whenever they may have changed, so a query over a week combines at most
+    seven buckets.
+    """
+
+    def __init__(self, days):
+        self.days = _Level(DAY_SECONDS, days + 1)
+
+    def put_day(self, day, times, values):
+        """Recomputes the aggregate of a day from its published values.
+
+        Args:
+            day (int): Seconds since the epoch of the day's midnight.
+            times (np.ndarray): int64 seconds since the epoch of the values, all within the day.
+            values (np.ndarray): float64 values, NaN where nothing is published.
+        """
+        slots = np.full(DAY_SECONDS // SLOT_SECONDS, np.nan)
+        slots[(times - day) // SLOT_SECONDS] = values
+        self.days.put(day, _aggregate(day, slots))
+
+    def held(self, day):
+        """Returns True if the aggregate of the day starting at `day` is held."""
+        return self.days.get(day) is not None
+
+    def query(self, first_day, last_day):
+        """Returns the aggregate of the days held from `first_day` to `last_day` (inclusive), see
+        `AggregatePyramid.query`."""
+        parts = (
+            self.days.get(day)
+            for day in range(first_day, last_day + DAY_SECONDS, DAY_SECONDS)
+        )
+        return _combine(part for part in parts if part is not None)
+
+
+def get_pyramid(area, region, ring):
+    """Returns the aggregate pyramid of an area and region, creating an empty one over `ring` if needed."""
+    pyramid = _pyramids.get((area, region))
+    if pyramid is None or pyramid.ring is not ring:
+        pyramid = _pyramids[(area, region)] = AggregatePyramid(ring)
+    return pyramid
+
+
+def range_stats(pyramid, start, end):
+    """Returns the statistics of a range of slots, see `AggregatePyramid.query`.
+
+    Only published values are counted: gaps interpolated by `fill_gaps` do not change the min and max, as
+    interpolated values lie between their neighbours, and move the mean only slightly.
+
+    Args:
+        pyramid (AggregatePyramid): The pyramid of the area and region.
+        start (datetime): The first slot of the range.
+        end (datetime): The last slot of the range.
+
+    Returns:
+        dict: 'mean', 'min', 'max', 'count', and 'time_of_min' and 'time_of_max' as timestamps (None if no value
+        is published in the range).
+    """
+    return aggregate_stats(
+        pyramid.query(
+            int(pd.Timestamp(start).value // 10**9),
+            int(pd.Timestamp(end).value // 10**9),
+        )
+    )
+
+
+def aggregate_stats(aggregate):
+    """Converts an aggregate of `AggregatePyramid.query` or `DailyAggregates.query` into statistics.
+
+    Returns:
+        dict: See `range_stats`.
+    """
+    count = aggregate["count"]
+
+    def as_time(seconds):
+        return None if seconds is None else pd.Timestamp(seconds, unit="s")
+
+    return {
+        "mean": aggregate["sum"] / count if count else np.nan,
+        "min": aggregate["min"],
+        "max": aggregate["max"],
+        "count": count,
+        "time_of_min": as_time(aggregate["min_time"]),
+        "time_of_max": as_time(aggregate["max_time"]),
+    }
@@ -0,0 +1,166 @@
+import datetime
+import numpy as np
+import pandas as pd
+from subs.gap_fill import fill_gaps
+
+# EirGrid publishes most dashboard series every quarter hour
+QUARTER_HOUR = datetime.timedelta(minutes=15)
+
+
+def interpolate_published(series):
+    """Interpolates gaps between published values, leaving the not yet published tail and long outages empty.
+
+    Args:
+        series (pd.Series): Values of one field indexed by time.
+
+    Returns:
+        pd.Series: The series with gaps of up to `subs.gap_fill.MAX_GAP` filled.
+    """
+    values = series.to_numpy(dtype=np.float64, copy=True)
+    fill_gaps(values, series.index)
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+# Area name -> how the dashboard publishes it:
+#   cadence: spacing of the published values, or None where there is no fixed interval
+#   unit: unit of 'Value'
+#   fields: True if the area returns several FieldNames per time (e.g. one per fuel), which are kept apart
+#   aligned: False for areas that are not time series and cannot be put on a shared time index
+#   postprocess: function applied to each field's series before alignment, or None
+AREAS = {
+    "CO2Stats": {
+        "description": "Daily CO2 intensity statistics",
+        "cadence": None,
+        "unit": "gCO2/kWh",
+        "fields": True,
+        "aligned": False,
+        "postprocess": None,
+    },
+    "generationactual": {
+        "description": "Actual system generation",
+        "cadence": QUARTER_HOUR,
+        "unit": "MW",
+        "fields": False,
+        "aligned": True,
+        "postprocess": interpolate_published,
+    },
+    "co2emission": {
+        "description": "CO2 emissions",
+        "cadence": QUARTER_HOUR,
+        "unit": "tCO2/hr",
+        "fields": False,
+        "aligned": True,
+        "postprocess": interpolate_published,
+    },
+    "co2intensity": {
+        "description": "CO2 intensity",
+        "cadence": QUARTER_HOUR,
+        "unit": "gCO2/kWh",
+        "fields": False,
+        "aligned": True,
+        "postprocess": interpolate_published,
+    },
+    "interconnection": {
+        "description": "Net interconnector flows",
+        "cadence": QUARTER_HOUR,
+        "unit": "MW",
+        "fields": False,
+        "aligned": True,
+        "postprocess": interpolate_published,
+    },
+    "SnspAll": {
+        "description": "System non-synchronous penetration",
+        "cadence": QUARTER_HOUR,
+        "unit": "%",
+        "fields": False,
+        "aligned": True,
+        "postprocess": interpolate_published,
+    },
+    "frequency": {
+        "description": "System frequency",
+        "cadence": None,
+        "unit": "Hz",
+        "fields": False,
+        "aligned": True,
+        "postprocess": None,
+    },
+    "demandactual": {
+        "description": "Actual system demand",
+        "cadence": QUARTER_HOUR,
+        "unit": "MW",
+        "fields": False,
+        "aligned": True,
+        "postprocess": interpolate_published,
+    },
+    "windactual": {
+        "description": "Actual wind generation",
+        "cadence": QUARTER_HOUR,
+        "unit": "MW",
+        "fields": False,
+        "aligned": True,
+        "postprocess": interpolate_published,
+    },
+    "fuelMix": {
+        "description": "Generation by fuel",
+        "cadence": QUARTER_HOUR,
+        "unit": "MW",
+        "fields": True,
+        "aligned": True,
+        "postprocess": None,
+    },
+}
+
+
+def area_info(area):
+    """Returns the registry entry of an EirGrid area.
+
+    Args:
+        area (str): The area name, e.g. "windactual".
+
+    Returns:
+        dict: The entry, see `AREAS`.
+
+    Raises:
+        ValueError: If the area is not in the registry.
+    """
+    try:
+        return AREAS[area]
+    except KeyError:
+        raise ValueError(
+            f"Unknown EirGrid area {area!r}, expected one of {', '.join(AREAS)}"
+        ) from None
+
+
+def align_area(df, area, index):
+    """Puts the raw rows of one area onto a shared time index.
+
+    Fields are averaged over each interval of the index, so finer series such as the frequency are downsampled,
+    and the area's post-processing is applied to each field.
+
+    Args:
+        df (pd.DataFrame): Raw rows as returned by `eirgrid_api` or the local store.
+        area (str): The area the rows belong to.
+        index (pd.DatetimeIndex): The shared, regular time index.
+
+    Returns:
+        pd.DataFrame: One column per field, named after the area, or "area:FIELD" for areas with several fields.
+    """
+    info = area_info(area)
+    if df.empty:
+        columns = [area] if not info["fields"] else []
+        return pd.DataFrame(index=index, columns=columns, dtype=float)
+
+    times = pd.to_datetime(df["EffectiveTime"]).dt.floor(index.freq)
+    if info["fields"]:
+        keys = [times, df["FieldName"].astype(str)]
+    else:
+        keys = [times]
+    values = df["Value"].astype(float).groupby(keys).mean()
+    wide = values.unstack() if info["fields"] else values.to_frame(area)
+    if info["fields"]:
+        wide.columns = [f"{area}:{field}" for field in wide.columns]
+
+    wide = wide.reindex(index)
+    if info["postprocess"] is not None:
+        wide = wide.apply(info["postprocess"])
+    return wide
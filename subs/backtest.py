@@ -0,0 +1,210 @@
+import asyncio
+import datetime
+import numpy as np
+import pandas as pd
+from subs.data_cache import cached_fetch
+from subs.openai_script import categorize_values
+from subs.timeseries_store import (
+    latest_backtest_summary,
+    read_forecast_pairs,
+    store_backtest_summary,
+)
+
+# Lead times (hours between fetching a forecast and its target time) the errors are broken down by
+LEAD_EDGES = [0, 3, 6, 12, 24]
+# The absolute bands of `status_classification` and `optimize_categorize_periods`, in gCO2/kWh
+EU_THRESHOLDS = (250, 500)
+# The quantiles of `find_optimized_relative_periods`
+RELATIVE_QUANTILES = (0.33, 0.66)
+# Target times covered by the nightly backtest whose summary the bot shows
+SUMMARY_DAYS = 90
+# Fewer compared values than this are too few to tell users how reliable the forecast is
+MIN_SUMMARY_COUNT = 96
+
+
+def lead_labels(edges=LEAD_EDGES):
+    """Returns the label of each lead time bucket, e.g. ["0-3h", ..., "24h+"]."""
+    return [f"{low}-{high}h" for low, high in zip(edges, edges[1:])] + [
+        f"{edges[-1]}h+"
+    ]
+
+
+def group_quantiles(groups, values, q):
+    """Returns, for every value, the quantile of the values in its group, as `np.quantile` computes it.
+
+    All groups are handled at once: the values are sorted within their groups and the quantile of each group is
+    interpolated between two positions of the sorted array.
+
+    Args:
+        groups (np.ndarray): The group of each value, e.g. the issue time of its forecast.
+        values (np.ndarray): float64 values without NaN.
+        q (float): The quantile, between 0 and 1.
+
+    Returns:
+        np.ndarray: The quantile of each value's group, one per value.
+    """
+    order = np.lexsort((values, groups))
+    sorted_values, sorted_groups = values[order], groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+
+    position = starts + q * (counts - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    quantiles = sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (
+        position - low
+    )
+    return quantiles[np.searchsorted(sorted_groups[starts], groups)]
+
+
+def relative_codes(groups, values):
+    """Categorises values relative to the other values of their group, like `find_optimized_relative_periods`."""
+    low, high = (group_quantiles(groups, values, q) for q in RELATIVE_QUANTILES)
+    return categorize_values(values, low, high)
+
+
+def _metrics(count, sums):
+    """Returns the metrics of `count` pairs from the sums of their errors and hits."""
+    if not count:
+        return dict(
+            count=0,
+            mae=None,
+            bias=None,
+            rmse=None,
+            eu_hit_rate=None,
+            relative_hit_rate=None,
+        )
+    return {
+        "count": int(count),
+        "mae": float(sums["abs"] / count),
+        "bias": float(sums["error"] / count),
+        "rmse": float(np.sqrt(sums["squared"] / count)),
+        "eu_hit_rate": float(sums["eu_hit"] / count),
+        "relative_hit_rate": float(sums["relative_hit"] / count),
+    }
+
+
+def evaluate(pairs, edges=LEAD_EDGES):
+    """Computes the error metrics of forecasts against the actual intensity.
+
+    The bias is forecast minus actual, so a positive bias means the forecast was too high. A category hit means the
+    forecast put a time in the same Low / Medium / High band as the actual value, either by the absolute
+    `EU_THRESHOLDS` or relative to the other times of the same forecast.
+
+    Args:
+        pairs (pd.DataFrame): Forecasts joined with actuals, as returned by `read_forecast_pairs`.
+        edges (list): Lower edges of the lead time buckets, in hours.
+
+    Returns:
+        dict: 'count', 'forecasts', 'mae', 'bias', 'rmse', 'eu_hit_rate' and 'relative_hit_rate' over all pairs,
+        and the same metrics per lead time bucket under 'by_lead'.
+    """
+    issued = pairs["issued_at"].to_numpy(dtype=np.int64)
+    target = pairs["effective_time"].to_numpy(dtype=np.int64)
+    forecast = pairs["forecast"].to_numpy(dtype=np.float64)
+    actual = pairs["actual"].to_numpy(dtype=np.float64)
+
+    error = forecast - actual
+    eu_hit = categorize_values(forecast, *EU_THRESHOLDS) == categorize_values(
+        actual, *EU_THRESHOLDS
+    )
+    if len(pairs):
+        relative_hit = relative_codes(issued, forecast) == relative_codes(
+            issued, actual
+        )
+    else:
+        relative_hit = np.zeros(0, dtype=bool)
+
+    # Forecasts start at the previous half hour, so slightly negative leads count as the first bucket
+    lead = (target - issued) / 3600
+    bucket = np.digitize(lead, edges[1:])
+    n = len(edges)
+    counts = np.bincount(bucket, minlength=n)
+    sums = {
+        name: np.bincount(bucket, weights, minlength=n)
+        for name, weights in (
+            ("abs", np.abs(error)),
+            ("error", error),
+            ("squared", error**2),
+            ("eu_hit", eu_hit),
+            ("relative_hit", relative_hit),
+        )
+    }
+
+    by_lead = [
+        dict(lead=label, **_metrics(counts[i], {name: sums[name][i] for name in sums}))
+        for i, label in enumerate(lead_labels(edges))
+    ]
+    summary = _metrics(len(pairs), {name: sums[name].sum() for name in sums})
+    summary["forecasts"] = int(len(np.unique(issued)))
+    summary["by_lead"] = by_lead
+    return summary
+
+
+def run_backtest(region, start, end):
+    """Backtests the stored forecasts of a region for target times within a window and keeps the summary.
+
+    Args:
+        region (str): The region ("ROI", "NI" or "ALL").
+        start (datetime): The first target time.
+        end (datetime): The last target time.
+
+    Returns:
+        dict: The summary of `evaluate`, with the 'region', 'start', 'end' and 'computed_at' of the run.
+    """
+    computed_at = datetime.datetime.now().replace(microsecond=0)
+    summary = evaluate(read_forecast_pairs(region, start, end))
+    summary.update(
+        region=region,
+        start=pd.Timestamp(start).isoformat(),
+        end=pd.Timestamp(end).isoformat(),
+        computed_at=computed_at.isoformat(),
+    )
+    store_backtest_summary(region, computed_at, summary)
+    return summary
+
+
+async def backtest_summary_async(region):
+    """Returns the summary of the latest backtest of a region, see `run_backtest`, or None if none ran yet.
+
+    The summary is read from the store once per quarter hour and shared by all chats.
+
+    Args:
+        region (str): The region ("ROI", "NI" or "ALL").
+    """
+    return await cached_fetch(
+        ("backtest", region),
+        lambda: asyncio.to_thread(latest_backtest_summary, region),
+    )
+
+
+def refresh_backtest(region, days=SUMMARY_DAYS):
+    """Backtests the target times of the last `days` days of a region, see `run_backtest`.
+
+    Args:
+        region (str): The region ("ROI", "NI" or "ALL").
+        days (int): The number of days before now to cover.
+
+    Returns:
+        dict: The summary of `run_backtest`.
+    """
+    end = datetime.datetime.now().replace(microsecond=0)
+    return run_backtest(region, end - datetime.timedelta(days=days), end)
+
+
+def reliability_text(summary):
+    """Describes in one line how close the past forecasts of a backtest summary came to the actual intensity.
+
+    Args:
+        summary (dict): A summary of `run_backtest`, or None.
+
+    Returns:
+        str: The line to show users, or None if there is no summary or it compares too few values.
+    """
+    if summary is None or summary["count"] < MIN_SUMMARY_COUNT:
+        return None
+    days = (pd.Timestamp(summary["end"]) - pd.Timestamp(summary["start"])).days
+    return (
+        f"📏 Over the last {days} days, the forecast was off by {summary['mae']:.0f} gCO2/kWh on average and "
+        f"picked the right Low / Medium / High level {summary['eu_hit_rate']:.0%} of the time"
+    )
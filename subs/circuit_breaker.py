@@ -0,0 +1,62 @@
+import contextvars
+import time
+
+# Consecutive failures after which an endpoint's breaker opens
+FAILURE_THRESHOLD = 3
+# Seconds an open breaker waits before a background refresh may probe the endpoint again
+RESET_TIMEOUT = 60.0
+
+# endpoint -> {"failures": consecutive failures, "opened_at": monotonic time the breaker opened, or None}
+_state = {}
+
+# Set for background refreshes, which are the only requests allowed to probe an endpoint whose breaker is open
+background = contextvars.ContextVar("background", default=False)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an endpoint whose breaker is open."""
+
+    def __init__(self, endpoint):
+        super().__init__(f"Circuit breaker for {endpoint} is open")
+        self.endpoint = endpoint
+
+
+def is_open(endpoint):
+    """Returns True while the breaker of an endpoint is open.
+
+    Args:
+        endpoint (str): The endpoint name, e.g. an EirGrid area or "co2_fc".
+    """
+    state = _state.get(endpoint)
+    return state is not None and state["opened_at"] is not None
+
+
+def allow_request(endpoint):
+    """Decides whether a request may be sent to an endpoint.
+
+    Requests always pass while the breaker is closed. While it is open, user requests are refused so they never
+    wait on a failing host, and only background refreshes may probe the endpoint once `RESET_TIMEOUT` has passed.
+
+    Args:
+        endpoint (str): The endpoint name, e.g. an EirGrid area or "co2_fc".
+
+    Returns:
+        bool: True if the request may be sent.
+    """
+    if not is_open(endpoint):
+        return True
+    elapsed = time.monotonic() - _state[endpoint]["opened_at"]
+    return background.get() and elapsed >= RESET_TIMEOUT
+
+
+def record_success(endpoint):
+    """Closes the breaker of an endpoint after a successful request."""
+    _state.pop(endpoint, None)
+
+
+def record_failure(endpoint):
+    """Counts a failed request, opening (or re-opening) the breaker once `FAILURE_THRESHOLD` is reached."""
+    state = _state.setdefault(endpoint, {"failures": 0, "opened_at": None})
+    state["failures"] += 1
+    if state["failures"] >= FAILURE_THRESHOLD:
+        state["opened_at"] = time.monotonic()
@@ -0,0 +1,157 @@
+import asyncio
+import datetime
+import logging
+from subs.circuit_breaker import background
+
+logger = logging.getLogger(__name__)
+
+# key -> (expiry time, cached value), shared by every chat in the process
+_entries = {}
+
+# key -> task currently fetching that key, so concurrent misses share one upstream request
+_in_flight = {}
+
+# key -> background refresh task, started while stale values are served
+_background = {}
+
+# dataset, e.g. (area, region) -> value of its last successful fetch, kept beyond expiry for outages
+_last_good = {}
+
+# dataset -> time its data was last refreshed from EirGrid
+_refreshed_at = {}
+
+
+def next_quarter_hour(dt):
+    """Returns the next 15-minute boundary after a datetime, which is when EirGrid publishes new data.
+
+    Args:
+        dt (datetime): The reference datetime.
+
+    Returns:
+        datetime: The first quarter hour strictly after `dt`.
+    """
+    new_minute = (dt.minute // 15) * 15
+    return dt.replace(minute=new_minute, second=0, microsecond=0) + datetime.timedelta(
+        minutes=15
+    )
+
+
+def mark_refreshed(dataset, at=None):
+    """Records when a dataset was last refreshed from EirGrid.
+
+    Args:
+        dataset (tuple): The dataset identity, e.g. (area, region).
+        at (datetime): The refresh time. Defaults to now.
+    """
+    _refreshed_at[dataset] = at or datetime.datetime.now()
+
+
+def dataset_age(dataset):
+    """Returns how long ago a dataset was last refreshed from EirGrid.
+
+    Args:
+        dataset (tuple): The dataset identity, e.g. (area, region).
+
+    Returns:
+        datetime.timedelta: The age of the data, or None if it was never refreshed.
+    """
+    refreshed_at = _refreshed_at.get(dataset)
+    if refreshed_at is None:
+        return None
+    return datetime.datetime.now() - refreshed_at
+
+
+def _purge_expired(now):
+    # Keys contain the aligned window, so old windows are never asked for again
+    for key in [key for key, (expires_at, _) in _entries.items() if expires_at <= now]:
+        del _entries[key]
+
+
+async def _fill(key, fetch, dataset):
+    value = await fetch()
+    now = datetime.datetime.now()
+    _purge_expired(now)
+    _entries[key] = (next_quarter_hour(now), value)
+    if dataset is not None:
+        _last_good[dataset] = value
+        mark_refreshed(dataset, now)
+    return value
+
+
+def run_in_background(key, refresh):
+    """Runs a refresh in a background task, unless one is already running for the same key.
+
+    Background refreshes may probe endpoints whose circuit breaker is open, so a failing host is retried off
+    the users' request path. Failures are logged.
+
+    Args:
+        key (tuple): Identifies the refresh, so that concurrent requests start it only once.
+        refresh (callable): A coroutine function without arguments.
+    """
+    if key in _background:
+        return
+
+    # The task copies the current context, so the flag only applies to the refresh
+    token = background.set(True)
+    try:
+        task = asyncio.ensure_future(refresh())
+    finally:
+        background.reset(token)
+    _background[key] = task
+
+    def _done(task):
+        _background.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background refresh of {key} failed: {task.exception()!r}")
+
+    task.add_done_callback(_done)
+
+
+async def cached_fetch(key, fetch, dataset=None):
+    """Returns the cached value for a key, fetching it once if it is missing or expired.
+
+    Entries expire at the next 15-minute boundary. Concurrent misses for the same key await a single
+    in-flight fetch, so a burst of users costs one upstream call. Failed fetches are not cached.
+
+    When a `dataset` is given, its last good value is kept beyond expiry. If a fetch fails (e.g. because the
+    endpoint's circuit breaker is open) that value is served instead, see `dataset_age`, and the fetch is retried
+    in the background.
+
+    Args:
+        key (tuple): The cache key, e.g. (area, region, aligned start, aligned end).
+        fetch (callable): A coroutine function without arguments that produces the value.
+        dataset (tuple): The dataset the key belongs to, e.g. (area, region), to enable stale values.
+
+    Returns:
+        The cached or freshly fetched value. Callers must not modify it in place.
+
+    Raises:
+        Exception: Whatever `fetch` raised, if there is no stale value to serve.
+    """
+    entry = _entries.get(key)
+    if entry is not None and entry[0] > datetime.datetime.now():
+        return entry[1]
+
+    # Users do not wait for a refresh that is already retrying a failing endpoint in the background
+    if key in _background and dataset in _last_good:
+        return _last_good[dataset]
+
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fill(key, fetch, dataset))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+
+    try:
+        # Shield the shared task so one cancelled chat does not cancel the fetch for the others
+        return await asyncio.shield(task)
+    except Exception:
+        if dataset not in _last_good:
+            raise
+        run_in_background(key, lambda: _fill(key, fetch, dataset))
+        return _last_good[dataset]
+
+
+def clear_cache():
+    """Drops every cached entry. In-flight fetches and last good values are left alone."""
+    _entries.clear()
@@ -0,0 +1,179 @@
+import asyncio
+import collections
+import time
+import httpx
+import numpy as np
+from urllib.parse import urlsplit
+from subs.circuit_breaker import (
+    CircuitOpenError,
+    allow_request,
+    record_success,
+    record_failure,
+)
+
+# Timeouts (seconds) applied to every EirGrid request
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 20.0
+
+# Connection pool settings, shared by all chats talking to the same host
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 60.0
+
+# Upper bound (seconds) on a whole fetch including its hedged duplicate, so users never wait longer than this
+TOTAL_DEADLINE = 15.0
+
+# A duplicate request is sent once the first one is slower than this percentile of the endpoint's latency
+HEDGE_PERCENTILE = 95
+# Hedge delay (seconds) used until an endpoint has enough samples for a percentile
+DEFAULT_HEDGE_DELAY = 3.0
+MIN_LATENCY_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+# The CO2 forecast host has a broken certificate chain, so SSL verification is disabled for it
+UNVERIFIED_HOSTS = {"www.co2.smartgriddashboard.com"}
+
+# One pooled client per host, e.g. smartgriddashboard.eirgrid.com and www.co2.smartgriddashboard.com
+_clients = {}
+
+# endpoint -> latencies (seconds) of its most recent successful requests
+_latencies = collections.defaultdict(lambda: collections.deque(maxlen=LATENCY_WINDOW))
+
+
+def verifies_tls(url):
+    """Returns whether requests to a URL verify the server certificate, i.e. unless its host is in `UNVERIFIED_HOSTS`.
+
+    Args:
+        url (str): The full request URL, or a bare host name.
+    """
+    host = urlsplit(url).hostname or url
+    return host not in UNVERIFIED_HOSTS
+
+
+def get_client(host):
+    """Returns the pooled async HTTP client for a host, creating it on first use.
+
+    Args:
+        host (str): The host name the client talks to.
+
+    Returns:
+        httpx.AsyncClient: A client with keep-alive connections and explicit connect/read timeouts.
+    """
+    client = _clients.get(host)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            headers={"Connection": "keep-alive"},
+            verify=verifies_tls(host),
+        )
+        _clients[host] = client
+    return client
+
+
+def record_latency(endpoint, seconds):
+    """Records the latency of a successful request to an endpoint.
+
+    Args:
+        endpoint (str): The endpoint name, e.g. an EirGrid area or "co2_fc".
+        seconds (float): How long the request took.
+    """
+    _latencies[endpoint].append(seconds)
+
+
+def latency_percentile(endpoint, percentile=HEDGE_PERCENTILE):
+    """Returns a percentile of an endpoint's recent latencies.
+
+    Args:
+        endpoint (str): The endpoint name, e.g. an EirGrid area or "co2_fc".
+        percentile (float): The percentile to compute, between 0 and 100.
+
+    Returns:
+        float: The latency in seconds, or None while there are fewer than `MIN_LATENCY_SAMPLES` samples.
+    """
+    samples = _latencies.get(endpoint)
+    if samples is None or len(samples) < MIN_LATENCY_SAMPLES:
+        return None
+    return float(np.percentile(samples, percentile))
+
+
+async def _timed_get(url, endpoint):
+    started = time.perf_counter()
+    response = await get_client(urlsplit(url).hostname).get(url)
+    response.raise_for_status()
+    record_latency(endpoint, time.perf_counter() - started)
+    return response.text
+
+
+async def _hedged_get(url, endpoint):
+    hedge_delay = latency_percentile(endpoint)
+    if hedge_delay is None:
+        hedge_delay = DEFAULT_HEDGE_DELAY
+
+    attempts = [asyncio.ensure_future(_timed_get(url, endpoint))]
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=hedge_delay)
+        if not done:
+            # The first request is in the endpoint's tail, so race a duplicate against it
+            attempts.append(asyncio.ensure_future(_timed_get(url, endpoint)))
+
+        # Take the first attempt that succeeds, and only fail once every attempt failed
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for attempt in done:
+                if attempt.exception() is None:
+                    return attempt.result()
+                error = attempt.exception()
+        raise error
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
+
+
+async def fetch_text(url, endpoint=None, deadline=TOTAL_DEADLINE):
+    """Fetches a URL through the pooled client of its host and returns the body.
+
+    If the request is slower than the endpoint's p95 latency, a duplicate request is sent and whichever response
+    arrives first is used. Both attempts together are bounded by `deadline`. Failures feed the endpoint's circuit
+    breaker, and while it is open no request is sent at all.
+
+    Args:
+        url (str): The full request URL.
+        endpoint (str): The name latencies are tracked under, e.g. an EirGrid area. Defaults to the host.
+        deadline (float): The total time in seconds allowed for the fetch.
+
+    Returns:
+        str: The response body, left undecoded so callers can parse it straight into columns.
+
+    Raises:
+        httpx.HTTPError: If every attempt fails or returns an error status.
+        asyncio.TimeoutError: If no attempt succeeds within `deadline`.
+        CircuitOpenError: If the endpoint's circuit breaker is open.
+    """
+    if endpoint is None:
+        endpoint = urlsplit(url).hostname
+    if not allow_request(endpoint):
+        raise CircuitOpenError(endpoint)
+
+    try:
+        text = await asyncio.wait_for(_hedged_get(url, endpoint), deadline)
+    except Exception:
+        record_failure(endpoint)
+        raise
+    record_success(endpoint)
+    return text
+
+
+async def close_clients():
+    """Closes every pooled client. Called when the bot shuts down."""
+    while _clients:
+        _, client = _clients.popitem()
+        await client.aclose()
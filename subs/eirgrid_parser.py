@@ -0,0 +1,93 @@
+import json
+import numpy as np
+import pandas as pd
+from subs.eirgrid_time import decode_effective_times
+from subs.fingerprint import columns_fingerprint
+
+# Key order of a row as EirGrid serialises it, used for the fast path of the decoder
+_ROW_KEYS = ("EffectiveTime", "FieldName", "Region", "Value")
+
+
+def parse_rows(text):
+    """Decodes the "Rows" of an EirGrid JSON response straight into typed columns.
+
+    Rows are collected column by column while the JSON is decoded, so no dictionary is built per row and no
+    list of dictionaries is handed to pandas. Works for both the dashboard service and the co2_fc API.
+
+    Args:
+        text (str): The raw JSON body of the response.
+
+    Returns:
+        dict: Columns keyed by name: 'EffectiveTime' (int64 seconds since the epoch), 'FieldName' and 'Region'
+        (pd.Categorical) and 'Value' (float64, NaN where EirGrid has not published a value), plus the
+        'fingerprint' of their content, see `subs.fingerprint.columns_fingerprint`.
+    """
+    times, fields, regions, values = [], [], [], []
+    add_time, add_field, add_region, add_value = (
+        times.append,
+        fields.append,
+        regions.append,
+        values.append,
+    )
+
+    def collect(pairs):
+        # Fast path: a row with the usual key order is split into the columns without building a dict
+        if (
+            len(pairs) == 4
+            and (pairs[0][0], pairs[1][0], pairs[2][0], pairs[3][0]) == _ROW_KEYS
+        ):
+            add_time(pairs[0][1])
+            add_field(pairs[1][1])
+            add_region(pairs[2][1])
+            add_value(pairs[3][1])
+            return None
+        obj = dict(pairs)
+        if "EffectiveTime" in obj and "Value" in obj:
+            add_time(obj["EffectiveTime"])
+            add_field(obj.get("FieldName"))
+            add_region(obj.get("Region"))
+            add_value(obj["Value"])
+            return None
+        # Anything else is the response envelope
+        return obj
+
+    json.loads(text, object_pairs_hook=collect)
+
+    columns = {
+        "EffectiveTime": decode_effective_times(times),
+        "FieldName": pd.Categorical(fields),
+        "Region": pd.Categorical(regions),
+        "Value": np.array(values, dtype=np.float64),
+    }
+    columns["fingerprint"] = columns_fingerprint(columns)
+    return columns
+
+
+def columns_to_frame(columns):
+    """Builds a DataFrame from columns produced by `parse_rows`, in the shape `eirgrid_api` returns.
+
+    The columns are copied, so callers may modify the frame while the parsed columns stay cached.
+
+    Args:
+        columns (dict): Columns produced by `parse_rows`.
+
+    Returns:
+        pd.DataFrame: A DataFrame with 'EffectiveTime' (datetime), 'FieldName', 'Region' and 'Value' columns,
+        or an empty DataFrame without columns if the response had no rows. `attrs["fingerprint"]` holds the
+        fingerprint of the columns.
+    """
+    if len(columns["Value"]) == 0:
+        frame = pd.DataFrame()
+    else:
+        frame = pd.DataFrame(
+            {
+                "EffectiveTime": columns["EffectiveTime"]
+                .astype("datetime64[s]")
+                .astype("datetime64[ns]"),
+                "FieldName": columns["FieldName"],
+                "Region": columns["Region"],
+                "Value": columns["Value"],
+            }
+        )
+    frame.attrs["fingerprint"] = columns["fingerprint"]
+    return frame
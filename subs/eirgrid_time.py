@@ -0,0 +1,197 @@
+import calendar
+import datetime
+import functools
+import numpy as np
+import pandas as pd
+
+# Format of EirGrid's EffectiveTime strings, e.g. "25-Feb-2024 13:45:00"
+EFFECTIVE_TIME_FORMAT = "%d-%b-%Y %H:%M:%S"
+
+# Byte layout of "dd-Mon-YYYY HH:MM:SS": positions of the separators and of every digit
+_WIDTH = 20
+_SEPARATORS = {2: ord("-"), 6: ord("-"), 11: ord(" "), 14: ord(":"), 17: ord(":")}
+_DIGITS = [0, 1, 7, 8, 9, 10, 12, 13, 15, 16, 18, 19]
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+# Below this many rows rendering the grid costs more than decoding each row
+_GRID_MIN_ROWS = 256
+
+
+@functools.lru_cache(maxsize=None)
+def _month_number(token):
+    """Returns the month number of a three-letter month token such as "Feb", "feb" or b"FEB", or 0 if invalid."""
+    if isinstance(token, bytes):
+        token = token.decode("ascii", "replace")
+    try:
+        return datetime.datetime.strptime(token.title(), "%b").month
+    except ValueError:
+        return 0
+
+
+def parse_effective_time(value):
+    """Parses a single EffectiveTime string into seconds since the epoch.
+
+    Args:
+        value (str): A timestamp such as "25-Feb-2024 13:45:00".
+
+    Returns:
+        int: Seconds since the epoch, treating the (Irish local) wall-clock time as UTC like pandas does.
+    """
+    month = _month_number(value[3:6])
+    if len(value) != _WIDTH or month == 0:
+        return calendar.timegm(
+            datetime.datetime.strptime(value, EFFECTIVE_TIME_FORMAT).timetuple()
+        )
+    return calendar.timegm(
+        (
+            int(value[7:11]),
+            month,
+            int(value[0:2]),
+            int(value[12:14]),
+            int(value[15:17]),
+            int(value[18:20]),
+        )
+    )
+
+
+def _as_chars(times):
+    # One spare byte per string shows whether any string is longer than the expected layout
+    raw = np.array(times, dtype=f"S{_WIDTH + 1}")
+    return raw.view(np.uint8).reshape(len(raw), _WIDTH + 1)
+
+
+def _decode_grid(times, chars):
+    """Decodes a regular series from its first timestamps, verifying every row against the predicted grid.
+
+    Returns None if the series is not a regular, strictly increasing grid.
+    """
+    n = len(times)
+    first, last = parse_effective_time(times[0]), parse_effective_time(times[-1])
+    step = parse_effective_time(times[1]) - first
+    if step <= 0 or last != first + (n - 1) * step:
+        return None
+
+    epochs = first + step * np.arange(n, dtype=np.int64)
+
+    # Render each distinct day and time of day once, then compare the bytes of every row against them
+    days, seconds_of_day = np.divmod(epochs, 86400)
+    day_index = days - days[0]
+    unique_seconds, second_index = np.unique(seconds_of_day, return_inverse=True)
+    day_bytes = np.array(
+        [
+            (_EPOCH + datetime.timedelta(days=day)).strftime("%d-%b-%Y")
+            for day in range(int(days[0]), int(days[-1]) + 1)
+        ],
+        dtype="S11",
+    ).view(np.uint8)
+    time_bytes = np.array(
+        [
+            f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}"
+            for s in unique_seconds.tolist()
+        ],
+        dtype="S8",
+    ).view(np.uint8)
+
+    if (
+        np.array_equal(chars[:, :11], day_bytes.reshape(-1, 11)[day_index])
+        and np.array_equal(chars[:, 12:20], time_bytes.reshape(-1, 8)[second_index])
+        and (chars[:, 11] == ord(" ")).all()
+        and (chars[:, _WIDTH] == 0).all()
+    ):
+        return epochs
+    return None
+
+
+def _decode_rows(times, chars):
+    """Decodes every row with integer arithmetic on its bytes, or returns None if a row is not fixed-width."""
+    chars = chars.astype(np.int64)
+    digits = chars[:, _DIGITS] - ord("0")
+
+    # Only the distinct month tokens (at most a few per response) go through the memoized lookup
+    tokens = (chars[:, 3] << 16) | (chars[:, 4] << 8) | chars[:, 5]
+    unique_tokens, token_index = np.unique(tokens, return_inverse=True)
+    unique_months = np.array(
+        [_month_number(int(token).to_bytes(3, "big")) for token in unique_tokens],
+        dtype=np.int64,
+    )
+    month = unique_months[token_index]
+
+    well_formed = (
+        (chars[:, _WIDTH] == 0).all()
+        and ((digits >= 0) & (digits <= 9)).all()
+        and all((chars[:, pos] == sep).all() for pos, sep in _SEPARATORS.items())
+        and (month > 0).all()
+    )
+    if not well_formed:
+        return None
+
+    day = digits[:, 0] * 10 + digits[:, 1]
+    year = digits[:, 2] * 1000 + digits[:, 3] * 100 + digits[:, 4] * 10 + digits[:, 5]
+    hour = digits[:, 6] * 10 + digits[:, 7]
+    minute = digits[:, 8] * 10 + digits[:, 9]
+    second = digits[:, 10] * 10 + digits[:, 11]
+
+    # Days since the epoch of the first of each month, then add the day of month
+    month_start = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    days = month_start.astype("datetime64[D]").astype(np.int64) + day - 1
+    return days * 86400 + hour * 3600 + minute * 60 + second
+
+
+def decode_effective_times(times):
+    """Decodes EirGrid EffectiveTime strings into int64 seconds since the epoch.
+
+    EirGrid series sit on a regular 15 or 30-minute grid, so the first timestamps are parsed and the rest of the
+    series is predicted from the spacing and verified byte by byte. Short or irregular series are decoded row by row
+    with vectorised integer arithmetic, and strings that do not have the usual fixed width are left to pandas.
+
+    Args:
+        times (sequence of str): Timestamps such as "25-Feb-2024 13:45:00".
+
+    Returns:
+        np.ndarray: int64 seconds since the epoch, one per timestamp.
+    """
+    times = list(times)
+    if not times:
+        return np.empty(0, dtype=np.int64)
+    chars = _as_chars(times)
+
+    epochs = None
+    if len(times) >= _GRID_MIN_ROWS:
+        try:
+            epochs = _decode_grid(times, chars)
+        except ValueError:
+            epochs = None
+    if epochs is None:
+        epochs = _decode_rows(times, chars)
+    if epochs is None:
+        # pandas picks the resolution of the result (ns before 3.0, us since),
+        # so convert through seconds rather than assuming nanoseconds
+        epochs = (
+            pd.to_datetime(np.array(times, dtype=object), format=EFFECTIVE_TIME_FORMAT)
+            .values.astype("datetime64[s]")
+            .astype(np.int64)
+        )
+    return epochs
+
+
+def effective_time_to_datetime(values):
+    """Converts an EffectiveTime column into datetimes, replacing `pd.to_datetime(..., format=EFFECTIVE_TIME_FORMAT)`.
+
+    Columns that already hold datetimes (e.g. read from the local store or built by `columns_to_frame`) are
+    returned unchanged.
+
+    Args:
+        values (pd.Series): The EffectiveTime column.
+
+    Returns:
+        pd.Series: The column as datetime64 values, with the original index and name.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    epochs = decode_effective_times(values.tolist())
+    return pd.Series(
+        epochs.astype("datetime64[s]").astype("datetime64[ns]"),
+        index=values.index,
+        name=values.name,
+    )
@@ -1,5 +1,4 @@
 import requests
-import json
 import pandas as pd
 import datetime
 import matplotlib.pyplot as plt
@@ -7,7 +6,76 @@ import matplotlib.colors as mcolors
 import seaborn as sns
 import matplotlib.dates as mdates
 import numpy as np
+import warnings
 from matplotlib.dates import DateFormatter, HourLocator
+from subs.eirgrid_client import fetch_text, verifies_tls, CONNECT_TIMEOUT, READ_TIMEOUT
+from subs.eirgrid_parser import parse_rows, columns_to_frame
+from subs.eirgrid_time import effective_time_to_datetime
+from subs.data_cache import (
+    cached_fetch,
+    dataset_age,
+    mark_refreshed,
+    run_in_background,
+)
+from subs.timeseries_store import (
+    sync_area,
+    read_window,
+    last_timestamp,
+    store_forecast,
+)
+from subs.areas import QUARTER_HOUR, area_info, align_area
+from subs.gap_fill import fill_gaps, last_valid_position
+from subs.ring_buffer import RING_SLOTS, get_ring, create_ring, update_ring, ring_series
+from subs.wind_ramps import record_ramps
+from subs.aggregates import get_pyramid, range_stats
+import asyncio
+import os
+
+# Base URLs of the EirGrid dashboard service and the CO2 forecast API, overridable to point at a
+# local stand-in server (see benchmarks/stand_in_server.py) for offline benchmarks and load tests
+EIRGRID_BASE_URL = os.environ.get(
+    "EIRGRID_BASE_URL", "http://smartgriddashboard.eirgrid.com"
+)
+CO2_FORECAST_BASE_URL = os.environ.get(
+    "CO2_FORECAST_BASE_URL", "https://www.co2.smartgriddashboard.com"
+)
+
+# Regions published by EirGrid: Republic of Ireland, Northern Ireland and both combined
+REGIONS = ["ROI", "NI", "ALL"]
+DEFAULT_REGION = "ALL"
+REGION_NAMES = {
+    "ROI": "the Republic of Ireland",
+    "NI": "Northern Ireland",
+    "ALL": "Ireland",
+}
+
+
+def eirgrid_url(area, region, start_time, end_time):
+    """Builds the EirGrid dashboard URL for a specified area and region within a given time range.
+
+    Args:
+        area (str): The data area of interest, see `eirgrid_api` for valid values.
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+        start_time (str): The start time as produced by `format_date`.
+        end_time (str): The end time as produced by `format_date`.
+
+    Returns:
+        str: The request URL.
+    """
+    return f"{EIRGRID_BASE_URL}/DashboardService.svc/data?area={area}&region={region}&datefrom={start_time}&dateto={end_time}"
+
+
+async def fetch_rows(url, endpoint):
+    """Fetches an EirGrid URL without blocking the event loop and decodes its rows into typed columns.
+
+    Args:
+        url (str): The full request URL.
+        endpoint (str): The name the request's latency is tracked under, e.g. the EirGrid area.
+
+    Returns:
+        dict: Columns as produced by `parse_rows`.
+    """
+    return parse_rows(await fetch_text(url, endpoint))
 
 
 def eirgrid_api(area, region, start_time, end_time):
@@ -16,7 +84,7 @@ def eirgrid_api(area, region, start_time, end_time):
     Args:
         area (str): The data area of interest. Valid values include "CO2Stats", "generationactual",
                     "co2emission", "co2intensity", "interconnection", "SnspAll", "frequency",
-                    "demandactual", "windactual", "fuelMix".
+                    "demandactual", "windactual", "fuelMix", see `subs.areas.AREAS`.
         region (str): The region for which the data is requested. Options are "ROI" (Republic of Ireland),
                       "NI" (Northern Ireland), or "ALL" for both.
         start_time (str): The start time for the data request in 'YYYY-MM-DD' format.
@@ -25,27 +93,192 @@ def eirgrid_api(area, region, start_time, end_time):
     Returns:
         pd.DataFrame: A DataFrame containing the requested data.
     """
-    #     area = [
-    #     "CO2Stats",
-    #     "generationactual",
-    #     "co2emission",
-    #     "co2intensity",
-    #     "interconnection",
-    #     "SnspAll",
-    #     "frequency",
-    #     "demandactual",
-    #     "windactual",
-    #     "fuelMix"
-    # ]
-    #     region = ["ROI", "NI", "ALL"]
-    Rows = []
-    url = f"http://smartgriddashboard.eirgrid.com/DashboardService.svc/data?area={area}&region={region}&datefrom={start_time}&dateto={end_time}"
-    response = requests.get(url)
-    Rs = json.loads(response.text)["Rows"]
-    for row in Rs:
-        Rows.append(row)
-
-    return pd.DataFrame(Rows)
+    url = eirgrid_url(area, region, start_time, end_time)
+    response = requests.get(
+        url, verify=verifies_tls(url), timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+    )
+    return columns_to_frame(parse_rows(response.text))
+
+
+async def eirgrid_api_async(area, region, start_time, end_time, allow_stale=False):
+    """Awaitable version of `eirgrid_api` that does not block the event loop.
+
+    The request goes through the pooled client of the EirGrid host, so other chats are served while it waits.
+    Responses are cached until the next 15-minute boundary and concurrent misses share one request.
+
+    Args:
+        area (str): The data area of interest, see `eirgrid_api` for valid values.
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+        start_time (str): The start time as produced by `format_date`.
+        end_time (str): The end time as produced by `format_date`.
+        allow_stale (bool): Serve the last good response of this area and region if EirGrid fails, see `dataset_age`.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the requested data.
+    """
+    url = eirgrid_url(area, region, start_time, end_time)
+
+    # The window is aligned to 15 minutes, so every chat in the same window shares one cached response
+    columns = await cached_fetch(
+        (area, region, start_time, end_time),
+        lambda: fetch_rows(url, area),
+        dataset=(area, region) if allow_stale else None,
+    )
+    return columns_to_frame(columns)
+
+
+def write_recent(area, region, df):
+    """Writes rows into the ring buffer of an area and region, if it has one, and refreshes its aggregates.
+
+    Args:
+        area (str): The data area of the rows.
+        region (str): The region of the rows.
+        df (pd.DataFrame): Raw rows as returned by `eirgrid_api` or the local store.
+    """
+    ring = get_ring(area, region)
+    if ring is not None:
+        get_pyramid(area, region, ring).refresh(update_ring(ring, df))
+
+
+async def sync_window_async(area, region, start):
+    """Brings the local store up to date for an area and region, fetching only the missing intervals from EirGrid.
+
+    New rows are also written into the area's ring buffer, if it has one, and new windactual rows are run through
+    the wind ramp detector, see `subs.wind_ramps`. If EirGrid fails (or its circuit breaker is open) and rows of
+    the window are already stored, those are served instead, see `dataset_age`, and the sync is retried in the
+    background.
+
+    Args:
+        area (str): The data area of interest, see `eirgrid_api` for valid values.
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+        start (datetime): The start of the window, fetched as well if the store starts later, see `sync_area`.
+    """
+    dataset = (area, region)
+
+    async def fetch(area, region, start, end):
+        df = await eirgrid_api_async(area, region, format_date(start), format_date(end))
+        mark_refreshed(dataset)
+        write_recent(area, region, df)
+        if area == "windactual":
+            try:
+                await record_ramps(region, df)
+            except Exception:
+                # Ramp detection is best effort, the rows are served either way
+                pass
+        return df
+
+    try:
+        await sync_area(area, region, start, fetch)
+    except Exception:
+        last = await asyncio.to_thread(last_timestamp, area, region)
+        if last is None or last < start:
+            # Nothing stored for this window, so there is nothing to fall back to
+            raise
+        run_in_background(
+            ("sync", area, region), lambda: sync_area(area, region, start, fetch)
+        )
+        if dataset_age(dataset) is None:
+            mark_refreshed(dataset, last)
+
+
+async def stored_window_async(area, region, start, end):
+    """Reads a window of an area from the local store after syncing only the missing intervals from EirGrid.
+
+    If EirGrid fails the rows already stored are returned, see `sync_window_async`.
+
+    Args:
+        area (str): The data area of interest, see `eirgrid_api` for valid values.
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+        start (datetime): The start of the window.
+        end (datetime): The end of the window.
+
+    Returns:
+        pd.DataFrame: A DataFrame in the same shape as `eirgrid_api` returns, with parsed 'EffectiveTime' values.
+    """
+    await sync_window_async(area, region, start)
+    return await asyncio.to_thread(read_window, area, region, start, end)
+
+
+async def recent_window_async(area, region, start, end):
+    """Returns a window of the last 48 hours of an area from its ring buffer, after syncing the new intervals.
+
+    The ring buffer is loaded from the local store the first time an area and region is requested, and is kept
+    up to date by `sync_window_async` from then on, so no DataFrame is rebuilt per request.
+
+    Args:
+        area (str): A single-field area published every quarter hour, e.g. "windactual".
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+        start (datetime): The start of the window, at most 48 hours ago.
+        end (datetime): The end of the window.
+
+    Returns:
+        pd.Series: 'Value' indexed by 'EffectiveTime' at every quarter hour, NaN where nothing is published. The
+        values are a read-only view of the ring buffer, valid until the next await, see
+        `subs.ring_buffer.ring_series`.
+    """
+    if get_ring(area, region) is None:
+        # Loaded without yielding to the event loop, so no sync can write new rows in between
+        create_ring(area, region)
+        write_recent(
+            area,
+            region,
+            read_window(area, region, end - RING_SLOTS * QUARTER_HOUR, end),
+        )
+
+    await sync_window_async(area, region, start)
+    return ring_series(get_ring(area, region), start, end)
+
+
+def recent_stats(area, region, start, end):
+    """Returns the statistics of a range of the last 48 hours from the precomputed aggregates of an area.
+
+    Call `recent_window_async` first, so the ring buffer of the area and region exists and is up to date.
+
+    Args:
+        area (str): A single-field area published every quarter hour, e.g. "windactual".
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+        start (datetime): The first quarter hour of the range.
+        end (datetime): The last quarter hour of the range.
+
+    Returns:
+        dict: 'mean', 'min', 'max', 'count', 'time_of_min' and 'time_of_max', see `subs.aggregates.range_stats`.
+    """
+    return range_stats(get_pyramid(area, region, get_ring(area, region)), start, end)
+
+
+async def fetch_areas_aligned(areas, region, start, end, freq=QUARTER_HOUR):
+    """Fetches several areas for the same window concurrently and aligns them on one shared time index.
+
+    Each area is read from the local store (see `stored_window_async`) and post-processed as described in
+    `subs.areas.AREAS`. Areas published more often than `freq` are averaged over each interval.
+
+    Args:
+        areas (list): EirGrid areas, e.g. ["windactual", "demandactual"].
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+        start (datetime): The start of the window.
+        end (datetime): The end of the window.
+        freq (datetime.timedelta): The spacing of the shared index.
+
+    Returns:
+        pd.DataFrame: One column per area (or "area:FIELD" for areas with several fields, such as fuelMix), indexed
+        by 'EffectiveTime'. Times not published yet are NaN.
+
+    Raises:
+        ValueError: If an area is unknown or is not a time series, such as CO2Stats.
+    """
+    for area in areas:
+        if not area_info(area)["aligned"]:
+            raise ValueError(f"EirGrid area {area!r} cannot be aligned on a time index")
+
+    frames = await asyncio.gather(
+        *(stored_window_async(area, region, start, end) for area in areas)
+    )
+    index = pd.date_range(
+        pd.Timestamp(start).ceil(freq), end, freq=freq, name="EffectiveTime"
+    )
+    return pd.concat(
+        [align_area(df, area, index) for area, df in zip(areas, frames)], axis=1
+    )
 
 
 # Function to round time to the nearest 15 minutes
@@ -76,14 +309,12 @@ def format_date(dt):
     return dt.strftime("%d-%b-%Y").lower() + "+" + dt.strftime("%H%%3A%M")
 
 
-def carbon_api_forecast():
-    """
-    Fetches CO2 emission forecast data for a specified region within a 24-hour period starting from the nearest half-hour mark.
-
-    The function rounds down the current time to the nearest half-hour to align with data availability, sets the end time to the end of the current day, and then constructs and sends a request to the CO2 forecast API for the specified region. The response is processed into a pandas DataFrame, indexed by the effective time of each forecast.
+def carbon_forecast_time():
+    """Generate start and end date and time strings for the remainder of today's CO2 forecast.
 
     Returns:
-        pd.DataFrame: A DataFrame containing CO2 emission forecast data, indexed by effective time, or None if an error occurs.
+        Tuple[str, str]: A tuple containing the start time, rounded down to the nearest half-hour,
+        and the end time (23:59 today), both formatted as 'YYYYMMDDHHMM'.
     """
 
     # data is availble every 30 minutes, so we need to start at the nearest half-hour
@@ -92,112 +323,252 @@ def carbon_api_forecast():
         new_minute = 30 if dt.minute >= 30 else 0
         return dt.replace(minute=new_minute, second=0, microsecond=0)
 
-    # Function to create the API URL based on the start and end datetimes and the region
-    def create_url(start_datetime, end_datetime, region):
-        start_str = start_datetime.strftime("%Y%m%d%H%M")
-        end_str = end_datetime.strftime("%Y%m%d%H%M")
-        url = f"https://www.co2.smartgriddashboard.com/api/co2_fc/{start_str}/{end_str}/{region}"
-        return url
+    # Current date and time
+    now = datetime.datetime.now()
+    # Round down to the nearest half-hour
+    start_time = round_down_time(now)
+    # For end time, let's use 24 hours from now
+    end_time = now.replace(
+        hour=23, minute=59, second=59, microsecond=0
+    )  # now + timedelta(days=1)
+
+    return start_time.strftime("%Y%m%d%H%M"), end_time.strftime("%Y%m%d%H%M")
+
+
+def carbon_forecast_url(start_time, end_time, region):
+    """Builds the CO2 forecast API URL for a region within a given time range.
+
+    Args:
+        start_time (str): The start time in 'YYYYMMDDHHMM' format.
+        end_time (str): The end time in 'YYYYMMDDHHMM' format.
+        region (str): The region for which the forecast is requested ("ROI", "NI" or "ALL").
+
+    Returns:
+        str: The request URL.
+    """
+    return f"{CO2_FORECAST_BASE_URL}/api/co2_fc/{start_time}/{end_time}/{region}"
+
+
+def process_carbon_forecast(columns):
+    """
+    Converts a decoded CO2 forecast response into a DataFrame indexed by effective time, dropping trailing empty rows.
+
+    Args:
+        columns (dict): The response rows decoded by `parse_rows`.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing CO2 emission forecast data, indexed by effective time, with the fingerprint of the response in `attrs["fingerprint"]`.
+    """
+    # Select rows up to the last forecast value, then build the indexed frame once from the parsed columns.
+    # The frame gets its own copy, so the cached columns stay untouched when columns are added later
+    end = last_valid_position(columns["Value"]) + 1
+    df_carbon_forecast = pd.DataFrame(
+        {
+            "FieldName": columns["FieldName"][:end],
+            "Region": columns["Region"][:end],
+            "Value": columns["Value"][:end],
+        },
+        index=pd.DatetimeIndex(
+            columns["EffectiveTime"][:end]
+            .astype("datetime64[s]")
+            .astype("datetime64[ns]"),
+            name="EffectiveTime",
+        ),
+        copy=True,
+    )
+    df_carbon_forecast.attrs["fingerprint"] = columns["fingerprint"]
+    return df_carbon_forecast
+
 
+def carbon_api_forecast(region=DEFAULT_REGION):
+    """
+    Fetches CO2 emission forecast data for a specified region within a 24-hour period starting from the nearest half-hour mark.
+
+    The function rounds down the current time to the nearest half-hour to align with data availability, sets the end time to the end of the current day, and then constructs and sends a request to the CO2 forecast API for the specified region. The response is processed into a pandas DataFrame, indexed by the effective time of each forecast.
+
+    Args:
+        region (str): The region for which the forecast is requested ("ROI", "NI" or "ALL").
+
+    Returns:
+        pd.DataFrame: A DataFrame containing CO2 emission forecast data, indexed by effective time, or None if an error occurs.
+    """
     try:
-        # Current date and time
-        now = datetime.datetime.now()
-        # Round down to the nearest half-hour
-        start_time = round_down_time(now)
-        # For end time, let's use 24 hours from now
-        end_time = now.replace(
-            hour=23, minute=59, second=59, microsecond=0
-        )  # now + timedelta(days=1)
-
-        # Define the region
-        region = ["ROI", "NI", "ALL"]
+        startDateTime, endDateTime = carbon_forecast_time()
 
         # Create the URL
-        api_url = create_url(start_time, end_time, region[2])
+        api_url = carbon_forecast_url(startDateTime, endDateTime, region)
 
-        # Make a request with SSL verification disabled due to existing issue from EirGrid
-        response = requests.get(api_url, verify=False)
+        # SSL verification is disabled only for the hosts with a known certificate issue, see `UNVERIFIED_HOSTS`
+        response = requests.get(
+            api_url,
+            verify=verifies_tls(api_url),
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+        )
 
-        Rs = response.json()
+        return process_carbon_forecast(parse_rows(response.text))
+
+    except Exception:
+        # Return None or an error message to indicate failure
+        return None
+
+
+# region -> fingerprint of the last forecast written to the store, so an unchanged forecast is stored once
+_archived_forecasts = {}
 
-        df_carbon_forecast = pd.DataFrame(Rs["Rows"])
 
-        # Convert 'EffectiveTime' to datetime and set as index
-        df_carbon_forecast["EffectiveTime"] = pd.to_datetime(
-            df_carbon_forecast["EffectiveTime"], format="%d-%b-%Y %H:%M:%S"
+async def archive_forecast(region, columns):
+    """Stores a freshly fetched co2_fc forecast for backtesting, unless it is the same as the last one stored.
+
+    Args:
+        region (str): The region of the forecast ("ROI", "NI" or "ALL").
+        columns (dict): The forecast rows decoded by `parse_rows`.
+    """
+    if _archived_forecasts.get(region) == columns["fingerprint"]:
+        return
+    try:
+        await asyncio.to_thread(
+            store_forecast,
+            region,
+            datetime.datetime.now().replace(microsecond=0),
+            columns,
         )
-        df_carbon_forecast_indexed = df_carbon_forecast.set_index("EffectiveTime")
+    except Exception:
+        # Backtesting data is best effort, the forecast is served either way
+        return
+    _archived_forecasts[region] = columns["fingerprint"]
 
-        last_value_index_co_forecast = df_carbon_forecast_indexed[
-            "Value"
-        ].last_valid_index()
 
-        # Select rows up to the row before the last NaN
-        df_carbon_forecast_indexed = df_carbon_forecast_indexed.loc[
-            :last_value_index_co_forecast
-        ]
+async def carbon_api_forecast_async(region=DEFAULT_REGION):
+    """
+    Awaitable version of `carbon_api_forecast` that does not block the event loop.
 
-        return df_carbon_forecast_indexed
+    Args:
+        region (str): The region for which the forecast is requested ("ROI", "NI" or "ALL").
+
+    Returns:
+        pd.DataFrame: A DataFrame containing CO2 emission forecast data, indexed by effective time, or None if an error occurs.
+    """
+    try:
+        startDateTime, endDateTime = carbon_forecast_time()
+
+        # Create the URL
+        api_url = carbon_forecast_url(startDateTime, endDateTime, region)
+
+        async def fetch():
+            columns = await fetch_rows(api_url, "co2_fc")
+            await archive_forecast(region, columns)
+            return columns
+
+        # Every chat asking within the same window shares one cached response
+        columns = await cached_fetch(
+            ("co2_fc", region, startDateTime, endDateTime),
+            fetch,
+            dataset=("co2_fc", region),
+        )
+        return process_carbon_forecast(columns)
 
     except Exception:
         # Return None or an error message to indicate failure
         return None
 
 
-def carbon_api_intensity():
+def day_before_time():
+    """Generate start and end date and time strings covering the last 24 hours.
+
+    Returns:
+        Tuple[str, str]: A tuple containing the start date and time string (same time yesterday)
+        and the end date and time string (now), both rounded to the nearest 15 minutes and
+        formatted by `format_date`.
+    """
+    # Current date and time, rounded to the nearest 15 minutes
+    now = round_time(datetime.datetime.now())
+
+    # Start time (same time yesterday, rounded to the nearest 15 minutes)
+    yesterday = now - datetime.timedelta(days=1)
+    startDateTime = format_date(yesterday)
+
+    # End time (current time, rounded to the nearest 15 minutes)
+    endDateTime = format_date(now)
+
+    return startDateTime, endDateTime
+
+
+def process_carbon_intensity(df_carbon_intensity_day_before):
+    """
+    Processes raw CO2 intensity data by filling gaps with interpolated values and calculating the mean, minimum, and maximum.
+
+    Args:
+        df_carbon_intensity_day_before (pd.DataFrame): Raw CO2 intensity data as returned by `eirgrid_api`.
+
+    Returns:
+        tuple: A dictionary with 'mean', 'min', and 'max' CO2 intensity values, and a pandas DataFrame with the recent CO2 intensity data indexed by effective time, see `process_data_frame`.
+    """
+    # Select the published part and fill short gaps
+    df_carbon_intensity_recent = process_data_frame(df_carbon_intensity_day_before)
+
+    # Calculate mean, min, and max
+    mean_val = df_carbon_intensity_recent["Value"].mean()
+    min_val = df_carbon_intensity_recent["Value"].min()
+    max_val = df_carbon_intensity_recent["Value"].max()
+
+    # Create a dictionary with these values
+    co2_stats_prior_day = {"mean": mean_val, "min": min_val, "max": max_val}
+
+    return co2_stats_prior_day, df_carbon_intensity_recent
+
+
+def carbon_api_intensity(region=DEFAULT_REGION):
     """
     Fetches and analyzes CO2 intensity data from the previous day, rounded to the nearest 15 minutes.
 
     This function retrieves CO2 intensity data for the last 24 hours, processes the data to fill any gaps with interpolated values, and then calculates the mean, minimum, and maximum CO2 intensity values for the period.
 
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+
     Returns:
         tuple: A tuple containing a dictionary with 'mean', 'min', and 'max' CO2 intensity values, and a pandas DataFrame with the recent CO2 intensity data indexed by effective time. Returns (None, None) in case of an error.
     """
     try:
-        # Current date and time, rounded to the nearest 15 minutes
-        now = round_time(datetime.datetime.now())
-
-        # Start time (same time yesterday, rounded to the nearest 15 minutes)
-        yesterday = now - datetime.timedelta(days=1)
-        startDateTime = format_date(yesterday)
-
-        # End time (current time, rounded to the nearest 15 minutes)
-        endDateTime = format_date(now)
+        startDateTime, endDateTime = day_before_time()
 
         # call API to get data
         df_carbon_intensity_day_before = eirgrid_api(
-            "co2intensity", "ALL", startDateTime, endDateTime
+            "co2intensity", region, startDateTime, endDateTime
         )
 
-        # Convert 'EffectiveTime' to datetime and set as index
-        df_carbon_intensity_day_before["EffectiveTime"] = pd.to_datetime(
-            df_carbon_intensity_day_before["EffectiveTime"], format="%d-%b-%Y %H:%M:%S"
-        )
-        df_carbon_intensity_indexed = df_carbon_intensity_day_before.set_index(
-            "EffectiveTime"
-        )
+        return process_carbon_intensity(df_carbon_intensity_day_before)
+
+    except Exception:
+        # Return None or an error message to indicate failure
+        return None, None
 
-        last_value_index_co_intensity = df_carbon_intensity_indexed[
-            "Value"
-        ].last_valid_index()
 
-        # Select rows up to the row before the last NaN
-        df_carbon_intensity_recent = df_carbon_intensity_indexed.loc[
-            :last_value_index_co_intensity
-        ]
+async def carbon_api_intensity_async(region=DEFAULT_REGION):
+    """
+    Awaitable version of `carbon_api_intensity` that answers from the ring buffer of the last 48 hours, fetching only the intervals published since the last sync.
 
-        df_carbon_intensity_recent["Value"] = df_carbon_intensity_recent[
-            "Value"
-        ].interpolate()
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
 
-        # Calculate mean, min, and max
-        mean_val = df_carbon_intensity_recent["Value"].mean()
-        min_val = df_carbon_intensity_recent["Value"].min()
-        max_val = df_carbon_intensity_recent["Value"].max()
+    Returns:
+        tuple: A tuple containing a dictionary with 'mean', 'min', and 'max' CO2 intensity values, and a pandas DataFrame with the recent CO2 intensity data indexed by effective time, see `process_recent_window`. Returns (None, None) in case of an error.
+    """
+    try:
+        # Current date and time, rounded to the nearest 15 minutes
+        now = round_time(datetime.datetime.now())
 
-        # Create a dictionary with these values
-        co2_stats_prior_day = {"mean": mean_val, "min": min_val, "max": max_val}
+        # view the last 24 hours in the ring buffer, fetching only the new intervals
+        carbon_intensity_day_before = await recent_window_async(
+            "co2intensity", region, now - datetime.timedelta(days=1), now
+        )
+        df_carbon_intensity_recent = process_recent_window(carbon_intensity_day_before)
 
+        # Look the statistics up in the aggregates instead of scanning the day
+        stats = recent_stats(
+            "co2intensity", region, now - datetime.timedelta(days=1), now
+        )
+        co2_stats_prior_day = {key: stats[key] for key in ("mean", "min", "max")}
         return co2_stats_prior_day, df_carbon_intensity_recent
 
     except Exception:
@@ -205,60 +576,219 @@ def carbon_api_intensity():
         return None, None
 
 
-def fuel_mix():
+# EirGrid fuel mix field name -> descriptive name, in the order fuels are reported
+FUEL_NAMES = {
+    "FUEL_COAL": "Coal",
+    "FUEL_GAS": "Gas",
+    "FUEL_NET_IMPORT": "Net Import",
+    "FUEL_OTHER_FOSSIL": "Other Fossil",
+    "FUEL_RENEW": "Renewables",
+}
+
+
+def fuel_mix_matrix(fuel_mix_eirgrid):
+    """
+    Pivots raw fuel mix rows into a fuel × time matrix.
+
+    Args:
+        fuel_mix_eirgrid (pd.DataFrame): Raw fuel mix data as returned by `eirgrid_api` or the local store.
+
+    Returns:
+        tuple: The fuels (descriptive names, in the order of `FUEL_NAMES`), the times with at least one published value as a DatetimeIndex, and a float64 matrix of MW with one row per fuel and one column per time, NaN where nothing is published.
+    """
+    fuels = pd.Categorical(fuel_mix_eirgrid["FieldName"], categories=list(FUEL_NAMES))
+    times, columns = np.unique(
+        effective_time_to_datetime(fuel_mix_eirgrid["EffectiveTime"]).to_numpy(),
+        return_inverse=True,
+    )
+    values = fuel_mix_eirgrid["Value"].to_numpy(dtype=np.float64)
+
+    # Fields that are not fuels are left out
+    known = fuels.codes >= 0
+    matrix = np.full((len(FUEL_NAMES), len(times)), np.nan)
+    matrix[fuels.codes[known], columns[known]] = values[known]
+
+    published = ~np.isnan(matrix).all(axis=0)
+    index = pd.DatetimeIndex(times[published], name="EffectiveTime")
+    return list(FUEL_NAMES.values()), index, matrix[:, published]
+
+
+def fuel_shares(supplied):
     """
-    Retrieves and processes the fuel mix data for the current time, rounded to the nearest 15 minutes, compared to the same time yesterday.
+    Returns the percentage share of each fuel type in the energy supplied.
+
+    Args:
+        supplied (np.ndarray): MW or MWh per fuel type, with exports (negative values) set to 0.
+
+    Returns:
+        np.ndarray: The share of each fuel type in %, all 0 if nothing is supplied.
+    """
+    total = supplied.sum()
+    return np.divide(
+        supplied * 100, total, out=np.zeros(len(supplied)), where=total > 0
+    )
+
+
+def process_fuel_mix(fuel_mix_eirgrid):
+    """
+    Summarises the fuel mix at the latest time published: the MW of each fuel type, its percentage share and the net import status.
+
+    Args:
+        fuel_mix_eirgrid (pd.DataFrame): Raw fuel mix data as returned by `eirgrid_api` or the local store.
 
-    This function fetches the fuel mix data, maps raw field names to more descriptive names, calculates the percentage share of each fuel type in the total energy mix, and determines whether the region is net importing or exporting energy based on the fuel mix data.
+    Returns:
+        tuple: A pandas DataFrame with one row per fuel type and 'FieldName', 'Value' (MW) and 'Percentage' columns, and a string indicating if the region is 'importing' or 'exporting' energy.
+
+    Raises:
+        ValueError: If no fuel mix value is published.
+    """
+    fuels, index, matrix = fuel_mix_matrix(fuel_mix_eirgrid)
+    if not len(index):
+        raise ValueError("No fuel mix values published")
+
+    # The current instant is the last column of the matrix
+    current = matrix[:, -1]
+    # Exports are not part of the mix, so negative values do not count towards the shares
+    percentage = fuel_shares(np.clip(np.nan_to_num(current), 0, None))
+    summary = pd.DataFrame(
+        {"FieldName": fuels, "Value": current, "Percentage": percentage}
+    )
+
+    net_import = "exporting" if current[fuels.index("Net Import")] < 0 else "importing"
+    return summary, net_import
+
+
+def process_fuel_mix_series(fuel_mix_eirgrid):
+    """
+    Summarises a window of fuel mix data: the energy, average, minimum and maximum of each fuel type, its share of the energy generated and imported, and the net import status over the window.
+
+    Args:
+        fuel_mix_eirgrid (pd.DataFrame): Raw quarter-hourly fuel mix data as returned by `eirgrid_api` or the local store.
+
+    Returns:
+        tuple: A pandas DataFrame with one row per fuel type and 'FieldName', 'Value' (MWh over the window), 'Average', 'Min' and 'Max' (MW) and 'Percentage' columns, and a string indicating if the region was 'importing' or 'exporting' energy on balance, in the same shape as `process_fuel_mix`.
+
+    Raises:
+        ValueError: If no fuel mix value is published in the window.
+    """
+    fuels, index, matrix = fuel_mix_matrix(fuel_mix_eirgrid)
+    if not len(index):
+        raise ValueError("No fuel mix values published in the window")
+
+    # Each value covers a quarter hour, so the energy in MWh is a quarter of the MW
+    hours = QUARTER_HOUR.total_seconds() / 3600
+    energy = np.nansum(matrix, axis=1) * hours
+    # Exports are not part of the mix, so negative values do not count towards the shares
+    supplied = np.nansum(np.clip(matrix, 0, None), axis=1) * hours
+    percentage = fuel_shares(supplied)
+
+    with warnings.catch_warnings():
+        # Fuels without any published value give NaN, which is what they should show
+        warnings.simplefilter("ignore", RuntimeWarning)
+        summary = pd.DataFrame(
+            {
+                "FieldName": fuels,
+                "Value": energy,
+                "Average": np.nanmean(matrix, axis=1),
+                "Min": np.nanmin(matrix, axis=1),
+                "Max": np.nanmax(matrix, axis=1),
+                "Percentage": percentage,
+            }
+        )
+
+    net_import = "exporting" if energy[fuels.index("Net Import")] < 0 else "importing"
+    return summary, net_import
+
+
+def fuel_mix(region=DEFAULT_REGION):
+    """
+    Retrieves the fuel mix at the latest quarter hour published, see `process_fuel_mix`.
+
+    This function fetches the fuel mix of the last 24 hours, rounded to the nearest 15 minutes, and summarises its last published time: the percentage share of each fuel type in the total energy mix, and whether the region is net importing or exporting energy.
+
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
 
     Returns:
         tuple: A tuple containing a pandas DataFrame with the fuel mix data, including the percentage share of each fuel type, and a string indicating if the region is 'importing' or 'exporting' energy. Returns (None, None) in case of an error.
     """
+    try:
+        startDateTime, endDateTime = day_before_time()
+
+        # call API to get the fuel mix up to the current time
+        fuel_mix_eirgrid = eirgrid_api("fuelMix", region, startDateTime, endDateTime)
+
+        return process_fuel_mix(fuel_mix_eirgrid)
+    except Exception:
+        return None, None
+
+
+async def fuel_mix_async(region=DEFAULT_REGION):
+    """
+    Awaitable version of `fuel_mix` that reads the same window as `fuel_mix_series_async` from the local store, fetching only the intervals published since the last sync.
+
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+
+    Returns:
+        tuple: A tuple containing a pandas DataFrame with the fuel mix data and a string indicating if the region is 'importing' or 'exporting' energy. Returns (None, None) in case of an error.
+    """
     try:
         # Current date and time, rounded to the nearest 15 minutes
         now = round_time(datetime.datetime.now())
 
-        # Start time (same time yesterday, rounded to the nearest 15 minutes)
-        yesterday = now - datetime.timedelta(days=1)
-        startDateTime = format_date(yesterday)
+        # read the last 24 hours from the local store, of which the latest published time is summarised
+        fuel_mix_eirgrid = await stored_window_async(
+            "fuelMix", region, now - datetime.timedelta(days=1), now
+        )
 
-        # End time (current time, rounded to the nearest 15 minutes)
-        endDateTime = format_date(now)
+        return process_fuel_mix(fuel_mix_eirgrid)
+    except Exception:
+        return None, None
 
-        # call API to get fuel mix for current time
-        fuel_mix_eirgrid = eirgrid_api("fuelMix", "ALL", startDateTime, startDateTime)
 
-        descriptive_names = {
-            "FUEL_COAL": "Coal",
-            "FUEL_GAS": "Gas",
-            "FUEL_NET_IMPORT": "Net Import",
-            "FUEL_OTHER_FOSSIL": "Other Fossil",
-            "FUEL_RENEW": "Renewables",
-        }
+def fuel_mix_series(region=DEFAULT_REGION):
+    """
+    Retrieves the fuel mix over the last 24 hours, rounded to the nearest 15 minutes, and summarises it, see `process_fuel_mix_series`.
 
-        fuel_mix_eirgrid["FieldName"] = fuel_mix_eirgrid["FieldName"].map(
-            descriptive_names
-        )
-        fuel_mix_eirgrid["ValueForPercentage"] = fuel_mix_eirgrid["Value"].apply(
-            lambda x: max(x, 0)
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+
+    Returns:
+        tuple: A tuple containing a pandas DataFrame with the energy, average and percentage share of each fuel type over the last 24 hours, and a string indicating if the region was 'importing' or 'exporting' energy. Returns (None, None) in case of an error.
+    """
+    try:
+        startDateTime, endDateTime = day_before_time()
+
+        # call API to get the fuel mix for the last 24 hours
+        fuel_mix_eirgrid = eirgrid_api("fuelMix", region, startDateTime, endDateTime)
+
+        return process_fuel_mix_series(fuel_mix_eirgrid)
+    except Exception:
+        return None, None
+
+
+async def fuel_mix_series_async(region=DEFAULT_REGION):
+    """
+    Awaitable version of `fuel_mix_series` that reads the last 24 hours from the local store, fetching only the intervals published since the last sync.
+
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+
+    Returns:
+        tuple: A tuple containing a pandas DataFrame with the energy, average and percentage share of each fuel type over the last 24 hours, and a string indicating if the region was 'importing' or 'exporting' energy. Returns (None, None) in case of an error.
+    """
+    try:
+        # Current date and time, rounded to the nearest 15 minutes
+        now = round_time(datetime.datetime.now())
+
+        # read the last 24 hours from the local store, fetching only the new intervals
+        fuel_mix_eirgrid = await stored_window_async(
+            "fuelMix", region, now - datetime.timedelta(days=1), now
         )
-        total_for_percentage = sum(fuel_mix_eirgrid["ValueForPercentage"])
-        percentages = [
-            (value / total_for_percentage) * 100 if value > 0 else 0
-            for value in fuel_mix_eirgrid["ValueForPercentage"]
-        ]
-        fuel_mix_eirgrid["Percentage"] = percentages
-        if (
-            fuel_mix_eirgrid.loc[
-                fuel_mix_eirgrid["FieldName"] == "Net Import", "Value"
-            ].values[0]
-            < 0
-        ):
-            net_import = "exporting"
-        else:
-            net_import = "importing"
-        return fuel_mix_eirgrid, net_import
-    except:
+
+        return process_fuel_mix_series(fuel_mix_eirgrid)
+    except Exception:
         return None, None
 
 
@@ -295,10 +825,17 @@ def status_classification(df, co2_stats_prior_day):
     Returns:
         pd.DataFrame: The modified DataFrame with two new columns: 'status_compared_to_yesterday' and 'status_compared_to_EU', each containing classification results ('low', 'medium', 'high') for the CO2 values.
     """
-    df["status_compared_to_yesterday"] = df["Value"].apply(
-        classify_status, args=(co2_stats_prior_day["min"], co2_stats_prior_day["max"])
-    )
-    df["status_compared_to_EU"] = df["Value"].apply(classify_status, args=(250, 500))
+    values = df["Value"].to_numpy()
+    # Same rule as `classify_status`, applied to the whole column at once
+    for column, (min_val, max_val) in (
+        (
+            "status_compared_to_yesterday",
+            (co2_stats_prior_day["min"], co2_stats_prior_day["max"]),
+        ),
+        ("status_compared_to_EU", (250, 500)),
+    ):
+        codes = np.where(values < min_val, 0, np.where(values > max_val, 2, 1))
+        df[column] = pd.Categorical.from_codes(codes, ["low", "medium", "high"])
 
     return df
 
@@ -403,6 +940,9 @@ def co2_plot_trend(df_):
     - df_ : pandas.DataFrame
         The input DataFrame must contain columns for timestamps ('EffectiveTime'),
         CO2 values ('Value'), a category column ('category'), and normalized values ('normalized').
+        An optional boolean 'Local' column marks values of the local forecast, drawn dashed.
+        Optional 'P10' and 'P90' columns are shaded as the prediction interval, and low values
+        marked in an optional boolean 'robust' column are drawn as stars.
 
     Returns:
     - None: Displays a matplotlib plot.
@@ -416,8 +956,13 @@ def co2_plot_trend(df_):
     df.sort_values("EffectiveTime", inplace=True)
     df.set_index("EffectiveTime", inplace=True)  # Set 'EffectiveTime' as index
 
-    # Format today's date for the plot title
-    today_date = datetime.datetime.now().strftime("%A %d/%m/%Y")
+    # The forecast runs into tomorrow once the local forecast extends it, so the title and axis name the days
+    first_day, last_day = df.index.min(), df.index.max()
+    multi_day = last_day.normalize() != first_day.normalize()
+    if multi_day:
+        forecast_dates = f"{first_day:%a %d/%m} to {last_day:%a %d/%m/%Y}"
+    else:
+        forecast_dates = first_day.strftime("%A %d/%m/%Y")
 
     # Set up color mapping for CO2 values
     norm = plt.Normalize(100, 600)  # Normalization for value intensity
@@ -426,8 +971,36 @@ def co2_plot_trend(df_):
     # Create the plot with specified figure size
     fig, ax = plt.subplots(figsize=(6, 5))
 
-    # Plot the CO2 value trend line
-    ax.plot(df.index, df["Value"], color="b", alpha=0.5, linewidth=2)
+    # Plot the CO2 value trend line, dashed where it is extended by the local forecast
+    if "Local" in df:
+        local = df["Local"].to_numpy(dtype=bool)
+        # The dashed part starts at the last co2_fc value, so the line has no gap
+        start = max(int(local.argmax()) - 1, 0) if local.any() else len(df)
+        ax.plot(
+            df.index[~local], df["Value"][~local], color="b", alpha=0.5, linewidth=2
+        )
+        ax.plot(
+            df.index[start:],
+            df["Value"].iloc[start:],
+            color="b",
+            alpha=0.5,
+            linewidth=2,
+            linestyle="--",
+        )
+    else:
+        ax.plot(df.index, df["Value"], color="b", alpha=0.5, linewidth=2)
+
+    # Shade the P10 to P90 prediction interval where past forecast errors are known
+    if "P10" in df and "P90" in df:
+        ax.fill_between(
+            df.index,
+            df["P10"],
+            df["P90"],
+            where=df["P10"].notna() & df["P90"].notna(),
+            color="b",
+            alpha=0.15,
+            linewidth=0,
+        )
 
     # Overlay scatter plot for CO2 value intensity
     sc = ax.scatter(
@@ -440,7 +1013,9 @@ def co2_plot_trend(df_):
         1, round(total_duration_hours / 24)
     )  # Adjust interval based on data span
     ax.xaxis.set_major_locator(mdates.HourLocator(interval=interval))
-    ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
+    ax.xaxis.set_major_formatter(
+        mdates.DateFormatter("%a %H:%M" if multi_day else "%H:%M")
+    )
     plt.setp(
         ax.get_xticklabels(), rotation=45, ha="right"
     )  # Rotate x-axis labels for readability
@@ -467,12 +1042,25 @@ def co2_plot_trend(df_):
             edgecolor="black",
         )
 
+    # Mark the low periods that stay low within the prediction interval
+    if "robust" in df:
+        df_robust = df[df["robust"]]
+        ax2.scatter(
+            df_robust.index,
+            df_robust["normalized"],
+            color="darkgreen",
+            marker="*",
+            s=120,
+            label="Low (robust)",
+            edgecolor="black",
+        )
+
     ax2.set_ylim([-0.2, 5])  # Adjust y-axis limits for categorized data
 
     # Final plot adjustments
     ax.set_ylim([100, df["Value"].max() + 100])  # Adjust y-axis limits for CO2 values
     ax.set_ylabel("tCO2/hr")  # Set y-axis label
-    ax.set_title(f"CO2 intensity forecast over time for {today_date}")  # Set plot title
+    ax.set_title(f"CO2 intensity forecast over time for {forecast_dates}")  # Set plot title
     ax2.legend(
         loc="upper center",
         bbox_to_anchor=(0.5, -0.2),
@@ -511,34 +1099,43 @@ def process_data_frame(data_frame):
     """Process a DataFrame by converting timestamps, interpolating missing values,
     and selecting recent data.
 
+    Gaps of up to `subs.gap_fill.MAX_GAP` are interpolated, longer outages stay NaN.
+
     Args:
         data_frame (pd.DataFrame): DataFrame containing data.
 
     Returns:
         pd.DataFrame: Processed DataFrame with timestamps converted,
             missing values interpolated, and recent data selected.
+            A boolean 'Filled' column marks the interpolated values.
     """
-    # Convert 'EffectiveTime' to datetime and set as index
-    data_frame["EffectiveTime"] = pd.to_datetime(
-        data_frame["EffectiveTime"], format="%d-%b-%Y %H:%M:%S"
+    # Convert 'EffectiveTime' to datetime to use as the index
+    index = pd.DatetimeIndex(
+        effective_time_to_datetime(data_frame["EffectiveTime"]), name="EffectiveTime"
     )
-    data_frame_indexed = data_frame.set_index("EffectiveTime")
 
-    # Find the last valid index
-    last_valid_index = data_frame_indexed["Value"].last_valid_index()
+    # Interpolate missing values on the raw array, which the result owns
+    values = data_frame["Value"].to_numpy(dtype=np.float64, copy=True)
+    filled, _ = fill_gaps(values, index)
 
-    # Select rows up to the row before the last NaN
-    recent_data_frame = data_frame_indexed.loc[:last_valid_index]
-
-    # Interpolate missing values
-    recent_data_frame["Value"] = recent_data_frame["Value"].interpolate()
-
-    return recent_data_frame
+    # Select rows up to the last published value, building the result frame once
+    end = last_valid_position(values) + 1
+    columns = {
+        column: data_frame[column].array[:end]
+        for column in data_frame.columns
+        if column not in ("EffectiveTime", "Value")
+    }
+    columns["Value"] = values[:end]
+    columns["Filled"] = filled[:end]
+    return pd.DataFrame(columns, index=index[:end])
 
 
-def wind_gen_cal():
+def wind_gen_cal(region=DEFAULT_REGION):
     """This function retrives the generated wind for today
 
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+
     Returns:
         pandas.DataFrame: DataFrame containing wind generation data for today.
             The DataFrame has the following columns:
@@ -550,15 +1147,18 @@ def wind_gen_cal():
     startDateTime, endDateTime = today_time()
 
     # Retrive data for generated wind for today
-    wind_for_today = eirgrid_api("windactual", "ALL", startDateTime, endDateTime)
+    wind_for_today = eirgrid_api("windactual", region, startDateTime, endDateTime)
 
     # Return only the valid part of dataframe
     return process_data_frame(wind_for_today)
 
 
-def actual_demand_cal():
+def actual_demand_cal(region=DEFAULT_REGION):
     """Return total actual demand as a DataFrame.
 
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+
     Returns:
         pd.DataFrame: DataFrame containing actual demand data for today.
             The DataFrame has the following columns:
@@ -570,12 +1170,106 @@ def actual_demand_cal():
     startDateTime, endDateTime = today_time()
 
     # Retrive data for actual demand for today
-    demand_for_today = eirgrid_api("demandactual", "ALL", startDateTime, endDateTime)
+    demand_for_today = eirgrid_api("demandactual", region, startDateTime, endDateTime)
 
     # Return only the valid part of dataframe
     return process_data_frame(demand_for_today)
 
 
+def process_recent_window(series):
+    """Selects the published part of a ring buffer window and interpolates gaps, like `process_data_frame`.
+
+    The result owns its values, so it stays valid when the ring buffer moves on while a chat handler still formats
+    or plots it. The copy is at most `RING_SLOTS` values.
+
+    Args:
+        series (pd.Series): A window as returned by `recent_window_async`.
+
+    Returns:
+        pd.DataFrame: 'Value' and 'Filled' columns indexed by 'EffectiveTime', up to the last published value.
+    """
+    values = series.to_numpy()
+    end = last_valid_position(values) + 1
+    values, index = values[:end].copy(), series.index[:end]
+
+    filled = np.zeros(end, dtype=bool)
+    if np.isnan(values).any():
+        filled, _ = fill_gaps(values, index)
+    return pd.DataFrame({"Value": values, "Filled": filled}, index=index, copy=False)
+
+
+async def wind_gen_cal_async(region=DEFAULT_REGION):
+    """Awaitable version of `wind_gen_cal` that answers from the ring buffer of the last 48 hours,
+    fetching only the intervals published since the last sync.
+
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+
+    Returns:
+        pandas.DataFrame: Wind generation for today, see `process_recent_window`.
+    """
+    now = round_time(datetime.datetime.now())
+
+    # View today's generated wind in the ring buffer, fetching only the new intervals
+    wind_for_today = await recent_window_async(
+        "windactual", region, now.replace(hour=0, minute=0), now
+    )
+
+    # Return only the valid part of the window
+    return process_recent_window(wind_for_today)
+
+
+async def actual_demand_cal_async(region=DEFAULT_REGION):
+    """Awaitable version of `actual_demand_cal` that answers from the ring buffer of the last 48 hours,
+    fetching only the intervals published since the last sync.
+
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+
+    Returns:
+        pd.DataFrame: Actual demand for today, see `process_recent_window`.
+    """
+    now = round_time(datetime.datetime.now())
+
+    # View today's actual demand in the ring buffer, fetching only the new intervals
+    demand_for_today = await recent_window_async(
+        "demandactual", region, now.replace(hour=0, minute=0), now
+    )
+
+    # Return only the valid part of the window
+    return process_recent_window(demand_for_today)
+
+
+async def wind_demand_async(region=DEFAULT_REGION):
+    """Fetches today's wind generation and actual demand concurrently, on the shared quarter-hour slots of their
+    ring buffers.
+
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+
+    Returns:
+        tuple: DataFrames of wind generation and demand, each indexed by 'EffectiveTime' with a 'Value' column
+        and covering the times published for both. Returns (None, None) in case of an error.
+    """
+    try:
+        wind, demand = await asyncio.gather(
+            wind_gen_cal_async(region), actual_demand_cal_async(region)
+        )
+        if wind.empty or demand.empty:
+            return None, None
+
+        # Keep only the times published for both areas, as slices of the same slots
+        start = max(wind.index[0], demand.index[0])
+        end = min(wind.index[-1], demand.index[-1])
+        if start > end:
+            return None, None
+        return wind.loc[start:end], demand.loc[start:end]
+
+    except Exception:
+        # Return None or an error message to indicate failure
+        return None, None
+
+
 def calculate_stats_wind_demand(df):
     """
     Calculate mean, min, and max of the 'Value' column in the DataFrame,
@@ -604,6 +1298,27 @@ def calculate_stats_wind_demand(df):
     }
 
 
+def recent_stats_wind_demand(area, region, df):
+    """Returns the same statistics as `calculate_stats_wind_demand`, looked up in the precomputed aggregates.
+
+    Args:
+        area (str): The area of the frame, "windactual" or "demandactual".
+        region (str): The region of the frame ("ROI", "NI" or "ALL").
+        df (pd.DataFrame): A frame returned by `wind_demand_async`.
+
+    Returns:
+        dict: A dictionary with mean, min, max values, and the times at which min and max occurred.
+    """
+    stats = recent_stats(area, region, df.index[0], df.index[-1])
+    return {
+        "Mean": stats["mean"],
+        "Min": stats["min"],
+        "Time of Min": stats["time_of_min"],
+        "Max": stats["max"],
+        "Time of Max": stats["time_of_max"],
+    }
+
+
 def generate_xaxis_ticks(start, end, interval_hours):
     """Generate x-axis tick marks from start to end time at given hour intervals.
 
@@ -700,3 +1415,46 @@ def area_plot_wind_demand(demand, wind):
     plt.tight_layout()
 
     return plt
+
+
+def snsp_plot(curve, today_stats):
+    """Plots today's System Non-Synchronous Penetration curve and marks its peak.
+
+    Args:
+        curve (pd.Series): SNSP in % indexed by time, as returned by `subs.snsp.snsp_async`.
+        today_stats (dict): Today's statistics, with the 'max' and 'time_of_max' of the peak.
+
+    Returns:
+        matplotlib.pyplot: A plot object of the curve.
+    """
+    sns.set_style("darkgrid", {"axes.facecolor": ".9"})
+    fig, ax = plt.subplots(figsize=(8, 5))
+
+    ax.fill_between(curve.index, curve, color="lightgreen", edgecolor="green")
+    if today_stats["time_of_max"] is not None:
+        ax.scatter(
+            [today_stats["time_of_max"]],
+            [today_stats["max"]],
+            color="darkgreen",
+            zorder=3,
+        )
+        ax.annotate(
+            f"Peak {today_stats['max']:.1f}%",
+            (today_stats["time_of_max"], today_stats["max"]),
+            textcoords="offset points",
+            xytext=(0, 8),
+            ha="center",
+        )
+
+    # The whole day is shown, so the curve grows from the left as the day goes on
+    midnight = curve.index[0].normalize()
+    ax.set_xlim([midnight, midnight + pd.Timedelta(days=1)])
+    ax.set_ylim([0, 100])
+    ax.set_ylabel("SNSP (%)")
+    ax.xaxis.set_major_locator(mdates.HourLocator(interval=2))
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+    today_date = datetime.datetime.now().strftime("%Y-%m-%d")
+    ax.set_title(f"System Non-Synchronous Penetration - {today_date}")
+    plt.tight_layout()
+    return plt
@@ -0,0 +1,225 @@
+import asyncio
+import datetime
+import numpy as np
+import pandas as pd
+from subs.data_cache import cached_fetch
+from subs.energy_api import DEFAULT_REGION
+from subs.fingerprint import fingerprint
+from subs.timeseries_store import read_forecast_pairs
+
+LEAD_STEP = 30 * 60
+# Longest lead time with its own band, the end of the forecast extended to tomorrow
+MAX_LEAD = 48 * 60 * 60
+LEAD_BINS = MAX_LEAD // LEAD_STEP + 1
+
+# Forecast errors are counted in bins of this width (gCO2/kWh), errors beyond ±ERROR_RANGE in the outermost bins
+ERROR_STEP = 2.0
+ERROR_RANGE = 400.0
+ERROR_BINS = int(2 * ERROR_RANGE / ERROR_STEP) + 1
+
+QUANTILES = (0.1, 0.5, 0.9)
+# Lead times with fewer past errors than this get no band
+MIN_ERRORS = 30
+# Nor do lead times whose errors come from forecasts issued on fewer days than this: forecasts of the same day
+# share the same weather, so their errors are not independent samples
+MIN_DAYS = 7
+DAY_SECONDS = 24 * 60 * 60
+# Errors the bands are first computed from, as far as the forecast archive reaches back
+HISTORY = datetime.timedelta(days=90)
+# Actuals up to this long before the last counted target time may still be published late or revised, so their
+# errors are read again and the counts corrected; older errors are taken as final
+REVISION_WINDOW = datetime.timedelta(days=1)
+
+# Columns of the errors `ErrorBands` keeps to correct them: the forecast and its lead and error bins
+ERROR_COLUMNS = ("issued_at", "effective_time", "lead", "error_bin")
+
+# region -> ErrorBands of the co2_fc forecasts of that region
+_bands = {}
+
+
+def lead_bins(leads):
+    """Returns the lead time bin of lead times in seconds: bin k holds leads from (k - 1) to k half hours.
+
+    Forecasts start at the previous half hour, so leads of up to half an hour before the issue time fall in bin 0.
+    Other leads outside the bins get -1.
+    """
+    bins = -(-np.asarray(leads, dtype=np.int64) // LEAD_STEP)
+    bins[(bins < 0) | (bins >= LEAD_BINS)] = -1
+    return bins
+
+
+class ErrorBands:
+    """Empirical prediction intervals of a forecast per lead time, from its past errors.
+
+    Past errors (actual minus forecast) are counted in a lead time × error histogram, so new errors are added
+    without reading the history again. After each update the quantiles of every lead time are kept in a lookup
+    table, so the bands of a forecast are a single indexing of that table.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros((LEAD_BINS, ERROR_BINS), dtype=np.int64)
+        # Days with issued forecasts counted per lead time, and the (lead time, issue day) pairs counted that a late
+        # actual could still add to, so no day is counted twice
+        self.days = np.zeros(LEAD_BINS, dtype=np.int64)
+        self.lead_days = set()
+        # The errors counted for target times within `REVISION_WINDOW` of `fitted_until`
+        self.recent = pd.DataFrame(
+            {name: np.zeros(0, dtype=np.int64) for name in ERROR_COLUMNS}
+        )
+        self.table = np.full((LEAD_BINS, len(QUANTILES)), np.nan)
+        # Last target time whose errors are counted
+        self.fitted_until = None
+
+    def update(self, pairs):
+        """Counts the errors of forecasts for new target times.
+
+        Target times within `REVISION_WINDOW` before the last counted one are compared with the errors counted for
+        them: errors of actuals published late are added, and those of revised actuals replace the old error.
+        Older target times, and errors already counted unchanged, are skipped, so the same pairs may be passed
+        again.
+
+        Args:
+            pairs (pd.DataFrame): Forecasts joined with actuals, as returned by `read_forecast_pairs`.
+        """
+        target = pairs["effective_time"].to_numpy(dtype=np.int64)
+        new = np.ones(len(target), dtype=bool)
+        if self.fitted_until is not None:
+            new &= target > self.fitted_until - REVISION_WINDOW.total_seconds()
+        if not new.any():
+            return
+
+        issued = pairs["issued_at"].to_numpy(dtype=np.int64)[new]
+        leads = lead_bins(target[new] - issued)
+        errors = (
+            pairs["actual"].to_numpy(dtype=np.float64)[new]
+            - pairs["forecast"].to_numpy(dtype=np.float64)[new]
+        )
+        error_bins = np.clip(
+            np.rint((errors + ERROR_RANGE) / ERROR_STEP), 0, ERROR_BINS - 1
+        ).astype(np.int64)
+        fresh = pd.DataFrame(
+            dict(zip(ERROR_COLUMNS, (issued, target[new], leads, error_bins)))
+        )[leads >= 0]
+        merged = fresh.merge(
+            self.recent, on=["issued_at", "effective_time"], how="left", suffixes=("", "_old")
+        )
+        late = merged["error_bin_old"].isna().to_numpy()
+        old_bins = merged["error_bin_old"].fillna(-1).to_numpy(dtype=np.int64)
+        revised = ~late & (old_bins != merged["error_bin"].to_numpy())
+        added = merged[late | revised]
+        self.counts += np.bincount(
+            added["lead"] * ERROR_BINS + added["error_bin"], minlength=self.counts.size
+        ).reshape(self.counts.shape)
+        removed = merged[revised]
+        self.counts -= np.bincount(
+            removed["lead"] * ERROR_BINS + removed["error_bin_old"].astype(np.int64),
+            minlength=self.counts.size,
+        ).reshape(self.counts.shape)
+
+        # Each (lead time, issue day) is counted once
+        lead_days = np.unique(
+            np.stack([added["lead"], added["issued_at"] // DAY_SECONDS], axis=1), axis=0
+        )
+        unseen = [
+            lead for lead, day in lead_days.tolist() if (lead, day) not in self.lead_days
+        ]
+        self.days += np.bincount(np.array(unseen, dtype=np.int64), minlength=LEAD_BINS)
+        self.lead_days.update(map(tuple, lead_days.tolist()))
+
+        last = int(target[new].max())
+        self.fitted_until = last if self.fitted_until is None else max(self.fitted_until, last)
+        oldest = self.fitted_until - REVISION_WINDOW.total_seconds()
+        recent = pd.concat([self.recent, fresh[fresh["effective_time"] > oldest]])
+        recent = recent.drop_duplicates(["issued_at", "effective_time"], keep="last")
+        self.recent = recent[recent["effective_time"] > oldest]
+        # A late actual is at most MAX_LEAD after its forecast was issued
+        first_day = (oldest - MAX_LEAD - LEAD_STEP) // DAY_SECONDS
+        self.lead_days = {(lead, day) for lead, day in self.lead_days if day >= first_day}
+        self.table = self._quantiles()
+
+    def _quantiles(self):
+        cumulative = self.counts.cumsum(axis=1)
+        totals = cumulative[:, -1:]
+        # The first error bin at which the cumulative count reaches each quantile
+        bins = np.stack(
+            [(cumulative < q * totals).sum(axis=1) for q in QUANTILES], axis=1
+        )
+        table = bins * ERROR_STEP - ERROR_RANGE
+        table[(totals[:, 0] < MIN_ERRORS) | (self.days < MIN_DAYS)] = np.nan
+        return table
+
+    def offsets(self, leads):
+        """Returns the P10, P50 and P90 offsets from the forecast at lead times in seconds.
+
+        Args:
+            leads (np.ndarray): Seconds from the issue time of the forecast to each target time.
+
+        Returns:
+            np.ndarray: gCO2/kWh to add to each forecast value, one row per lead time and one column per
+            quantile, NaN where there are too few past errors, see `MIN_ERRORS` and `MIN_DAYS`.
+        """
+        bins = lead_bins(leads)
+        offsets = self.table[bins]
+        offsets[bins < 0] = np.nan
+        return offsets
+
+
+async def forecast_bands_async(region=DEFAULT_REGION):
+    """Returns the error bands of a region's forecasts, see `ErrorBands`.
+
+    The bands are computed from up to `HISTORY` of archived forecasts the first time, and afterwards the errors of
+    target times published since then, and in the `REVISION_WINDOW` before, are added at most once per quarter
+    hour.
+
+    Args:
+        region (str): The region ("ROI", "NI" or "ALL").
+    """
+    bands = _bands.setdefault(region, ErrorBands())
+
+    async def update():
+        now = datetime.datetime.now()
+        if bands.fitted_until is None:
+            since = now - HISTORY
+        else:
+            # Again from the start of the revision window, so actuals published late or revised are counted
+            since = pd.Timestamp(bands.fitted_until, unit="s").to_pydatetime() - REVISION_WINDOW
+        pairs = await asyncio.to_thread(read_forecast_pairs, region, since, now)
+        bands.update(pairs)
+        return bands
+
+    return await cached_fetch(("forecast_bands", region), update)
+
+
+async def add_bands_async(df_carbon_forecast, region=DEFAULT_REGION):
+    """Adds prediction intervals to a forecast fetched just now.
+
+    Args:
+        df_carbon_forecast (pd.DataFrame): The forecast, e.g. as returned by `extend_forecast_async`.
+        region (str): The region of the forecast ("ROI", "NI" or "ALL").
+
+    Returns:
+        pd.DataFrame: The same frame with 'P10', 'P50' and 'P90' columns (gCO2/kWh, NaN where the archive holds
+        too few past errors and for values of the local forecast), and a fingerprint that includes the bands. The
+        frame is returned unchanged, without these columns, if the bands cannot be computed or no value has one.
+    """
+    try:
+        bands = await forecast_bands_async(region)
+    except Exception:
+        return df_carbon_forecast
+
+    issued = pd.Timestamp(datetime.datetime.now()).value // 10**9
+    targets = df_carbon_forecast.index.to_numpy(dtype="datetime64[s]").astype(np.int64)
+    offsets = bands.offsets(targets - issued)
+    # The errors are those of co2_fc, so values of the local forecast get no band
+    if "Local" in df_carbon_forecast:
+        offsets[df_carbon_forecast["Local"].to_numpy(dtype=bool)] = np.nan
+    # Until the archive holds enough past errors the bands would be noise, so none are drawn or summarised
+    if np.isnan(offsets).all():
+        return df_carbon_forecast
+    values = df_carbon_forecast["Value"].to_numpy(dtype=np.float64)
+    for i, q in enumerate(QUANTILES):
+        df_carbon_forecast[f"P{round(q * 100)}"] = values + offsets[:, i]
+    df_carbon_forecast.attrs["fingerprint"] = fingerprint(
+        df_carbon_forecast.attrs.get("fingerprint"), offsets
+    )
+    return df_carbon_forecast
@@ -0,0 +1,61 @@
+import datetime
+import numpy as np
+
+# Longest span between two published values that is bridged by a straight line. Longer outages stay missing
+# rather than being drawn as a line, e.g. a 6-hour hole in the wind data
+MAX_GAP = datetime.timedelta(hours=1)
+
+
+def last_valid_position(values):
+    """Returns the position of the last value that is not NaN, or -1 if there is none.
+
+    Args:
+        values (np.ndarray): float64 values.
+    """
+    valid = np.flatnonzero(~np.isnan(values))
+    return int(valid[-1]) if len(valid) else -1
+
+
+def fill_gaps(values, times, max_gap=MAX_GAP):
+    """Fills gaps between published values in place by linear interpolation in time.
+
+    Only gaps with a published value on both sides are filled, so missing values at the start and the not yet
+    published tail are left alone, as are gaps whose surrounding values are more than `max_gap` apart.
+
+    Args:
+        values (np.ndarray): Writable float64 values, with NaN where nothing was published. Modified in place.
+        times (array-like): The time of each value, e.g. the DatetimeIndex of the series.
+        max_gap (datetime.timedelta): The longest span between two published values that is filled.
+
+    Returns:
+        tuple: Boolean masks of the values that were filled, and of the gaps left missing because they are
+        longer than `max_gap`.
+    """
+    missing = np.isnan(values)
+    filled = np.zeros(len(values), dtype=bool)
+    if not missing.any():
+        return filled, filled.copy()
+
+    # Position of the published value before and after every position
+    n = len(values)
+    positions = np.arange(n)
+    before = np.maximum.accumulate(np.where(missing, -1, positions))
+    after = np.minimum.accumulate(np.where(missing, n, positions)[::-1])[::-1]
+    inside = missing & (before >= 0) & (after < n)
+
+    t = np.asarray(times, dtype="datetime64[ns]").view(np.int64)
+    span = t[after[inside]] - t[before[inside]]
+    short = span <= int(max_gap.total_seconds() * 10**9)
+
+    targets = np.flatnonzero(inside)[short]
+    left, right = before[targets], after[targets]
+    weight = np.divide(
+        t[targets] - t[left],
+        span[short],
+        out=np.zeros(len(targets)),
+        where=span[short] > 0,
+    )
+    values[targets] = values[left] + (values[right] - values[left]) * weight
+
+    filled[targets] = True
+    return filled, inside & ~filled
@@ -0,0 +1,249 @@
+import datetime
+import numpy as np
+import pandas as pd
+from subs.energy_api import DEFAULT_REGION, round_time, stored_window_async
+from subs.fingerprint import fingerprint
+
+SLOT_SECONDS = 15 * 60
+DAY_SECONDS = 24 * 60 * 60
+SLOTS_PER_DAY = DAY_SECONDS // SLOT_SECONDS
+
+# History the model is first fitted on, fetched into the local store if it does not reach back that far yet
+HISTORY = datetime.timedelta(days=14)
+# Span of stored history below which there is no daily profile to speak of, so no local forecast is made
+MIN_HISTORY = datetime.timedelta(days=2)
+# Values up to this long before the last fitted value may still be published late or revised, so they are read
+# again and the profile is corrected; older values are taken as final
+REVISION_WINDOW = datetime.timedelta(days=1)
+# Weight of the newest day in the daily profile: each older day counts (1 - SEASONAL_SMOOTHING) times less
+SEASONAL_SMOOTHING = 0.3
+# Weight of the newest quarter hour in the level, i.e. how far the latest values are above or below the profile
+LEVEL_SMOOTHING = 0.3
+# Published values the level is computed from
+LEVEL_POINTS = 8
+# The level fades by this factor per quarter hour ahead, so far horizons return to the daily profile
+LEVEL_DAMPING = 0.97
+# Spacing of the co2_fc forecast, which the local forecast extends
+FORECAST_STEP = datetime.timedelta(minutes=30)
+
+# region -> SeasonalModel of the co2intensity of that region
+_models = {}
+
+
+def _epochs(times):
+    return (
+        np.asarray(times, dtype="datetime64[ns]")
+        .astype("datetime64[s]")
+        .astype(np.int64)
+    )
+
+
+class SeasonalModel:
+    """A seasonal-naive forecast with exponential smoothing of a quarter-hourly series.
+
+    The daily profile is an exponentially weighted mean of each quarter hour of the day over the past days. It is
+    kept as weighted sums, so new values are added without refitting the history, and fitting from scratch is the
+    same update applied to the whole history at once. Forecasts add the smoothed, damped deviation of the latest
+    values from the profile.
+    """
+
+    def __init__(self):
+        self.sums = np.zeros(SLOTS_PER_DAY)
+        self.weights = np.zeros(SLOTS_PER_DAY)
+        # Day the sums and weights are discounted to, and times of the first and last values added
+        self.day = None
+        self.fitted_from = None
+        self.fitted_until = None
+        # time -> value added, for the times within `REVISION_WINDOW` of `fitted_until`
+        self.added = {}
+
+    def update(self, times, values):
+        """Adds new values to the daily profile.
+
+        Values within `REVISION_WINDOW` before the last fitted value are compared with the values added for their
+        times: those published late are added, and those revised replace the contribution of the old value. Values
+        older than that, and those already added unchanged, are skipped, so the same rows may be passed again.
+
+        Args:
+            times (np.ndarray): int64 seconds since the epoch, on the quarter-hour grid.
+            values (np.ndarray): float64 values, NaN where nothing is published.
+        """
+        new = ~np.isnan(values)
+        if self.fitted_until is not None:
+            new &= times > self.fitted_until - REVISION_WINDOW.total_seconds()
+        times, values = times[new], values[new]
+        old = np.array([self.added.get(time, np.nan) for time in times.tolist()])
+        # NaN compares unequal, so values published late count as changed
+        changed = old != values
+        times, values, old = times[changed], values[changed], old[changed]
+        if not len(times):
+            return
+
+        days = times // DAY_SECONDS
+        slots = times % DAY_SECONDS // SLOT_SECONDS
+        day = int(days.max()) if self.day is None else max(self.day, int(days.max()))
+        if self.day is not None:
+            decay = (1 - SEASONAL_SMOOTHING) ** (day - self.day)
+            self.sums *= decay
+            self.weights *= decay
+        weights = (1 - SEASONAL_SMOOTHING) ** (day - days)
+        revised = ~np.isnan(old)
+        self.sums += np.bincount(
+            slots, weights * (values - np.where(revised, old, 0)), minlength=SLOTS_PER_DAY
+        )
+        self.weights += np.bincount(
+            slots, np.where(revised, 0, weights), minlength=SLOTS_PER_DAY
+        )
+        self.day = day
+
+        first, last = int(times.min()), int(times.max())
+        self.fitted_from = first if self.fitted_from is None else min(self.fitted_from, first)
+        self.fitted_until = last if self.fitted_until is None else max(self.fitted_until, last)
+        self.added.update(zip(times.tolist(), values.tolist()))
+        oldest = self.fitted_until - REVISION_WINDOW.total_seconds()
+        self.added = {time: value for time, value in self.added.items() if time > oldest}
+
+    def history(self):
+        """Returns the span of the values added so far as a timedelta, zero before the first update."""
+        if self.fitted_from is None:
+            return datetime.timedelta(0)
+        return datetime.timedelta(seconds=self.fitted_until - self.fitted_from)
+
+    def profile(self):
+        """Returns the daily profile, one value per quarter hour of the day, NaN where no history exists."""
+        return np.divide(
+            self.sums,
+            self.weights,
+            out=np.full(SLOTS_PER_DAY, np.nan),
+            where=self.weights > 0,
+        )
+
+    def forecast(self, recent_times, recent_values, times):
+        """Forecasts the series at future times.
+
+        Args:
+            recent_times (np.ndarray): int64 seconds since the epoch of the latest published values.
+            recent_values (np.ndarray): The latest published values, in time order.
+            times (np.ndarray): int64 seconds since the epoch to forecast.
+
+        Returns:
+            np.ndarray: The forecast values, NaN where the profile has no history.
+        """
+        profile = self.profile()
+        forecast = profile[times % DAY_SECONDS // SLOT_SECONDS]
+        if not len(recent_times):
+            return forecast
+
+        residuals = recent_values - profile[recent_times % DAY_SECONDS // SLOT_SECONDS]
+        valid = ~np.isnan(residuals)
+        if not valid.any():
+            return forecast
+        age = (recent_times[-1] - recent_times[valid]) // SLOT_SECONDS
+        weights = (1 - LEVEL_SMOOTHING) ** age
+        level = np.dot(weights, residuals[valid]) / weights.sum()
+
+        ahead = np.maximum((times - recent_times[-1]) // SLOT_SECONDS, 0)
+        return forecast + level * LEVEL_DAMPING**ahead
+
+
+async def fit_model_async(region):
+    """Brings the model of a region up to date with its locally stored history.
+
+    The model is fitted on up to `HISTORY` the first time, which may fetch that history into the store, so the
+    scheduler calls this in the background before any user asks. Afterwards only the values published since the
+    last call, and the `REVISION_WINDOW` before it, are read from the store and added.
+
+    Args:
+        region (str): The region ("ROI", "NI" or "ALL").
+
+    Returns:
+        tuple: The region's SeasonalModel, and the times (int64 seconds since the epoch) and values of the rows read,
+        which end with the latest published values.
+    """
+    model = _models.setdefault(region, SeasonalModel())
+    now = round_time(datetime.datetime.now())
+    if model.fitted_until is None:
+        since = now - HISTORY
+    else:
+        # Again from the start of the revision window, so values published late or revised are added
+        since = pd.Timestamp(model.fitted_until, unit="s").to_pydatetime() - REVISION_WINDOW
+    # Also the latest values for the level, which may lie before the last fitted value
+    since = min(since, now - LEVEL_POINTS * datetime.timedelta(seconds=SLOT_SECONDS))
+
+    rows = await stored_window_async("co2intensity", region, since, now)
+    history = rows["Value"].to_numpy(dtype=np.float64)
+    history_times = _epochs(rows["EffectiveTime"])
+    model.update(history_times, history)
+    return model, history_times, history
+
+
+async def local_forecast_async(region, times):
+    """Forecasts the CO2 intensity of a region from its locally stored history, see `fit_model_async`.
+
+    Args:
+        region (str): The region ("ROI", "NI" or "ALL").
+        times (pd.DatetimeIndex): The times to forecast.
+
+    Returns:
+        np.ndarray: gCO2/kWh at each time, NaN where there is not enough history, and everywhere while the store
+        holds less than `MIN_HISTORY`: without a day-ago value for most times the forecast would be a flat level.
+    """
+    model, history_times, history = await fit_model_async(region)
+    if model.history() < MIN_HISTORY:
+        return np.full(len(times), np.nan)
+
+    published = ~np.isnan(history)
+    recent = slice(-LEVEL_POINTS, None)
+    return model.forecast(
+        history_times[published][recent], history[published][recent], _epochs(times)
+    )
+
+
+def forecast_end(now):
+    """Returns the end of the extended forecast: the end of tomorrow, 24 to 48 hours ahead."""
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight + datetime.timedelta(days=2) - FORECAST_STEP
+
+
+async def extend_forecast_async(df_carbon_forecast, region=DEFAULT_REGION):
+    """Extends the co2_fc forecast, which ends at midnight, to the end of tomorrow with the local forecast.
+
+    Args:
+        df_carbon_forecast (pd.DataFrame): The forecast as returned by `carbon_api_forecast_async`.
+        region (str): The region of the forecast ("ROI", "NI" or "ALL").
+
+    Returns:
+        pd.DataFrame: The forecast followed by the local forecast every 30 minutes, with a boolean 'Local' column
+        marking the local values and a fingerprint of both. The forecast is returned unchanged, without a 'Local'
+        column, if the local forecast fails or has too little history, see `local_forecast_async`.
+    """
+    try:
+        now = datetime.datetime.now()
+        if len(df_carbon_forecast):
+            start = df_carbon_forecast.index[-1] + FORECAST_STEP
+        else:
+            start = pd.Timestamp(now).floor(FORECAST_STEP)
+        times = pd.date_range(
+            start, forecast_end(now), freq=FORECAST_STEP, name="EffectiveTime"
+        )
+        values = await local_forecast_async(region, times)
+    except Exception:
+        return df_carbon_forecast
+
+    known = ~np.isnan(values)
+    if not known.any():
+        return df_carbon_forecast
+    local = pd.DataFrame(
+        {
+            "FieldName": "LOCAL_FORECAST",
+            "Region": region,
+            "Value": values[known],
+            "Local": True,
+        },
+        index=times[known],
+    )
+    extended = pd.concat([df_carbon_forecast.assign(Local=False), local])
+    extended.attrs["fingerprint"] = fingerprint(
+        df_carbon_forecast.attrs.get("fingerprint"), values
+    )
+    return extended
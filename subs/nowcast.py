@@ -0,0 +1,153 @@
+import asyncio
+import datetime
+import json
+import os
+import numpy as np
+import pandas as pd
+from subs.energy_api import (
+    DEFAULT_REGION,
+    FUEL_NAMES,
+    fuel_mix_matrix,
+    recent_window_async,
+    round_time,
+    stored_window_async,
+)
+
+# Emission factor of each fuel in gCO2/kWh. Net imports are counted at a typical intensity of the GB grid, and
+# exports not at all. Override any of them with NOWCAST_EMISSION_FACTORS, a JSON object such as {"FUEL_GAS": 380}
+EMISSION_FACTORS = {
+    "FUEL_COAL": 920.0,
+    "FUEL_GAS": 400.0,
+    "FUEL_NET_IMPORT": 200.0,
+    "FUEL_OTHER_FOSSIL": 800.0,
+    "FUEL_RENEW": 0.0,
+}
+EMISSION_FACTORS.update(json.loads(os.environ.get("NOWCAST_EMISSION_FACTORS", "{}")))
+
+# History over which the estimates are calibrated against the published intensity
+CALIBRATION_WINDOW = datetime.timedelta(days=1)
+# Fewer times with both an estimate and a published value than this and the factors are used as they are
+MIN_CALIBRATION_POINTS = 8
+
+
+def estimate_intensity(matrix, factors=EMISSION_FACTORS):
+    """Estimates the CO2 intensity at each time of a fuel mix as the generation-weighted emission factor.
+
+    Args:
+        matrix (np.ndarray): A fuel × time matrix of MW, as returned by `fuel_mix_matrix`.
+        factors (dict): gCO2/kWh by EirGrid fuel field name, see `EMISSION_FACTORS`.
+
+    Returns:
+        np.ndarray: gCO2/kWh per time, NaN where a fuel is not published or nothing is supplied.
+    """
+    weights = np.array([factors.get(field, 0.0) for field in FUEL_NAMES])
+    # Exports are not part of the mix, so only positive values are weighted
+    supplied = np.clip(matrix, 0, None)
+    total = supplied.sum(axis=0)
+    complete = ~np.isnan(total) & (total > 0)
+    return np.divide(
+        weights @ np.nan_to_num(supplied),
+        total,
+        out=np.full(len(total), np.nan),
+        where=complete,
+    )
+
+
+def calibration_scale(estimated, published):
+    """Returns the factor that scales the estimates to the published intensity, from the times with both.
+
+    The median ratio is used, so a few revised or missing values do not move it.
+
+    Args:
+        estimated (np.ndarray): Estimated gCO2/kWh.
+        published (np.ndarray): Published gCO2/kWh at the same times, NaN where missing.
+
+    Returns:
+        float: The scale, 1.0 if there are fewer than `MIN_CALIBRATION_POINTS` times to compare.
+    """
+    both = ~np.isnan(estimated) & ~np.isnan(published) & (estimated > 0)
+    if both.sum() < MIN_CALIBRATION_POINTS:
+        return 1.0
+    return float(np.median(published[both] / estimated[both]))
+
+
+def nowcast(published, fuel_mix_eirgrid, factors=EMISSION_FACTORS):
+    """Extends the published CO2 intensity up to the latest fuel mix with calibrated estimates.
+
+    Args:
+        published (pd.Series): Published gCO2/kWh indexed by 'EffectiveTime', NaN where not published yet.
+        fuel_mix_eirgrid (pd.DataFrame): Raw fuel mix rows covering at least the same window.
+        factors (dict): gCO2/kWh by EirGrid fuel field name, see `EMISSION_FACTORS`.
+
+    Returns:
+        pd.DataFrame: 'Value' (gCO2/kWh) and 'Nowcast' (True for estimated values) indexed by 'EffectiveTime', up
+        to the latest time with either a published value or a complete fuel mix.
+    """
+    _, index, matrix = fuel_mix_matrix(fuel_mix_eirgrid)
+    estimated = pd.Series(estimate_intensity(matrix, factors), index=index)
+
+    scale = calibration_scale(
+        estimated.to_numpy(), published.reindex(index).to_numpy(dtype=np.float64)
+    )
+
+    last = published.last_valid_index()
+    recent = published.iloc[:0] if last is None else published.loc[:last]
+    if last is not None:
+        estimated = estimated[estimated.index > last]
+    estimated = estimated.dropna() * scale
+
+    return pd.DataFrame(
+        {
+            "Value": np.concatenate([recent.to_numpy(), estimated.to_numpy()]),
+            "Nowcast": np.repeat([False, True], [len(recent), len(estimated)]),
+        },
+        index=recent.index.append(estimated.index).rename("EffectiveTime"),
+    )
+
+
+async def nowcast_async(region=DEFAULT_REGION):
+    """Returns the CO2 intensity of the last 24 hours, filled up to the latest fuel mix with estimates.
+
+    Both datasets are read from the local store and the ring buffers, which the background refresh keeps up to
+    date, so no upstream request is needed beyond the usual sync.
+
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+
+    Returns:
+        pd.DataFrame: See `nowcast`, or None in case of an error.
+    """
+    try:
+        now = round_time(datetime.datetime.now())
+        start = now - CALIBRATION_WINDOW
+
+        async def published_window():
+            # A copy, as the ring buffer may move on while the fuel mix is still being read
+            series = await recent_window_async("co2intensity", region, start, now)
+            return series.copy()
+
+        published, fuel_mix_eirgrid = await asyncio.gather(
+            published_window(),
+            stored_window_async("fuelMix", region, start, now),
+        )
+        return nowcast(published, fuel_mix_eirgrid)
+
+    except Exception:
+        # Return None or an error message to indicate failure
+        return None
+
+
+async def current_intensity_async(region=DEFAULT_REGION):
+    """Returns the latest CO2 intensity, published or estimated from the fuel mix, see `nowcast_async`.
+
+    Args:
+        region (str): The region for which the data is requested ("ROI", "NI" or "ALL").
+
+    Returns:
+        tuple: The time (pd.Timestamp), the gCO2/kWh, and True if the value is estimated. Returns
+        (None, None, None) in case of an error or if there is no data.
+    """
+    df = await nowcast_async(region)
+    if df is None or df.empty:
+        return None, None, None
+    return df.index[-1], float(df["Value"].iloc[-1]), bool(df["Nowcast"].iloc[-1])
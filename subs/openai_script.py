@@ -4,6 +4,7 @@ import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 from elevenlabs import generate
+from subs.fingerprint import memoized
 
 # Load environment variables from .env file
 load_dotenv()
@@ -11,55 +12,152 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 ELEVEN_API_KEY = os.environ.get("ELEVEN_API_KEY")
 
 
-def optimize_categorize_periods(df):
+# Category labels, in the order of their codes
+CATEGORIES = ["Low", "Medium", "High"]
+
+
+def categorize_values(values, low_threshold, high_threshold):
     """
-    Categorizes forecasted CO2 emission periods into 'Low', 'Medium', and 'High' based on predefined thresholds, EU standards, and summarizes these periods.
+    Assigns each value the code of its category, with the same bins as `pd.cut`: values up to and including
+    `low_threshold` are 'Low' (0), values up to and including `high_threshold` are 'Medium' (1) and the rest are
+    'High' (2). Missing values get -1.
 
     Args:
-        df (pd.DataFrame): A DataFrame with a 'Value' column containing CO2 emission values.
+        values (np.ndarray): float64 values.
+        low_threshold (float): The upper edge of the 'Low' category.
+        high_threshold (float): The upper edge of the 'Medium' category.
 
     Returns:
-        str: A summary text listing the start and end times of periods categorized into 'Low', 'Medium', and 'High' emissions.
+        np.ndarray: int8 category codes, see `CATEGORIES`.
     """
-    # Define thresholds for CO2 emission categorization
-    low_threshold, high_threshold = 250, 500
+    codes = np.where(
+        values <= low_threshold, 0, np.where(values <= high_threshold, 1, 2)
+    ).astype(np.int8)
+    codes[np.isnan(values)] = -1
+    return codes
 
-    # Categorize each timestamp
-    df["category"] = pd.cut(
-        df["Value"],
-        bins=[-np.inf, low_threshold, high_threshold, np.inf],
-        labels=["Low", "Medium", "High"],
-    )
 
-    # Find consecutive periods with the same category
-    df["group"] = (df["category"] != df["category"].shift()).cumsum()
+def format_period(start_time, end_time, start_day=None, end_day=None):
+    """
+    Formats a period as "05:00 to 07:30", or as one time if it starts and ends at the same time. With days, the
+    period is "Sat 22:30 to Sun 02:00", and the end day is left out if it is the same, e.g. "Sat 14:00 to 22:00".
+    """
+    if (start_day, start_time) == (end_day, end_time):
+        period = start_time
+    elif end_day != start_day:
+        period = f"{start_time} to {end_day} {end_time}"
+    else:
+        period = f"{start_time} to {end_time}"
+    return period if start_day is None else f"{start_day} {period}"
 
-    # Initialize summary text
-    # summary_text = "Based on the forecasted CO2 emissions data for today, distinct periods are identified as:\n\n"
-    summary_text = ""
-    # Initialize a dictionary to store concatenated periods for each category
-    period_summary = {"Low": [], "Medium": [], "High": []}
+
+def period_labels(index):
+    """
+    Returns the labels periods are described with: the time of each value, e.g. "14:00", and its day, e.g. "Sat",
+    or None if every value lies within the same day.
+
+    Args:
+        index (pd.DatetimeIndex): The time of each value.
+
+    Returns:
+        tuple: The times and the days as arrays of strings, the days None for a single day.
+    """
+    times = np.asarray(index.strftime("%H:%M"))
+    days = None
+    if len(index) and index[0].normalize() != index[-1].normalize():
+        days = np.asarray(index.strftime("%a"))
+    return times, days
+
+
+def _format_periods(index, first, last):
+    # One description per period, with the day of each end if the index spans several days
+    times, days = period_labels(index)
+    return [
+        format_period(
+            times[start],
+            times[end],
+            None if days is None else days[start],
+            None if days is None else days[end],
+        )
+        for start, end in zip(first, last)
+    ]
+
+
+def robust_periods(index, robust):
+    """
+    Lists the consecutive periods in which a condition holds, e.g. "00:00 to 05:30, 23:00".
+
+    Args:
+        index (pd.DatetimeIndex): The time of each value.
+        robust (np.ndarray): True for each value the condition holds for.
+
+    Returns:
+        str: The periods, or an empty string if there are none.
+    """
+    edges = np.diff(np.r_[0, robust.astype(np.int8), 0])
+    first = np.flatnonzero(edges == 1)
+    last = np.flatnonzero(edges == -1) - 1
+    return ", ".join(_format_periods(index, first, last))
+
+
+def summarize_periods(index, codes):
+    """
+    Summarizes the consecutive periods of each category, e.g. "- 🟢 Low Emission: 00:00 to 05:30, 23:00".
+
+    If the index spans several days, each period names its days, see `format_period`.
+
+    Args:
+        index (pd.DatetimeIndex): The time of each value.
+        codes (np.ndarray): The category code of each value, see `categorize_values`.
+
+    Returns:
+        tuple: The summary text, and the id of the consecutive period each value belongs to.
+    """
+    # A new period starts wherever the category changes (missing values always start a new one)
+    starts = np.ones(len(codes), dtype=bool)
+    starts[1:] = (codes[1:] != codes[:-1]) | (codes[1:] == -1)
+    group = np.cumsum(starts)
 
     # Define emojis for each category
     emoji_dict = {"Low": "🟢", "Medium": "🟡", "High": "🔴"}
+    period_summary = {category: [] for category in CATEGORIES}
 
-    # Group by category and group to concatenate periods
-    for category, group in df.groupby(["category", "group"]):
-        start_time = group.index.min().strftime("%H:%M")
-        end_time = group.index.max().strftime("%H:%M")
-        period_str = (
-            f"{start_time} to {end_time}" if start_time != end_time else f"{start_time}"
-        )
-        period_summary[category[0]].append(period_str)
+    first = np.flatnonzero(starts)
+    last = np.append(first[1:], len(codes)) - 1
+    categorized = codes[first] >= 0
+    first, last = first[categorized], last[categorized]
+    for start, period in zip(first, _format_periods(index, first, last)):
+        period_summary[CATEGORIES[codes[start]]].append(period)
 
     # Format the summary text for each category
-    for category in ["Low", "Medium", "High"]:
+    summary_text = ""
+    for category in CATEGORIES:
         if period_summary[category]:
             periods = ", ".join(period_summary[category])
             summary_text += f"- {emoji_dict[category]} {category} Emission: {periods}\n"
         else:
             summary_text += f"- {emoji_dict[category]} {category} Emission: No specific periods identified.\n"
 
+    return summary_text, group
+
+
+def optimize_categorize_periods(df):
+    """
+    Categorizes forecasted CO2 emission periods into 'Low', 'Medium', and 'High' based on predefined thresholds, EU standards, and summarizes these periods.
+
+    The DataFrame is not modified.
+
+    Args:
+        df (pd.DataFrame): A DataFrame with a 'Value' column containing CO2 emission values.
+
+    Returns:
+        str: A summary text listing the start and end times of periods categorized into 'Low', 'Medium', and 'High' emissions.
+    """
+    # Define thresholds for CO2 emission categorization
+    low_threshold, high_threshold = 250, 500
+
+    codes = categorize_values(df["Value"].to_numpy(), low_threshold, high_threshold)
+    summary_text, _ = summarize_periods(df.index, codes)
     return summary_text
 
 
@@ -74,57 +172,81 @@ def find_optimized_relative_periods(df):
 
     Returns:
         tuple: A summary string detailing categorized emission periods, and the modified DataFrame with added 'normalized', 'category', and 'group' columns.
+        If the DataFrame has a 'P90' column of prediction intervals, low periods whose P90 is low as well are listed as robust and marked in an added 'robust' column.
+        If the DataFrame has a boolean 'Local' column (see `extend_forecast_async`), the EirGrid forecast and its local extension are categorized and summarized as separate sections, each relative to its own values.
     """
 
     if len(df) > 1:
-        # Normalize CO2 values to a 0-1 scale
-        df["normalized"] = (df["Value"] - df["Value"].min()) / (
-            df["Value"].max() - df["Value"].min()
-        )
-
-        # Define thresholds for relative categorization
-        low_threshold = df["normalized"].quantile(0.33)
-        high_threshold = df["normalized"].quantile(0.66)
-
-        # Categorize each timestamp
-        df["category"] = pd.cut(
-            df["normalized"],
-            bins=[-np.inf, low_threshold, high_threshold, np.inf],
-            labels=["Low", "Medium", "High"],
+        values = df["Value"].to_numpy()
+        p90 = df["P90"].to_numpy() if "P90" in df and df["P90"].notna().any() else None
+        local = (
+            df["Local"].to_numpy(dtype=bool)
+            if "Local" in df
+            else np.zeros(len(df), dtype=bool)
         )
-
-        # Find consecutive periods with the same category
-        df["group"] = (df["category"] != df["category"].shift()).cumsum()
-
-        # Prepare summary text
-        # summary_text = "Considering absolute CO2 emission values, determined by data trends, distinct periods are identified as:\n\n"
+        sections = [(~local, "EirGrid forecast")]
+        if local.any():
+            sections.append((local, "Our own extension of the forecast, less certain"))
+
+        normalized = np.full(len(df), np.nan)
+        codes = np.full(len(df), -1, dtype=np.int8)
+        group = np.zeros(len(df), dtype=np.int64)
+        robust = np.zeros(len(df), dtype=bool)
         summary_text = ""
+        for rows, heading in sections:
+            if not rows.any():
+                continue
+            section_values = values[rows]
+
+            # Normalize CO2 values to a 0-1 scale
+            with np.errstate(invalid="ignore", divide="ignore"):
+                section_normalized = (section_values - np.nanmin(section_values)) / (
+                    np.nanmax(section_values) - np.nanmin(section_values)
+                )
 
-        # Initialize a dictionary to store concatenated periods for each category
-        period_summary = {"Low": [], "Medium": [], "High": []}
-
-        # Define emojis for each category
-        emoji_dict = {"Low": "🟢", "Medium": "🟡", "High": "🔴"}
+            # Define thresholds for relative categorization
+            low_threshold, high_threshold = np.nanquantile(
+                section_normalized, [0.33, 0.66]
+            )
 
-        # Group by category and group to concatenate periods
-        for (category, group), data in df.groupby(["category", "group"]):
-            start_time = data.index.min().strftime("%H:%M")
-            end_time = data.index.max().strftime("%H:%M")
-            # For periods that start and end at the same time, just show one time
-            period_str = (
-                f"{start_time} to {end_time}" if start_time != end_time else start_time
+            # Categorize each timestamp and find consecutive periods with the same category
+            section_codes = categorize_values(
+                section_normalized, low_threshold, high_threshold
             )
-            period_summary[category].append(period_str)
-
-        # Format the summary text for each category
-        for category in ["Low", "Medium", "High"]:
-            if period_summary[category]:
-                periods = ", ".join(period_summary[category])
-                summary_text += (
-                    f"- {emoji_dict[category]} {category} Emission: {periods}\n"
+            section_text, section_group = summarize_periods(
+                df.index[rows], section_codes
+            )
+
+            # Low periods stay low even if the intensity turns out as high as the forecast's P90 (see `add_bands_async`)
+            if p90 is not None and not np.isnan(p90[rows]).all():
+                low_value = np.nanmin(section_values) + low_threshold * (
+                    np.nanmax(section_values) - np.nanmin(section_values)
                 )
-            else:
-                summary_text += f"- {emoji_dict[category]} {category} Emission: No specific periods identified.\n"
+                section_robust = (section_codes == 0) & (p90[rows] <= low_value)
+                periods = (
+                    robust_periods(df.index[rows], section_robust)
+                    or "No specific periods identified."
+                )
+                section_text += f"- 🟢 Robust Low Emission (low even if the forecast is off): {periods}\n"
+                robust[rows] = section_robust
+
+            if len(sections) > 1:
+                # Periods only name their days within a section that spans several, so the heading names them too
+                first, last = df.index[rows][0], df.index[rows][-1]
+                dates = first.strftime("%a %d/%m")
+                if last.normalize() != first.normalize():
+                    dates += last.strftime(" to %a %d/%m")
+                section_text = f"{heading}, {dates}:\n{section_text}"
+            summary_text += section_text
+            normalized[rows] = section_normalized
+            codes[rows] = section_codes
+            group[rows] = section_group + group.max()
+
+        if p90 is not None:
+            df["robust"] = robust
+        df["normalized"] = normalized
+        df["category"] = pd.Categorical.from_codes(codes, CATEGORIES)
+        df["group"] = group
     else:
         summary_text = (
             "Sorry, we do not have enough data to process data trend analysis."
@@ -178,7 +300,7 @@ def create_combined_gpt_prompt(date, eu_summary_text, quantile_summary_text):
     return prompt_text
 
 
-def opt_gpt_summarise(prompt):
+def opt_gpt_summarise(prompt, fingerprint=None):
     """
     Summarizes or generates content based on a given prompt using the OpenAI GPT model.
 
@@ -186,10 +308,30 @@ def opt_gpt_summarise(prompt):
 
     Args:
         prompt (str): The input text prompt to guide the GPT model's content generation.
+        fingerprint (str): The fingerprint of the data the prompt was built from, if any. The summary is then generated once per version of the data and reused while it does not change, see `subs.fingerprint.memoized`.
 
     Returns:
         str: The text generated by the GPT model in response to the prompt, or an error message if the API call fails.
     """
+    try:
+        return memoized("gpt_summary", fingerprint, lambda: gpt_completion(prompt))
+    except Exception as e:
+        return str(e)
+
+
+def gpt_completion(prompt):
+    """
+    Submits a prompt to the GPT model, see `opt_gpt_summarise`.
+
+    Args:
+        prompt (str): The input text prompt to guide the GPT model's content generation.
+
+    Returns:
+        str: The text generated by the GPT model in response to the prompt.
+
+    Raises:
+        Exception: If the API call fails.
+    """
     # Ensure your API key is correctly set in your environment variables
     openai.api_key = OPENAI_API_KEY  # os.getenv("OPENAI_API_KEY")
 
@@ -200,24 +342,21 @@ def opt_gpt_summarise(prompt):
         # {"role": "user", "content": msg.user},
     ]
 
-    try:
-        # Making the API call
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",  # or "gpt-3.5-turbo" based on your subscription
-            messages=messages,
-            temperature=1,
-            max_tokens=600,  # Adjust the number of tokens as needed
-            n=1,  # Number of completions to generate
-            stop=None,  # Specify any stopping criteria if needed
-        )
+    # Making the API call
+    response = openai.chat.completions.create(
+        model="gpt-3.5-turbo",  # or "gpt-3.5-turbo" based on your subscription
+        messages=messages,
+        temperature=1,
+        max_tokens=600,  # Adjust the number of tokens as needed
+        n=1,  # Number of completions to generate
+        stop=None,  # Specify any stopping criteria if needed
+    )
 
-        # Extracting the response
-        # generated_text = response.choices[0].message['content'].strip()
-        generated_text = response.choices[0].message.content.strip()
+    # Extracting the response
+    # generated_text = response.choices[0].message['content'].strip()
+    generated_text = response.choices[0].message.content.strip()
 
-        return generated_text
-    except Exception as e:
-        return str(e)
+    return generated_text
 
 
 def submit_energy_query_and_handle_response(carbon_data, user_query):
@@ -234,7 +373,7 @@ def submit_energy_query_and_handle_response(carbon_data, user_query):
 
     # carbon_data = "Low: 00:11-06:00, Medium: 06:01-18:00, High: 18:01-23:59"  # Example format for carbon intensity data
     structure = (
-        "🌱 Carbon Intensity Periods Today: {carbon_data}\n"
+        "🌱 Carbon Intensity Periods: {carbon_data}\n"
         "🔋 Device Recommendation: Given the energy consumption characteristics of the devices mentioned (e.g., laundry machines, EV chargers, kettles), here is our advice:\n"
         "- 🟢 Low Carbon Period: This is the ideal time for using high-energy consumption devices. We strongly recommend scheduling usage during these periods to minimize your carbon footprint.\n"
         "- 🟡 Medium Carbon Period: If it is not feasible to use your devices during the low carbon period, medium periods are an acceptable alternative. However, preference should always be given to low carbon periods when possible.\n"
@@ -244,7 +383,8 @@ def submit_energy_query_and_handle_response(carbon_data, user_query):
 
     msg_sys = (
         "You are an AI energy specialist. Your role is to provide users with advice on optimizing their energy consumption "
-        "based on carbon intensity periods: low, medium, and high. Here is the carbon intensity summary for today: "
+        "based on carbon intensity periods: low, medium, and high. Here is the carbon intensity summary for the rest of "
+        "today and, where periods name their day, tomorrow: "
         f"{carbon_data}. "
         "Our recommendations are designed to align with sustainable energy usage practices:\n"
         "1. High-energy consumption devices are best used during low carbon periods.\n"
@@ -319,6 +459,36 @@ def get_energy_actions(text):
     return energy_saving_actions
 
 
+def fuel_mix_lines(fuel_mix_data):
+    """
+    Formats one line per fuel type for `create_fuel_mix_prompt`.
+
+    Args:
+        fuel_mix_data (pd.DataFrame): Fuel mix data as returned by `process_fuel_mix` or `process_fuel_mix_series`.
+
+    Returns:
+        str: Lines such as "- Gas: 41234 MWh (45.2%)", with the average MW for 24-hour data.
+    """
+    if "Average" in fuel_mix_data:
+        return "\n".join(
+            f"- {name}: {value:.0f} MWh, averaging {average:.0f} MW ({percentage:.1f}%)"
+            for name, value, average, percentage in zip(
+                fuel_mix_data["FieldName"],
+                fuel_mix_data["Value"],
+                fuel_mix_data["Average"],
+                fuel_mix_data["Percentage"],
+            )
+        )
+    return "\n".join(
+        f"- {name}: {value} MWh ({percentage:.1f}%)"
+        for name, value, percentage in zip(
+            fuel_mix_data["FieldName"],
+            fuel_mix_data["Value"],
+            fuel_mix_data["Percentage"],
+        )
+    )
+
+
 def create_fuel_mix_prompt(date, fuel_mix_data, net_import_status):
     """
     Generates a structured prompt for reporting on fuel mix data, including net import or export status, tailored for a specific date.
@@ -337,12 +507,7 @@ def create_fuel_mix_prompt(date, fuel_mix_data, net_import_status):
     # Correcting the list comprehension to match the data structure
 
     if net_import_status == "importing":
-        fuel_mix_details = "\n".join(
-            [
-                f"- {fuel_mix_data['FieldName'][i]}: {fuel_mix_data['Value'][i]} MWh ({fuel_mix_data['Percentage'][i]:.1f}%)"
-                for i in range(len(fuel_mix_data["FieldName"]))
-            ]
-        )
+        fuel_mix_details = fuel_mix_lines(fuel_mix_data)
         prompt_text = (
             f"📅 Date: {date}\n"
             f"🔋 Fuel Mix Data (MWh & Percentage):\n\n"
@@ -360,18 +525,12 @@ def create_fuel_mix_prompt(date, fuel_mix_data, net_import_status):
             "Avoid using asterisks (*) in your response and stick to the names and format provided."
         )
     elif net_import_status == "exporting":
-        export_value = fuel_mix_data.loc[
-            fuel_mix_data["FieldName"] == "Net Import", "Value"
-        ].values[0]
-        filtered_fuel_mix_data = fuel_mix_data[
-            fuel_mix_data["FieldName"] != "Net Import"
-        ]
-        fuel_mix_details = "\n".join(
-            [
-                f"- {filtered_fuel_mix_data['FieldName'][idx]}: {filtered_fuel_mix_data['Value'][idx]} MWh ({filtered_fuel_mix_data['Percentage'][idx]:.1f}%)"
-                for idx in filtered_fuel_mix_data.index  # Use the actual indices
-            ]
-        )
+        net_import = fuel_mix_data["FieldName"] == "Net Import"
+        # Over a window the export is reported as the average flow, for a single time as the value itself
+        export_column = "Average" if "Average" in fuel_mix_data else "Value"
+        export_value = -fuel_mix_data.loc[net_import, export_column].values[0]
+        export_unit = "MW" if export_column == "Average" else "MWh"
+        fuel_mix_details = fuel_mix_lines(fuel_mix_data[~net_import])
 
         prompt_text = (
             f"📅 Date: {date}\n"
@@ -385,7 +544,7 @@ def create_fuel_mix_prompt(date, fuel_mix_data, net_import_status):
             "- 🌬️ Gas: [percentage]%\n"
             "- 🛢️ Other Fossil: [percentage]%\n"
             "- 🌿 Renewables: [percentage]%\n\n"
-            f"- ⚡ Ireland is currently exporting electricity to the UK, with the average export being {export_value} MWh over the last 24 hours. \n"
+            f"- ⚡ Ireland is currently exporting electricity to the UK, with the average export being {export_value:.0f} {export_unit} over the last 24 hours. \n"
             "Note: Replace [percentage] with the actual percentages from the data. "
             "Avoid using asterisks (*) in your response and stick to the names and format provided."
         )
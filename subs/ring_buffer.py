@@ -0,0 +1,151 @@
+import datetime
+import numpy as np
+import pandas as pd
+from subs.eirgrid_time import effective_time_to_datetime
+
+# Width of one slot, matching EirGrid's quarter-hourly series
+SLOT_SECONDS = 15 * 60
+# Slots kept per area and region: the latest 48 hours
+RING_SLOTS = 48 * 4
+
+# (area, region) -> RingBuffer, one per series in use, so memory stays constant however long the bot runs
+_rings = {}
+
+
+class RingBuffer:
+    """A fixed-size buffer of the latest quarter-hour values of one series.
+
+    Every value is written twice, at its slot and one buffer length further, so the latest slots always form a
+    contiguous run of the array and windows are returned as views without copying.
+
+    Times are seconds since the epoch of EirGrid's (naive, Irish local) EffectiveTime, as in the local store.
+    """
+
+    def __init__(self, slots=RING_SLOTS):
+        self.slots = slots
+        self._values = np.full(2 * slots, np.nan)
+        # Position and time of the newest slot, None until the first value arrives
+        self._head = 0
+        self.head_time = None
+
+    def _advance(self, steps):
+        """Moves the newest slot `steps` slots forward, clearing the slots it moves over."""
+        if steps >= self.slots:
+            self._values[:] = np.nan
+        else:
+            cleared = (self._head + np.arange(1, steps + 1)) % self.slots
+            self._values[cleared] = np.nan
+            self._values[cleared + self.slots] = np.nan
+        self._head = (self._head + steps) % self.slots
+        self.head_time += steps * SLOT_SECONDS
+
+    def update(self, times, values):
+        """Writes values into their slots, moving the buffer forward for newer times.
+
+        Values older than the buffer are ignored, and values already in the buffer are replaced, so revisions and
+        values published late are picked up.
+
+        Args:
+            times (np.ndarray): int64 seconds since the epoch, on the quarter-hour grid.
+            values (np.ndarray): float64 values, NaN where nothing is published yet.
+        """
+        if len(times) == 0:
+            return
+        slot_times = times - times % SLOT_SECONDS
+        newest = int(slot_times.max())
+        if self.head_time is None:
+            self.head_time = newest
+        elif newest > self.head_time:
+            self._advance((newest - self.head_time) // SLOT_SECONDS)
+
+        offsets = (slot_times - self.head_time) // SLOT_SECONDS
+        keep = offsets > -self.slots
+        positions = (self._head + offsets[keep]) % self.slots
+        values = values[keep]
+        self._values[positions] = values
+        self._values[positions + self.slots] = values
+
+    def window(self, start, end):
+        """Returns the values of the slots from `start` to `end` held in the buffer, without copying.
+
+        Args:
+            start (int): Seconds since the epoch of the first slot (inclusive).
+            end (int): Seconds since the epoch of the last slot (inclusive).
+
+        Returns:
+            tuple: The time of the first returned slot, and a read-only view of the values. The view follows the
+            buffer, so it must be used before the buffer is updated again.
+        """
+        if self.head_time is None:
+            return start, self._values[:0]
+        oldest = self.head_time - (self.slots - 1) * SLOT_SECONDS
+        start = max(-(-start // SLOT_SECONDS) * SLOT_SECONDS, oldest)
+        end = min(end - end % SLOT_SECONDS, self.head_time)
+        if end < start:
+            return start, self._values[:0]
+
+        count = (end - start) // SLOT_SECONDS + 1
+        last = self._head + self.slots - (self.head_time - end) // SLOT_SECONDS
+        view = self._values[last - count + 1 : last + 1]
+        view.flags.writeable = False
+        return start, view
+
+
+def _epoch(dt):
+    return int(pd.Timestamp(dt).value // 10**9)
+
+
+def get_ring(area, region):
+    """Returns the ring buffer of an area and region, or None if none was created yet."""
+    return _rings.get((area, region))
+
+
+def create_ring(area, region):
+    """Returns the ring buffer of an area and region, creating an empty one if needed."""
+    return _rings.setdefault((area, region), RingBuffer())
+
+
+def update_ring(ring, df):
+    """Writes raw EirGrid rows into a ring buffer, see `RingBuffer.update`.
+
+    Args:
+        ring (RingBuffer): The ring buffer of the rows' area and region.
+        df (pd.DataFrame): Raw rows of a single-field area, as returned by `eirgrid_api` or the local store.
+
+    Returns:
+        np.ndarray: int64 seconds since the epoch of the rows, e.g. to refresh the aggregates of these slots.
+    """
+    if df.empty:
+        return np.empty(0, dtype=np.int64)
+    times = (
+        effective_time_to_datetime(df["EffectiveTime"])
+        .to_numpy()
+        .astype("datetime64[s]")
+        .astype(np.int64)
+    )
+    ring.update(times, df["Value"].to_numpy(dtype=np.float64))
+    return times
+
+
+def ring_series(ring, start, end):
+    """Returns a window of a ring buffer as a Series that shares the buffer's memory.
+
+    The background refresh advances the buffer between two awaits, which shifts the values under the Series' index.
+    Use the Series before the next await, or copy it if it is kept longer, e.g. to hand it to a chat handler.
+
+    Args:
+        ring (RingBuffer): The ring buffer.
+        start (datetime): The start of the window.
+        end (datetime): The end of the window.
+
+    Returns:
+        pd.Series: 'Value' indexed by 'EffectiveTime' at every quarter hour of the window held in the buffer.
+    """
+    first, values = ring.window(_epoch(start), _epoch(end))
+    index = pd.date_range(
+        pd.Timestamp(first, unit="s"),
+        periods=len(values),
+        freq=datetime.timedelta(seconds=SLOT_SECONDS),
+        name="EffectiveTime",
+    )
+    return pd.Series(values, index=index, name="Value", copy=False)
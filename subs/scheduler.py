@@ -0,0 +1,113 @@
+import asyncio
+import datetime
+import logging
+from telegram.ext import ContextTypes, JobQueue
+from subs.backtest import refresh_backtest
+from subs.circuit_breaker import background
+from subs.data_cache import next_quarter_hour
+from subs.energy_api import (
+    carbon_api_forecast_async,
+    carbon_api_intensity_async,
+    fuel_mix_series_async,
+    wind_gen_cal_async,
+    actual_demand_cal_async,
+    REGIONS,
+)
+from subs.local_forecast import fit_model_async
+from subs.snsp import SNSP_AREA, SNSP_REGION, snsp_async
+
+logger = logging.getLogger(__name__)
+
+# EirGrid publishes a new value for every dataset each quarter hour
+REFRESH_INTERVAL = datetime.timedelta(minutes=15)
+# The backtest summary shown with the CO2 forecast only moves slowly, so it is recomputed once a night (UTC)
+BACKTEST_TIME = datetime.time(hour=3, minute=7)
+
+
+async def refresh_datasets(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Refreshes every dataset used by the handlers so that user requests are served from warm caches.
+
+    Runs the same fetch functions as the handlers, so the shared cache and the local store are filled with
+    exactly the windows the handlers will ask for: the co2_fc forecast, co2intensity, fuelMix, windactual
+    and demandactual, for every region in `REGIONS`, and the all-island SNSP. The local CO2 forecast model of
+    every region is brought up to date too, so handlers only add the values published since. All datasets and
+    regions are fetched concurrently in one cycle, so serving more regions does not add latency, and a failure
+    of one does not stop the others.
+    As a background refresh it may probe endpoints whose circuit breaker is open.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): The job context provided by the JobQueue.
+    """
+    token = background.set(True)
+    fetches = {
+        "co2_fc": carbon_api_forecast_async,
+        "co2intensity": carbon_api_intensity_async,
+        "fuelMix": fuel_mix_series_async,
+        "windactual": wind_gen_cal_async,
+        "demandactual": actual_demand_cal_async,
+    }
+    datasets = {
+        f"{name}/{region}": fetch(region)
+        for name, fetch in fetches.items()
+        for region in REGIONS
+    }
+    # SNSP is published for the whole island only
+    datasets[f"{SNSP_AREA}/{SNSP_REGION}"] = snsp_async()
+    # The local forecast models, so their first fit on two weeks of history does not happen in a user request
+    for region in REGIONS:
+        datasets[f"local_forecast/{region}"] = fit_model_async(region)
+    try:
+        results = await asyncio.gather(*datasets.values(), return_exceptions=True)
+    finally:
+        background.reset(token)
+
+    for name, result in zip(datasets, results):
+        # The fetch functions report failures either by raising or by returning None
+        failed = isinstance(result, Exception) or result is None
+        if isinstance(result, tuple):
+            failed = any(item is None for item in result)
+        if failed:
+            logger.warning(f"Background refresh of {name} failed: {result!r}")
+
+
+async def refresh_backtests(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Backtests the stored forecasts of every region in `REGIONS` and keeps the summaries the bot shows.
+
+    Each region runs in a worker thread, one after the other, so the backtest does not hold up the handlers.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): The job context provided by the JobQueue.
+    """
+    for region in REGIONS:
+        try:
+            await asyncio.to_thread(refresh_backtest, region)
+        except Exception as error:
+            logger.warning(f"Backtest of {region} failed: {error!r}")
+
+
+def schedule_refresh(job_queue: JobQueue) -> None:
+    """
+    Registers the background refresh on the application's JobQueue.
+
+    The cache is warmed once at startup, then refreshed at every quarter hour boundary, which is when
+    cached windows expire and EirGrid publishes new data. The forecast backtest runs once at startup and then
+    nightly.
+
+    Args:
+        job_queue (JobQueue): The JobQueue of the running Application.
+    """
+    now = datetime.datetime.now()
+    # JobQueue interprets naive datetimes as UTC, so the first run is given as a delay in seconds
+    first = (next_quarter_hour(now) - now).total_seconds()
+
+    job_queue.run_once(refresh_datasets, when=0, name="refresh_datasets_startup")
+    job_queue.run_repeating(
+        refresh_datasets,
+        interval=REFRESH_INTERVAL,
+        first=first,
+        name="refresh_datasets",
+    )
+    job_queue.run_once(refresh_backtests, when=0, name="refresh_backtests_startup")
+    job_queue.run_daily(refresh_backtests, time=BACKTEST_TIME, name="refresh_backtests")
@@ -0,0 +1,108 @@
+import asyncio
+import datetime
+import numpy as np
+import pandas as pd
+from subs.aggregates import DAY_SECONDS, DailyAggregates, aggregate_stats
+from subs.data_cache import cached_fetch
+from subs.energy_api import recent_window_async, round_time, sync_window_async
+from subs.timeseries_store import read_window
+
+SNSP_AREA = "SnspAll"
+# SNSP is published for the whole island only
+SNSP_REGION = "ALL"
+WEEK_DAYS = 7
+# Days before today whose values may still be published late or revised, so they are recomputed on every refresh
+OPEN_DAYS = 1
+
+_daily = DailyAggregates(WEEK_DAYS)
+
+
+def _epoch(dt):
+    return int(pd.Timestamp(dt).value // 10**9)
+
+
+def refresh_daily(today):
+    """Recomputes the daily aggregates of the last week that are missing or may have changed, from the store.
+
+    After the first call only today and the `OPEN_DAYS` before it are read again.
+
+    Args:
+        today (datetime): Midnight of today.
+    """
+    last = _epoch(today)
+    first = last - (WEEK_DAYS - 1) * DAY_SECONDS
+    days = [
+        day
+        for day in range(first, last + DAY_SECONDS, DAY_SECONDS)
+        if day >= last - OPEN_DAYS * DAY_SECONDS or not _daily.held(day)
+    ]
+    rows = read_window(
+        SNSP_AREA,
+        SNSP_REGION,
+        pd.Timestamp(days[0], unit="s"),
+        today + datetime.timedelta(days=1) - datetime.timedelta(seconds=1),
+    )
+    times = rows["EffectiveTime"].to_numpy(dtype="datetime64[s]").astype(np.int64)
+    values = rows["Value"].to_numpy(dtype=np.float64)
+    for day in days:
+        in_day = (times >= day) & (times < day + DAY_SECONDS)
+        _daily.put_day(day, times[in_day], values[in_day])
+
+
+async def snsp_async():
+    """Returns today's System Non-Synchronous Penetration curve with the statistics of today and the last week.
+
+    SNSP is the share of demand (plus exports) met by wind, solar and imports over HVDC links. The result is
+    computed once per quarter hour and shared by all chats: today's curve comes from the area's ring buffer, and
+    the statistics from daily aggregates of which only the open days are recomputed.
+
+    Returns:
+        dict: 'curve' (pd.Series of % indexed by 'EffectiveTime', up to the latest published value), and 'today'
+        and 'week' statistics as returned by `subs.aggregates.range_stats`. Returns None in case of an error or
+        if nothing is published today yet.
+    """
+
+    async def compute():
+        now = round_time(datetime.datetime.now())
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        week_start = today - datetime.timedelta(days=WEEK_DAYS - 1)
+
+        # The whole week is synced into the store, then today is read from the ring buffer
+        await sync_window_async(SNSP_AREA, SNSP_REGION, week_start)
+        curve = await recent_window_async(SNSP_AREA, SNSP_REGION, today, now)
+        # A copy, taken before the next await, as the ring buffer moves on while the result is cached
+        curve = curve.loc[: curve.last_valid_index()].copy()
+        await asyncio.to_thread(refresh_daily, today)
+        first, last = _epoch(week_start), _epoch(today)
+        return {
+            "curve": curve,
+            "today": aggregate_stats(_daily.query(last, last)),
+            "week": aggregate_stats(_daily.query(first, last)),
+        }
+
+    try:
+        summary = await cached_fetch(("snsp", SNSP_REGION), compute)
+    except Exception:
+        return None
+    if summary["curve"].dropna().empty:
+        return None
+    return summary
+
+
+def snsp_text(summary):
+    """Describes an SNSP summary, e.g. "⚡ SNSP right now (14:15): 52.3% ...".
+
+    Args:
+        summary (dict): As returned by `snsp_async`.
+
+    Returns:
+        str: The current value, today's peak and mean, and the last week's peak and mean.
+    """
+    curve, today, week = summary["curve"], summary["today"], summary["week"]
+    return (
+        f"⚡ SNSP right now ({curve.index[-1]:%H:%M}): {curve.iloc[-1]:.1f}%\n"
+        f"📈 Today: peak {today['max']:.1f}% at {today['time_of_max']:%H:%M}, average {today['mean']:.1f}%\n"
+        f"📅 Last 7 days: peak {week['max']:.1f}% on {week['time_of_max']:%a %d/%m at %H:%M}, "
+        f"average {week['mean']:.1f}%\n"
+        "SNSP is the share of the island's electricity met by wind, solar and imports at each moment."
+    )
@@ -4,7 +4,52 @@ from telegram.ext import (
 )
 from subs.energy_api import *
 from subs.openai_script import *
+from subs.backtest import backtest_summary_async, reliability_text
+from subs.data_cache import dataset_age
+from subs.fingerprint import fingerprint, memoized
+from subs.nowcast import current_intensity_async
+from subs.local_forecast import extend_forecast_async
+from subs.forecast_bands import add_bands_async
+from subs.wind_ramps import ramp_events_async, ramp_lines
+from subs.snsp import SNSP_AREA, SNSP_REGION, snsp_async, snsp_text
 from io import BytesIO
+import asyncio
+
+
+def user_region(context):
+    """
+    Returns the region the user selected with /region, see `REGIONS`.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): The context object holding the user's data.
+
+    Returns:
+        str: "ROI", "NI" or "ALL" (the default).
+    """
+    return context.user_data.get("region", DEFAULT_REGION)
+
+
+# Data older than this is served during EirGrid outages, so users are told how old it is
+STALE_AFTER = datetime.timedelta(minutes=30)
+
+
+async def send_stale_data_note(update, datasets):
+    """
+    Tells the user how old the data is if any of the datasets behind a reply could not be refreshed recently.
+
+    Args:
+        update (Update): The update object representing the incoming update.
+        datasets (list): The datasets behind the reply, e.g. [("fuelMix", "ALL")].
+    """
+    ages = [dataset_age(dataset) for dataset in datasets]
+    ages = [age for age in ages if age is not None]
+    if not ages or max(ages) < STALE_AFTER:
+        return
+    minutes = int(max(ages).total_seconds() // 60)
+    age_text = f"{minutes} minutes" if minutes < 120 else f"about {minutes // 60} hours"
+    await update.message.reply_html(
+        f"⚠️ The <a href='https://www.smartgriddashboard.com'>EirGrid website</a> is not responding at the moment, so this is based on the latest data we have, from {age_text} ago."
+    )
 
 
 async def send_co2_intensity_plot(
@@ -13,7 +58,7 @@ async def send_co2_intensity_plot(
     """
     Asynchronously sends a CO2 intensity trend plot to a chat in Telegram.
 
-    This function generates a visualization of today's CO2 emission trends and intensity levels, highlighting expected changes throughout the day. It then sends this visualization to a specified chat, along with a caption explaining the plot.
+    This function generates a visualization of the CO2 emission trends and intensity levels forecast for the rest of today and, where the local forecast extends it, tomorrow. It then sends this visualization to a specified chat, along with a caption explaining the plot.
 
     Args:
         update (Update): The update object representing the incoming update.
@@ -23,44 +68,59 @@ async def send_co2_intensity_plot(
     """
 
     caption_text = (
-        "🎨 This visualisation presents today's CO2 emission trends and intensity levels, "
-        "emphasizing expected changes over the course of the day. The blue line delineates the emission trend, accompanied by "
+        "🎨 This visualisation presents the CO2 emission trends and intensity levels forecast for the rest of today and, "
+        "where the blue line turns dashed, for tomorrow from our own, less certain forecast. The blue line delineates the emission trend, accompanied by "
         "color-coded circles indicating value intensity at specific points. Additionally, colored circles positioned at the bottom "
         "of the image correspond to intensity levels at 30-minute intervals—green signifies low intensity, orange denotes medium, "
-        "and red indicates high intensity. This guide is designed to assist in planning energy usage with environmental impact in mind."
+        "and red indicates high intensity. Where past forecasts are known, the shaded band shows the range the intensity "
+        "turned out within in 8 out of 10 cases, and stars mark low periods that stay low across that range. "
+        "This guide is designed to assist in planning energy usage with environmental impact in mind."
     )
 
     chat_id = update.effective_chat.id
 
-    # Call the function to generate the plot
-    plt = co2_plot_trend(df_)
+    def render():
+        # Call the function to generate the plot
+        plt = co2_plot_trend(df_)
 
-    # Save the plot to a BytesIO buffer
-    buf = BytesIO()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    plt.close()  # Make sure to close the plot to free up memory
+        # Save the plot to a BytesIO buffer
+        buf = BytesIO()
+        plt.savefig(buf, format="png")
+        plt.close()  # Make sure to close the plot to free up memory
+        return buf.getvalue()
+
+    # The plot is only rendered again when the forecast changed
+    png = memoized("co2_plot", df_.attrs.get("fingerprint"), render)
 
     # Send the photo
-    await context.bot.send_photo(chat_id=chat_id, photo=buf, caption=caption_text)
+    await context.bot.send_photo(
+        chat_id=chat_id, photo=BytesIO(png), caption=caption_text
+    )
 
 
-def carbon_forecast_intensity_prompts():
+async def carbon_forecast_intensity_prompts(region=DEFAULT_REGION):
     """
     Generates prompts and data for CO2 intensity forecasts, including analysis and visualization preparation.
 
     Fetches CO2 forecast data, performs intensity analysis, categorizes emission periods, and prepares data for generating GPT prompts and visualizations. If any data retrieval or processing step fails, it returns None for all output values.
 
+    Args:
+        region (str): The region of the forecast ("ROI", "NI" or "ALL").
+
     Returns:
-        tuple: Contains the today's date, EU standards summary text, quantile-based summary text, and a DataFrame prepared for trend analysis and visualization, or None values if data retrieval fails.
+        tuple: Contains the dates of the forecast, EU standards summary text, quantile-based summary text, and a DataFrame prepared for trend analysis and visualization, or None values if data retrieval fails.
     """
     df_carbon_forecast_indexed = None
     co2_stats_prior_day = None
     df_carbon_intensity_recent = None
     # user_first_name
     # Proceed with your existing logic here...
-    df_carbon_forecast_indexed = carbon_api_forecast()
-    co2_stats_prior_day, df_carbon_intensity_recent = carbon_api_intensity()
+    # Both requests run concurrently without blocking other chats
+    df_carbon_forecast_indexed, (co2_stats_prior_day, df_carbon_intensity_recent) = (
+        await asyncio.gather(
+            carbon_api_forecast_async(region), carbon_api_intensity_async(region)
+        )
+    )
     # Check if either API call failed
     if (
         df_carbon_forecast_indexed is None
@@ -71,17 +131,50 @@ def carbon_forecast_intensity_prompts():
 
     # Exit the function early since we can't proceed without the data
     else:
-        # df_carbon_forecast_indexed = carbon_api_forecast()
-        # co2_stats_prior_day, df_carbon_intensity_recent = carbon_api_intensity()
-        df_ = status_classification(df_carbon_forecast_indexed, co2_stats_prior_day)
-        # data analysis & adding category per hours
-        summary_text, df_with_trend = find_optimized_relative_periods(df_)
-        today_date = df_with_trend.index[0].strftime("%d/%m/%Y")
-        eu_summary_text = optimize_categorize_periods(df_with_trend)
-        quantile_summary_text, df_with_trend_ = find_optimized_relative_periods(
-            df_with_trend
-        )  # Generate this based on your DataFrame
-        return today_date, eu_summary_text, quantile_summary_text, df_with_trend
+        # co2_fc ends at midnight, so the local forecast adds guidance up to the end of tomorrow
+        df_carbon_forecast_indexed = await extend_forecast_async(
+            df_carbon_forecast_indexed, region
+        )
+        # Past errors of the archived forecasts give the prediction interval of each value
+        df_carbon_forecast_indexed = await add_bands_async(
+            df_carbon_forecast_indexed, region
+        )
+        # The forecast and yesterday's statistics decide the result, so the analysis only runs again when either changes
+        key = (
+            df_carbon_forecast_indexed.attrs["fingerprint"],
+            fingerprint(*co2_stats_prior_day.values()),
+        )
+        return memoized(
+            "co2_prompts",
+            key,
+            lambda: analyse_carbon_forecast(
+                df_carbon_forecast_indexed, co2_stats_prior_day
+            ),
+        )
+
+
+def analyse_carbon_forecast(df_carbon_forecast_indexed, co2_stats_prior_day):
+    """
+    Classifies the CO2 forecast and summarises its low, medium and high periods, see `carbon_forecast_intensity_prompts`.
+
+    Args:
+        df_carbon_forecast_indexed (pd.DataFrame): The forecast as returned by `carbon_api_forecast_async`.
+        co2_stats_prior_day (dict): The 'mean', 'min' and 'max' CO2 intensity of the last 24 hours.
+
+    Returns:
+        tuple: Contains the dates of the forecast (e.g. "17/10/2026 to 18/10/2026"), EU standards summary text, quantile-based summary text, and a DataFrame prepared for trend analysis and visualization.
+    """
+    # Each step adds its columns to the same frame, which the forecast processing built for this request
+    df_ = status_classification(df_carbon_forecast_indexed, co2_stats_prior_day)
+    # data analysis & adding category per hours
+    quantile_summary_text, df_with_trend = find_optimized_relative_periods(df_)
+    # The forecast runs into tomorrow once the local forecast extends it
+    first, last = df_with_trend.index[0], df_with_trend.index[-1]
+    forecast_dates = first.strftime("%d/%m/%Y")
+    if last.normalize() != first.normalize():
+        forecast_dates += last.strftime(" to %d/%m/%Y")
+    eu_summary_text = optimize_categorize_periods(df_with_trend)
+    return forecast_dates, eu_summary_text, quantile_summary_text, df_with_trend
 
 
 async def telegram_carbon_intensity(update, context, user_first_name):
@@ -99,8 +192,14 @@ async def telegram_carbon_intensity(update, context, user_first_name):
         None: Directly sends messages and data visualizations to the user.
     """
 
-    today_date, eu_summary_text, quantile_summary_text, df_with_trend = (
-        carbon_forecast_intensity_prompts()
+    (
+        (forecast_dates, eu_summary_text, quantile_summary_text, df_with_trend),
+        (now_time, now_intensity, now_estimated),
+        backtest_summary,
+    ) = await asyncio.gather(
+        carbon_forecast_intensity_prompts(user_region(context)),
+        current_intensity_async(user_region(context)),
+        backtest_summary_async(user_region(context)),
     )
     if (
         eu_summary_text is None
@@ -114,12 +213,25 @@ async def telegram_carbon_intensity(update, context, user_first_name):
     else:
 
         prompt = create_combined_gpt_prompt(
-            today_date, eu_summary_text, quantile_summary_text
+            forecast_dates, eu_summary_text, quantile_summary_text
         )
 
         # get generated prompt
-        gpt_recom = opt_gpt_summarise(prompt)
+        # The prompt only depends on the forecast, so its summary is reused until the forecast changes
+        gpt_recom = opt_gpt_summarise(prompt, df_with_trend.attrs.get("fingerprint"))
+        region = user_region(context)
+        await send_stale_data_note(
+            update, [("co2_fc", region), ("co2intensity", region)]
+        )
         await update.message.reply_text(gpt_recom)
+        if now_intensity is not None:
+            source = " (estimated from the live fuel mix)" if now_estimated else ""
+            await update.message.reply_text(
+                f"🌍 Right now ({now_time:%H:%M}): {now_intensity:.0f} gCO2/kWh{source}"
+            )
+        reliability = reliability_text(backtest_summary)
+        if reliability is not None:
+            await update.message.reply_text(reliability)
         if len(df_with_trend) > 1:
             await send_co2_intensity_plot(update, context, df_with_trend)
         # slice the energy saving actions part
@@ -153,8 +265,8 @@ async def telegram_personalised_handler(update, context, user_first_name, user_q
     """
     if "quantile_summary_text" not in context.user_data:
 
-        today_date, eu_summary_text, quantile_summary_text, df_with_trend = (
-            carbon_forecast_intensity_prompts()
+        forecast_dates, eu_summary_text, quantile_summary_text, df_with_trend = (
+            await carbon_forecast_intensity_prompts(user_region(context))
         )
         if (
             eu_summary_text is None
@@ -228,7 +340,7 @@ async def pie_chart_fuel_mix(update, context, df, net_import_status, current_tim
         colors=pastel_pie_colors,
         wedgeprops=dict(width=0.3),
     )
-    plt.title(f"Fuel Mix (MWh) Distribution (%)- {current_time}")
+    plt.title(f"Fuel Mix (MWh) Distribution (%) - 24 hours to {current_time}")
     plt.axis("equal")  # Equal aspect ratio ensures that pie is drawn as a circle.
     plt.tight_layout()
     # plt.show()
@@ -237,7 +349,7 @@ async def pie_chart_fuel_mix(update, context, df, net_import_status, current_tim
     plt.savefig(buf, format="png")
     buf.seek(0)
     plt.close()  # Make sure to close the plot to free up memory
-    caption_text = "📊 Explore the diversity of Ireland energy sources: from the strength of 🌿 renewables to the power of 🌬️ gas and 🪨 coal, each plays a crucial role in our energy mix. A colorful snapshot of how we power our world!"
+    caption_text = f"📊 Explore the diversity of energy sources in {REGION_NAMES[user_region(context)]}: from the strength of 🌿 renewables to the power of 🌬️ gas and 🪨 coal, each plays a crucial role in our energy mix. A colorful snapshot of how we power our world!"
     # Send the photo
     chat_id = update.effective_chat.id
     await context.bot.send_photo(chat_id=chat_id, photo=buf, caption=caption_text)
@@ -260,7 +372,8 @@ async def telegram_fuel_mix(update, context, user_first_name):
     fuel_mix_eirgrid = None
     net_import_status = None
 
-    fuel_mix_eirgrid, net_import_status = fuel_mix()
+    region = user_region(context)
+    fuel_mix_eirgrid, net_import_status = await fuel_mix_series_async(region)
 
     if fuel_mix_eirgrid is None or net_import_status is None:
         await update.message.reply_html(
@@ -276,6 +389,7 @@ async def telegram_fuel_mix(update, context, user_first_name):
         )
         fuel_mix_response_from_gpt = opt_gpt_summarise(promopt_for_fuel_mix)
 
+        await send_stale_data_note(update, [("fuelMix", region)])
         await update.message.reply_text(fuel_mix_response_from_gpt)
         await pie_chart_fuel_mix(
             update, context, fuel_mix_eirgrid, net_import_status, now
@@ -301,7 +415,7 @@ async def send_plot_wind_demand(update, context, area_plot_wind_demand):
     area_plot_wind_demand.savefig(buf, format="png", dpi=300)
     buf.seek(0)
     area_plot_wind_demand.close()  # Make sure to close the plot to free up memory
-    caption_text = "📉 Today's Energy in Ireland: See how wind power helps meet our electricity needs throughout the day. A simple look at our journey towards greener energy."
+    caption_text = f"📉 Today's Energy in {REGION_NAMES[user_region(context)]}: See how wind power helps meet our electricity needs throughout the day. A simple look at our journey towards greener energy."
     # Send the photo
     chat_id = update.effective_chat.id
     await context.bot.send_photo(chat_id=chat_id, photo=buf, caption=caption_text)
@@ -311,8 +425,8 @@ async def telegram_wind_analysis(update, context, user_first_name):
     wind = None
     demand = None
 
-    wind = wind_gen_cal()
-    demand = actual_demand_cal()
+    region = user_region(context)
+    wind, demand = await wind_demand_async(region)
 
     if wind is None or demand is None:
         await update.message.reply_html(
@@ -320,10 +434,59 @@ async def telegram_wind_analysis(update, context, user_first_name):
         )
         return
     else:
-        demand_stats = calculate_stats_wind_demand(demand)
-        wind_stats = calculate_stats_wind_demand(wind)
+        demand_stats = recent_stats_wind_demand("demandactual", region, demand)
+        wind_stats = recent_stats_wind_demand("windactual", region, wind)
         prompt_for_wind_demand = create_wind_demand_prompt(demand_stats, wind_stats)
         wind_demand_summary = wind_and_demand_report(prompt_for_wind_demand)
         plot_demand_vs_wind = area_plot_wind_demand(demand, wind)
+        await send_stale_data_note(
+            update, [("windactual", region), ("demandactual", region)]
+        )
         await send_plot_wind_demand(update, context, plot_demand_vs_wind)
         await update.message.reply_text(wind_demand_summary)
+        # Ramps were detected as the data arrived, so they are read from the store rather than from the series
+        ramps = await ramp_events_async(region, wind.index[0], wind.index[-1])
+        if ramps is not None and not ramps.empty:
+            await update.message.reply_text(
+                "🌬️ Large swings in wind generation:\n" + ramp_lines(ramps)
+            )
+
+
+async def telegram_snsp(update, context, user_first_name):
+    """
+    Sends today's System Non-Synchronous Penetration curve with its peak, and the statistics of the last week.
+
+    SNSP is published for the whole island, so the user's region does not apply.
+
+    Args:
+        update (telegram.Update): Object representing an incoming update.
+        context (telegram.ext.CallbackContext): Context object for sending replies.
+        user_first_name (str): The first name of the user, used to personalize the response.
+    """
+    summary = await snsp_async()
+    if summary is None:
+        await update.message.reply_html(
+            f"Sorry, {user_first_name} 😔. We're currently unable to retrieve the necessary data due to issues with the <a href='https://www.smartgriddashboard.com'>EirGrid website</a> 🌐. Please try again later. We appreciate your understanding 🙏."
+        )
+        return
+
+    def render():
+        plot = snsp_plot(summary["curve"], summary["today"])
+        buf = BytesIO()
+        plot.savefig(buf, format="png")
+        plot.close()  # Make sure to close the plot to free up memory
+        return buf.getvalue()
+
+    # The plot is only rendered again when the curve changed
+    curve = summary["curve"]
+    png = memoized(
+        "snsp_plot", fingerprint(curve.index.to_numpy(), curve.to_numpy()), render
+    )
+
+    await send_stale_data_note(update, [(SNSP_AREA, SNSP_REGION)])
+    await context.bot.send_photo(
+        chat_id=update.effective_chat.id,
+        photo=BytesIO(png),
+        caption="🌬️☀️ Today's SNSP across the island: how much of our electricity comes from wind, solar and imports.",
+    )
+    await update.message.reply_text(snsp_text(summary))
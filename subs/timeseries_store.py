@@ -0,0 +1,525 @@
+import asyncio
+import contextlib
+import datetime
+import json
+import math
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from subs.eirgrid_time import effective_time_to_datetime
+
+# Location of the local SQLite store, overridable through the environment
+STORE_PATH = os.environ.get(
+    "ENERGY_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "energy_store.db"),
+)
+
+# Timestamps are stored as seconds since the epoch of EirGrid's (naive, Irish local) EffectiveTime.
+# Forecasts are archived as vintages, one per distinct forecast fetched, with forecast_values holding only the
+# target times whose value differs from the vintage before (NULL where a value was withdrawn). A vintage's
+# forecast for a target is the latest value issued at or before it, a single lookup in the primary key.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    area TEXT NOT NULL,
+    region TEXT NOT NULL,
+    field_name TEXT NOT NULL,
+    effective_time INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (area, region, field_name, effective_time)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS forecast_vintages (
+    region TEXT NOT NULL,
+    issued_at INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    first_target INTEGER NOT NULL,
+    last_target INTEGER NOT NULL,
+    PRIMARY KEY (region, issued_at)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS forecast_values (
+    region TEXT NOT NULL,
+    effective_time INTEGER NOT NULL,
+    issued_at INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (region, effective_time, issued_at)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS backtest_summaries (
+    region TEXT NOT NULL,
+    computed_at INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    PRIMARY KEY (region, computed_at)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS wind_ramps (
+    region TEXT NOT NULL,
+    start_time INTEGER NOT NULL,
+    end_time INTEGER NOT NULL,
+    start_value REAL NOT NULL,
+    end_value REAL NOT NULL,
+    PRIMARY KEY (region, start_time)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS backfill_chunks (
+    area TEXT NOT NULL,
+    region TEXT NOT NULL,
+    day TEXT NOT NULL,
+    PRIMARY KEY (area, region, day)
+) WITHOUT ROWID;
+"""
+
+
+# (area, region) -> (earliest start, quarter hour) this process last synced, so each range is fetched once
+_synced = {}
+
+
+# Store files whose schema was created by this process
+_schema_created = set()
+
+
+@contextlib.contextmanager
+def _connect():
+    # One connection per transaction, so the worker threads never share one. It commits on success, rolls back on
+    # error and is closed either way
+    if STORE_PATH not in _schema_created:
+        os.makedirs(os.path.dirname(STORE_PATH) or ".", exist_ok=True)
+        with contextlib.closing(sqlite3.connect(STORE_PATH)) as connection:
+            connection.executescript(_SCHEMA)
+        _schema_created.add(STORE_PATH)
+    with contextlib.closing(sqlite3.connect(STORE_PATH)) as connection:
+        with connection:
+            yield connection
+
+
+def _to_epoch(dt):
+    return int(pd.Timestamp(dt).value // 10**9)
+
+
+def last_timestamp(area, region):
+    """Returns the time of the last stored non-empty value for an area and region.
+
+    Args:
+        area (str): The EirGrid data area, e.g. "co2intensity".
+        region (str): The region ("ROI", "NI" or "ALL").
+
+    Returns:
+        datetime: The last timestamp with a value, or None if nothing is stored yet.
+    """
+    with _connect() as connection:
+        (last,) = connection.execute(
+            "SELECT MAX(effective_time) FROM observations "
+            "WHERE area = ? AND region = ? AND value IS NOT NULL",
+            (area, region),
+        ).fetchone()
+    if last is None:
+        return None
+    return pd.Timestamp(last, unit="s").to_pydatetime()
+
+
+def first_timestamp(area, region):
+    """Returns the time of the first stored row for an area and region, with or without a value.
+
+    Args:
+        area (str): The EirGrid data area, e.g. "co2intensity".
+        region (str): The region ("ROI", "NI" or "ALL").
+
+    Returns:
+        datetime: The first stored timestamp, or None if nothing is stored yet.
+    """
+    with _connect() as connection:
+        (first,) = connection.execute(
+            "SELECT MIN(effective_time) FROM observations WHERE area = ? AND region = ?",
+            (area, region),
+        ).fetchone()
+    if first is None:
+        return None
+    return pd.Timestamp(first, unit="s").to_pydatetime()
+
+
+def _insert_rows(connection, area, region, df):
+    if df.empty:
+        return
+    effective_time = effective_time_to_datetime(df["EffectiveTime"])
+    records = zip(
+        effective_time.to_numpy().astype("datetime64[s]").astype(np.int64),
+        df["FieldName"],
+        df["Value"].astype(float),
+    )
+    connection.executemany(
+        "INSERT OR REPLACE INTO observations "
+        "(area, region, field_name, effective_time, value) VALUES (?, ?, ?, ?, ?)",
+        [
+            (area, region, field, int(ts), None if pd.isna(value) else value)
+            for ts, field, value in records
+        ],
+    )
+
+
+def upsert_frame(area, region, df):
+    """Writes raw EirGrid rows into the store, replacing rows already stored for the same times.
+
+    Rows without a value are kept so gaps stay visible, and are overwritten once EirGrid publishes them.
+
+    Args:
+        area (str): The EirGrid data area the rows belong to.
+        region (str): The region the rows belong to.
+        df (pd.DataFrame): Raw rows as returned by `eirgrid_api`, with 'EffectiveTime', 'FieldName' and 'Value'.
+    """
+    if df.empty:
+        return
+    with _connect() as connection:
+        _insert_rows(connection, area, region, df)
+
+
+def backfilled_days(area, region):
+    """Returns the days already downloaded by a backfill for an area and region.
+
+    Args:
+        area (str): The EirGrid data area, e.g. "fuelMix".
+        region (str): The region ("ROI", "NI" or "ALL").
+
+    Returns:
+        set: The completed days as `datetime.date` objects.
+    """
+    with _connect() as connection:
+        rows = connection.execute(
+            "SELECT day FROM backfill_chunks WHERE area = ? AND region = ?",
+            (area, region),
+        ).fetchall()
+    return {datetime.date.fromisoformat(day) for (day,) in rows}
+
+
+def store_backfill_day(area, region, day, df, complete=True):
+    """Writes the rows of one backfilled day and, in the same transaction, records the day as done.
+
+    Because both happen together, an interrupted backfill never skips a day whose rows were not written.
+
+    Args:
+        area (str): The EirGrid data area the rows belong to.
+        region (str): The region the rows belong to.
+        day (datetime.date): The day the rows cover.
+        df (pd.DataFrame): Raw rows as returned by `eirgrid_api`.
+        complete (bool): Whether the day is over. Days still in progress are stored but fetched again next time.
+    """
+    with _connect() as connection:
+        _insert_rows(connection, area, region, df)
+        if complete:
+            connection.execute(
+                "INSERT OR REPLACE INTO backfill_chunks (area, region, day) VALUES (?, ?, ?)",
+                (area, region, day.isoformat()),
+            )
+
+
+def read_window(area, region, start, end):
+    """Reads the stored rows of an area and region within a time window.
+
+    Args:
+        area (str): The EirGrid data area, e.g. "windactual".
+        region (str): The region ("ROI", "NI" or "ALL").
+        start (datetime): The start of the window (inclusive).
+        end (datetime): The end of the window (inclusive).
+
+    Returns:
+        pd.DataFrame: Rows with 'EffectiveTime' (datetime), 'FieldName', 'Region' and 'Value' columns, sorted by time,
+        in the same shape as `eirgrid_api` returns.
+    """
+    with _connect() as connection:
+        df = pd.read_sql_query(
+            "SELECT effective_time AS EffectiveTime, field_name AS FieldName, "
+            "region AS Region, value AS Value FROM observations "
+            "WHERE area = ? AND region = ? AND effective_time BETWEEN ? AND ? "
+            "ORDER BY effective_time, field_name",
+            connection,
+            params=(area, region, _to_epoch(start), _to_epoch(end)),
+        )
+    df["EffectiveTime"] = pd.to_datetime(df["EffectiveTime"], unit="s")
+    df["Value"] = df["Value"].astype(float)
+    return df
+
+
+async def sync_area(area, region, bootstrap_start, fetch):
+    """Brings the store up to date for an area and region by fetching only what is missing.
+
+    The request starts at the last stored value (so late or revised values are refreshed) and ends at the current
+    quarter hour. When nothing is stored yet, or the store is older than `bootstrap_start`, the fetch starts at
+    `bootstrap_start` instead. When the store starts after `bootstrap_start`, the older range is fetched first, so a
+    caller that needs more history than earlier callers gets it. Once an area is synced for the current quarter hour
+    from `bootstrap_start` or earlier, further calls do nothing.
+
+    Args:
+        area (str): The EirGrid data area, e.g. "demandactual".
+        region (str): The region ("ROI", "NI" or "ALL").
+        bootstrap_start (datetime): The earliest time the caller needs.
+        fetch (callable): A coroutine function `fetch(area, region, start, end)` returning raw rows for a window
+            of datetimes, e.g. a wrapper around `eirgrid_api_async`.
+    """
+    now = datetime.datetime.now()
+    end = now.replace(minute=(now.minute // 15) * 15, second=0, microsecond=0)
+    synced_from, synced_until = _synced.get((area, region), (None, None))
+    if synced_from is not None and synced_from <= bootstrap_start:
+        if synced_until == end:
+            return
+    else:
+        synced_from = None
+
+    first = await asyncio.to_thread(first_timestamp, area, region)
+    last = await asyncio.to_thread(last_timestamp, area, region)
+    if last is None or last < bootstrap_start:
+        windows = [(bootstrap_start, end)]
+    else:
+        windows = [(last, end)]
+        # Older history is only asked for once per process, in case EirGrid has nothing that far back
+        if synced_from is None and first > bootstrap_start:
+            windows.insert(0, (bootstrap_start, first))
+
+    for start, window_end in windows:
+        df = await fetch(area, region, start, window_end)
+        await asyncio.to_thread(upsert_frame, area, region, df)
+    _synced[(area, region)] = (
+        bootstrap_start if synced_from is None else synced_from,
+        end,
+    )
+
+
+def store_forecast(region, issued_at, columns):
+    """Archives one co2_fc forecast as a new vintage, so it can be compared with the actual intensity later.
+
+    Nothing is stored if the forecast has the same content as the latest vintage. Otherwise only the target
+    times whose value changed since the latest vintage are written.
+
+    Args:
+        region (str): The region of the forecast ("ROI", "NI" or "ALL").
+        issued_at (datetime): When the forecast was fetched.
+        columns (dict): The forecast rows decoded by `parse_rows`.
+
+    Returns:
+        bool: True if a new vintage was stored.
+    """
+    times = columns["EffectiveTime"]
+    if not len(times):
+        return False
+    issued = _to_epoch(issued_at)
+    first, last = int(times.min()), int(times.max())
+    forecast = {
+        time: None if math.isnan(value) else value
+        for time, value in zip(times.tolist(), columns["Value"].tolist())
+    }
+
+    with _connect() as connection:
+        latest = connection.execute(
+            "SELECT issued_at, fingerprint FROM forecast_vintages WHERE region = ? "
+            "ORDER BY issued_at DESC LIMIT 1",
+            (region,),
+        ).fetchone()
+        if latest is not None and (
+            latest[1] == columns["fingerprint"] or latest[0] >= issued
+        ):
+            return False
+
+        # SQLite takes the value from the row with the MAX, i.e. the current value of each target time
+        current = {
+            time: value
+            for time, value, _ in connection.execute(
+                "SELECT effective_time, value, MAX(issued_at) FROM forecast_values "
+                "WHERE region = ? AND effective_time BETWEEN ? AND ? GROUP BY effective_time",
+                (region, first, last),
+            )
+        }
+        connection.executemany(
+            "INSERT INTO forecast_values (region, effective_time, issued_at, value) VALUES (?, ?, ?, ?)",
+            [
+                (region, time, issued, forecast.get(time))
+                for time in sorted(current.keys() | forecast.keys())
+                if current.get(time) != forecast.get(time)
+            ],
+        )
+        connection.execute(
+            "INSERT INTO forecast_vintages (region, issued_at, fingerprint, first_target, last_target) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (region, issued, columns["fingerprint"], first, last),
+        )
+    return True
+
+
+def forecast_as_of(region, target, as_of):
+    """Returns what the latest forecast issued at or before a time predicted for a target time.
+
+    Args:
+        region (str): The region ("ROI", "NI" or "ALL").
+        target (datetime): The target time on the grid of the forecast, e.g. 18:00.
+        as_of (datetime): The time of the question, e.g. 09:00 of the same day.
+
+    Returns:
+        float: The forecast gCO2/kWh, or None if no forecast of that time covered the target.
+    """
+    target, as_of = _to_epoch(target), _to_epoch(as_of)
+    with _connect() as connection:
+        vintage = connection.execute(
+            "SELECT issued_at, first_target, last_target FROM forecast_vintages "
+            "WHERE region = ? AND issued_at <= ? ORDER BY issued_at DESC LIMIT 1",
+            (region, as_of),
+        ).fetchone()
+        if vintage is None or not vintage[1] <= target <= vintage[2]:
+            return None
+        row = connection.execute(
+            "SELECT value FROM forecast_values WHERE region = ? AND effective_time = ? "
+            "AND issued_at <= ? ORDER BY issued_at DESC LIMIT 1",
+            (region, target, vintage[0]),
+        ).fetchone()
+    return None if row is None else row[0]
+
+
+def read_forecast_vintages(region, start, end):
+    """Reads every archived forecast vintage in full for target times within a window.
+
+    Args:
+        region (str): The region ("ROI", "NI" or "ALL").
+        start (datetime): The first target time (inclusive).
+        end (datetime): The last target time (inclusive).
+
+    Returns:
+        pd.DataFrame: 'issued_at' and 'effective_time' (int64 seconds since the epoch) and 'forecast' (gCO2/kWh),
+        one row per value of each vintage, sorted by issue time and target time.
+    """
+    start, end = _to_epoch(start), _to_epoch(end)
+    with _connect() as connection:
+        vintages = pd.read_sql_query(
+            "SELECT issued_at, first_target, last_target FROM forecast_vintages "
+            "WHERE region = ? AND last_target >= ? AND first_target <= ? ORDER BY issued_at",
+            connection,
+            params=(region, start, end),
+        )
+        changes = pd.read_sql_query(
+            "SELECT effective_time, issued_at, value AS forecast FROM forecast_values "
+            "WHERE region = ? AND effective_time BETWEEN ? AND ? ORDER BY issued_at",
+            connection,
+            params=(region, start, end),
+        )
+
+    # Every target time of a vintage has a change at or before it, so the targets are those of the changes
+    targets = np.unique(changes["effective_time"].to_numpy(dtype=np.int64))
+    low = np.searchsorted(targets, np.maximum(vintages["first_target"], start))
+    high = np.searchsorted(
+        targets, np.minimum(vintages["last_target"], end), side="right"
+    )
+    counts = np.maximum(high - low, 0)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    grid = pd.DataFrame(
+        {
+            "issued_at": np.repeat(
+                vintages["issued_at"].to_numpy(dtype=np.int64), counts
+            ),
+            "effective_time": targets[np.repeat(low, counts) + offsets],
+        }
+    )
+
+    # Each value of a vintage is the latest change of its target issued at or before the vintage
+    changes["issued_at"] = changes["issued_at"].astype(np.int64)
+    changes["effective_time"] = changes["effective_time"].astype(np.int64)
+    forecasts = pd.merge_asof(grid, changes, on="issued_at", by="effective_time")
+    return forecasts.dropna(subset=["forecast"]).sort_values(
+        ["issued_at", "effective_time"], ignore_index=True
+    )
+
+
+def read_forecast_pairs(region, start, end):
+    """Reads the archived forecasts for target times within a window, each joined with the actual intensity.
+
+    Args:
+        region (str): The region ("ROI", "NI" or "ALL").
+        start (datetime): The first target time (inclusive).
+        end (datetime): The last target time (inclusive).
+
+    Returns:
+        pd.DataFrame: 'issued_at' and 'effective_time' (int64 seconds since the epoch), 'forecast' and 'actual'
+        (gCO2/kWh), one row per forecast value whose target time has a published co2intensity value, sorted by
+        issue time and target time.
+    """
+    forecasts = read_forecast_vintages(region, start, end)
+    with _connect() as connection:
+        actuals = pd.read_sql_query(
+            "SELECT effective_time, value AS actual FROM observations "
+            "WHERE area = 'co2intensity' AND region = ? AND effective_time BETWEEN ? AND ? "
+            "AND value IS NOT NULL",
+            connection,
+            params=(region, _to_epoch(start), _to_epoch(end)),
+        )
+    # Joined here rather than in SQL, which would scan the observations once per forecast row
+    actuals["effective_time"] = actuals["effective_time"].astype(np.int64)
+    pairs = forecasts.merge(actuals, on="effective_time")
+    return pairs.sort_values(["issued_at", "effective_time"], ignore_index=True)
+
+
+def store_backtest_summary(region, computed_at, summary):
+    """Keeps the result of a backtest, see `latest_backtest_summary`.
+
+    Args:
+        region (str): The region the backtest covers.
+        computed_at (datetime): When the backtest ran.
+        summary (dict): The JSON-serialisable summary.
+    """
+    with _connect() as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO backtest_summaries (region, computed_at, summary) VALUES (?, ?, ?)",
+            (region, _to_epoch(computed_at), json.dumps(summary)),
+        )
+
+
+def latest_backtest_summary(region):
+    """Returns the summary of the latest backtest of a region, or None if none ran yet.
+
+    Args:
+        region (str): The region ("ROI", "NI" or "ALL").
+
+    Returns:
+        dict: The summary as stored by `store_backtest_summary`.
+    """
+    with _connect() as connection:
+        row = connection.execute(
+            "SELECT summary FROM backtest_summaries WHERE region = ? "
+            "ORDER BY computed_at DESC LIMIT 1",
+            (region,),
+        ).fetchone()
+    return None if row is None else json.loads(row[0])
+
+
+def store_ramps(region, events):
+    """Writes detected wind ramps into the store, replacing earlier versions of ramps that are still growing.
+
+    Args:
+        region (str): The region of the ramps ("ROI", "NI" or "ALL").
+        events (list): Ramps as (start time, end time, start MW, end MW), with times in seconds since the epoch.
+    """
+    if not events:
+        return
+    with _connect() as connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO wind_ramps (region, start_time, end_time, start_value, end_value) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(region, *event) for event in events],
+        )
+
+
+def read_ramps(region, start, end):
+    """Reads the stored wind ramps of a region that overlap a time window.
+
+    Args:
+        region (str): The region ("ROI", "NI" or "ALL").
+        start (datetime): The start of the window (inclusive).
+        end (datetime): The end of the window (inclusive).
+
+    Returns:
+        pd.DataFrame: 'start_time' and 'end_time' (datetime), 'start_value' and 'end_value' (MW), sorted by start time.
+    """
+    with _connect() as connection:
+        df = pd.read_sql_query(
+            "SELECT start_time, end_time, start_value, end_value FROM wind_ramps "
+            "WHERE region = ? AND end_time >= ? AND start_time <= ? ORDER BY start_time",
+            connection,
+            params=(region, _to_epoch(start), _to_epoch(end)),
+        )
+    df["start_time"] = pd.to_datetime(df["start_time"], unit="s")
+    df["end_time"] = pd.to_datetime(df["end_time"], unit="s")
+    return df
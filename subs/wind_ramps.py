@@ -0,0 +1,163 @@
+import asyncio
+import datetime
+import math
+import numpy as np
+from subs.eirgrid_time import effective_time_to_datetime
+from subs.gap_fill import last_valid_position
+from subs.timeseries_store import read_ramps, read_window, store_ramps
+
+SLOT_SECONDS = 15 * 60
+
+# A ramp is a change in wind generation of at least the region's threshold within RAMP_SLOTS quarter hours
+RAMP_SLOTS = 4
+RAMP_THRESHOLDS = {"ALL": 500.0, "ROI": 400.0, "NI": 120.0}
+# History replayed when a detector starts, so a ramp in progress is picked up with the same start as before
+SEED = datetime.timedelta(hours=6)
+
+# region -> RampDetector of the windactual series of that region
+_detectors = {}
+
+
+class RampDetector:
+    """Detects wind ramps in a quarter-hourly series, one point at a time.
+
+    Each point is compared with the point RAMP_SLOTS quarter hours earlier, held in a small circular buffer. A ramp
+    starts when that change reaches the threshold, and grows while the change stays beyond the threshold in the
+    same direction. Every point costs the same constant work, however long the series or the ramp.
+    """
+
+    def __init__(self, threshold, slots=RAMP_SLOTS):
+        self.threshold = threshold
+        self.slots = slots
+        self._window = [math.nan] * (slots + 1)
+        # Consecutive published points in the window, up to slots + 1
+        self._valid = 0
+        self.last_time = None
+        # The ramp in progress as [start time, end time, start MW, end MW] and its direction (1 up, -1 down)
+        self.ramp = None
+        self._direction = 0
+
+    def _reset(self):
+        self._valid = 0
+        self.ramp = None
+        self._direction = 0
+
+    def process(self, time, value):
+        """Adds the next point of the series.
+
+        Args:
+            time (int): Seconds since the epoch, on the quarter-hour grid.
+            value (float): MW, NaN where nothing is published.
+
+        Returns:
+            tuple: The ramp in progress after this point as (start time, end time, start MW, end MW), or None.
+        """
+        if self.last_time is not None and time <= self.last_time:
+            return None
+        if self.last_time is None or time != self.last_time + SLOT_SECONDS:
+            self._reset()
+        self.last_time = time
+        if math.isnan(value):
+            self._reset()
+            return None
+
+        position = time // SLOT_SECONDS % (self.slots + 1)
+        # The slot written now held the point `slots` quarter hours ago
+        earlier = self._window[(position + 1) % (self.slots + 1)]
+        self._window[position] = value
+        self._valid = min(self._valid + 1, self.slots + 1)
+        if self._valid <= self.slots:
+            return None
+
+        change = value - earlier
+        direction = 0 if abs(change) < self.threshold else (1 if change > 0 else -1)
+        if direction != self._direction:
+            self.ramp = None
+            self._direction = direction
+        if direction == 0:
+            return None
+        if self.ramp is None:
+            self.ramp = [time - self.slots * SLOT_SECONDS, time, earlier, value]
+        else:
+            self.ramp[1], self.ramp[3] = time, value
+        return tuple(self.ramp)
+
+
+def _points(df):
+    """Returns the int64 times and float64 values of raw rows, up to the last published value."""
+    end = last_valid_position(df["Value"].to_numpy(dtype=np.float64)) + 1
+    times = (
+        effective_time_to_datetime(df["EffectiveTime"])
+        .to_numpy()
+        .astype("datetime64[s]")
+        .astype(np.int64)
+    )
+    return times[:end].tolist(), df["Value"].to_numpy(dtype=np.float64)[:end].tolist()
+
+
+async def record_ramps(region, df):
+    """Runs the ramp detector of a region over new windactual rows and stores the ramps found or extended.
+
+    Values not published yet are left for the next call, so they are processed once they arrive.
+
+    Args:
+        region (str): The region of the rows ("ROI", "NI" or "ALL").
+        df (pd.DataFrame): Raw windactual rows, as returned by `eirgrid_api`, in time order.
+    """
+    if df.empty:
+        return
+    batches = [df]
+    detector = _detectors.get(region)
+    if detector is None:
+        detector = _detectors[region] = RampDetector(RAMP_THRESHOLDS[region])
+        first = effective_time_to_datetime(df["EffectiveTime"]).iloc[0]
+        seed = await asyncio.to_thread(
+            read_window, "windactual", region, first - SEED, first
+        )
+        batches.insert(0, seed)
+
+    # Only the latest extent of each ramp is stored
+    ramps = {}
+    for batch in batches:
+        for time, value in zip(*_points(batch)):
+            ramp = detector.process(time, value)
+            if ramp is not None:
+                ramps[ramp[0]] = ramp
+    await asyncio.to_thread(store_ramps, region, list(ramps.values()))
+
+
+async def ramp_events_async(region, start, end):
+    """Returns the wind ramps stored for a window, see `RampDetector`.
+
+    Args:
+        region (str): The region ("ROI", "NI" or "ALL").
+        start (datetime): The start of the window.
+        end (datetime): The end of the window.
+
+    Returns:
+        pd.DataFrame: See `read_ramps`, or None in case of an error.
+    """
+    try:
+        return await asyncio.to_thread(read_ramps, region, start, end)
+    except Exception:
+        return None
+
+
+def ramp_lines(ramps):
+    """Describes wind ramps for a message, e.g. "⬆️ 06:00 to 08:15: wind rose by 620 MW (810 → 1430 MW)".
+
+    Args:
+        ramps (pd.DataFrame): Ramps as returned by `ramp_events_async`.
+
+    Returns:
+        str: One line per ramp.
+    """
+    lines = []
+    for ramp in ramps.itertuples():
+        change = ramp.end_value - ramp.start_value
+        arrow, verb = ("⬆️", "rose") if change > 0 else ("⬇️", "fell")
+        lines.append(
+            f"{arrow} {ramp.start_time:%H:%M} to {ramp.end_time:%H:%M}: wind {verb} by {abs(change):.0f} MW "
+            f"({ramp.start_value:.0f} → {ramp.end_value:.0f} MW)"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,28 @@
+from subs import timeseries_store
+from subs.backtest import MIN_SUMMARY_COUNT, reliability_text, run_backtest
+
+
+def test_run_backtest_keeps_the_latest_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr(timeseries_store, "STORE_PATH", str(tmp_path / "store.sqlite3"))
+
+    summary = run_backtest("ROI", "2024-01-01", "2024-03-31")
+
+    assert timeseries_store.latest_backtest_summary("ROI") == summary
+    assert timeseries_store.latest_backtest_summary("NI") is None
+
+
+def test_reliability_text_needs_enough_values():
+    summary = dict(
+        count=MIN_SUMMARY_COUNT,
+        mae=23.4,
+        eu_hit_rate=0.87,
+        start="2024-01-01T00:00:00",
+        end="2024-03-31T00:00:00",
+    )
+
+    assert reliability_text(summary) == (
+        "📏 Over the last 90 days, the forecast was off by 23 gCO2/kWh on average and "
+        "picked the right Low / Medium / High level 87% of the time"
+    )
+    assert reliability_text(dict(summary, count=MIN_SUMMARY_COUNT - 1)) is None
+    assert reliability_text(None) is None
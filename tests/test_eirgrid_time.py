@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from subs import timeseries_store
+from subs.eirgrid_time import decode_effective_times
+
+
+def test_decode_effective_times_falls_back_for_unpadded_days():
+    # "1-Jan-2024" is not fixed width, so the rows go through the pandas fallback
+    epochs = decode_effective_times(["1-Jan-2024 00:00:00", "01-Jan-2024 00:15:00"])
+
+    np.testing.assert_array_equal(epochs, [1704067200, 1704068100])
+
+
+def test_upsert_frame_stores_seconds_for_any_datetime_unit(tmp_path, monkeypatch):
+    monkeypatch.setattr(timeseries_store, "STORE_PATH", str(tmp_path / "store.sqlite3"))
+    times = pd.Series(pd.to_datetime(["2024-01-01 00:00", "2024-01-01 00:15"]).as_unit("us"))
+    df = pd.DataFrame({"EffectiveTime": times, "FieldName": "CO2_INTENSITY", "Value": [250.0, 260.0]})
+
+    timeseries_store.upsert_frame("co2intensity", "ROI", df)
+    stored = timeseries_store.read_window(
+        "co2intensity", "ROI", pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-02")
+    )
+
+    assert list(stored["EffectiveTime"]) == list(pd.to_datetime(["2024-01-01 00:00", "2024-01-01 00:15"]))
+    assert list(stored["Value"]) == [250.0, 260.0]
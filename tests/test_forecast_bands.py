@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from subs.forecast_bands import DAY_SECONDS, LEAD_STEP, ErrorBands
+
+# Forecasts issued at midnight for the 48 half hours of the day, over ten days from 2024-01-01
+ISSUED = 1704067200 + DAY_SECONDS * np.repeat(np.arange(10), 48)
+TARGETS = ISSUED + LEAD_STEP * np.tile(np.arange(48), 10)
+ERRORS = np.tile(np.linspace(-30, 30, 48), 10)
+
+
+def pairs(selected=slice(None), errors=ERRORS):
+    return pd.DataFrame(
+        {
+            "issued_at": ISSUED[selected],
+            "effective_time": TARGETS[selected],
+            "forecast": 200.0,
+            "actual": 200.0 + errors[selected],
+        }
+    )
+
+
+def fitted(*updates):
+    bands = ErrorBands()
+    for update in updates:
+        bands.update(update)
+    return bands
+
+
+def test_update_counts_actuals_published_late():
+    published = np.ones(len(TARGETS), dtype=bool)
+    published[-30:-10] = False
+    bands = fitted(pairs(published), pairs())
+
+    expected = fitted(pairs())
+    np.testing.assert_array_equal(bands.counts, expected.counts)
+    np.testing.assert_array_equal(bands.days, expected.days)
+    assert bands.days.max() == 10
+
+
+def test_update_replaces_revised_actuals():
+    revised = ERRORS.copy()
+    revised[-20:] += 50
+    bands = fitted(pairs(errors=revised), pairs(), pairs())
+
+    np.testing.assert_array_equal(bands.counts, fitted(pairs()).counts)
+    np.testing.assert_array_equal(bands.table, fitted(pairs()).table)
@@ -0,0 +1,45 @@
+import numpy as np
+
+from subs.local_forecast import DAY_SECONDS, SLOT_SECONDS, SeasonalModel
+
+# Three days of quarter hours from 2024-01-01
+TIMES = 1704067200 + SLOT_SECONDS * np.arange(3 * DAY_SECONDS // SLOT_SECONDS)
+VALUES = 200 + 50 * np.sin(np.arange(len(TIMES)) / 10)
+
+
+def fitted(times, values):
+    model = SeasonalModel()
+    model.update(times, values)
+    return model
+
+
+def test_update_adds_values_published_late():
+    published = VALUES.copy()
+    published[-20:-10] = np.nan
+    model = fitted(TIMES, published)
+
+    model.update(TIMES, VALUES)
+
+    np.testing.assert_allclose(model.profile(), fitted(TIMES, VALUES).profile())
+    assert model.fitted_until == TIMES[-1]
+
+
+def test_update_replaces_revised_values():
+    first = VALUES.copy()
+    first[-5:] += 40
+    model = fitted(TIMES[:-2], first[:-2])
+
+    model.update(TIMES, VALUES)
+    model.update(TIMES, VALUES)
+
+    np.testing.assert_allclose(model.profile(), fitted(TIMES, VALUES).profile())
+
+
+def test_update_takes_values_before_the_revision_window_as_final():
+    model = fitted(TIMES, VALUES)
+    revised = VALUES.copy()
+    revised[:10] += 40
+
+    model.update(TIMES, revised)
+
+    np.testing.assert_allclose(model.profile(), fitted(TIMES, VALUES).profile())